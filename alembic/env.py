@@ -8,6 +8,11 @@ from alembic import context
 from models import Base
 from models.user import UserModel  # type: ignore
 from models.like import LikeModel  # type: ignore
+from models.refresh_token import RefreshTokenModel  # type: ignore
+from models.avatar_blob import AvatarBlobModel  # type: ignore
+from models.job import JobModel  # type: ignore
+from models.match import MatchModel  # type: ignore
+from models.feed import FeedCandidateModel, FeedStateModel  # type: ignore
 
 
 # this is the Alembic Config object, which provides
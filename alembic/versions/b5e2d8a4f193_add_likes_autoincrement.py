@@ -0,0 +1,34 @@
+"""Add likes autoincrement
+
+Revision ID: b5e2d8a4f193
+Revises: f4a9c1d6b820
+Create Date: 2026-10-18 10:12:36.281447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2d8a4f193'
+down_revision: Union[str, None] = 'f4a9c1d6b820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Таблица пересоздается с AUTOINCREMENT (ID лайков сохраняются): без него SQLite выдает
+    # удаленный наибольший ID повторно, и дочитывание по likes.id > last_like_id его пропускает
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('likes', recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('likes', recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,71 @@
+"""Add users autoincrement
+
+Revision ID: d6a3f9c2e715
+Revises: b5e2d8a4f193
+Create Date: 2026-10-18 11:04:52.937118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a3f9c2e715'
+down_revision: Union[str, None] = 'b5e2d8a4f193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копии models.user.USERS_GEO_DDL и USERS_FTS_DDL на момент миграции: триггеры удаляются
+# вместе с пересоздаваемой таблицей users (индексы users_geo и users_fts остаются)
+USERS_GEO_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_insert AFTER INSERT ON users "
+    "WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+    "INSERT INTO users_geo VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_update AFTER UPDATE OF latitude, longitude ON users BEGIN "
+    "DELETE FROM users_geo WHERE id = old.id; "
+    "INSERT INTO users_geo SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+    "WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL; END",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_geo WHERE id = old.id; END",
+)
+
+USERS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(first_name, last_name, content='users', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF first_name, last_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); END",
+)
+
+
+def _recreate_users(autoincrement: bool) -> None:
+    # Таблица пересоздается с сохранением ID; внешние ключи в соединении миграций не проверяются,
+    # поэтому удаление старой таблицы не затрагивает likes и другие ссылающиеся таблицы
+    with op.batch_alter_table('users', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}) as batch_op:
+        pass
+    for statement in USERS_GEO_DDL + USERS_FTS_DDL:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    # AUTOINCREMENT: удаленный наибольший ID не выдается повторно, и дочитывание
+    # по users.id > last_user_id (признаки для ранжирования) не пропускает новых пользователей
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _recreate_users(True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _recreate_users(False)
@@ -0,0 +1,50 @@
+"""Add users full-text search index
+
+Revision ID: e7b2a4c9d031
+Revises: c3d8f5a1e9b6
+Create Date: 2026-10-17 22:04:39.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2a4c9d031'
+down_revision: Union[str, None] = 'c3d8f5a1e9b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копия models.user.USERS_FTS_DDL на момент миграции
+USERS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(first_name, last_name, content='users', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF first_name, last_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); END",
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for statement in USERS_FTS_DDL:
+        op.execute(statement)
+    # Индекс существующих пользователей
+    op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("users_fts_insert", "users_fts_update", "users_fts_delete"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS users_fts")
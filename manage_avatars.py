@@ -0,0 +1,52 @@
+"""
+Модуль: manage_avatars
+
+Обслуживание хранилища аватаров:
+- migrate: перенос аватаров старого формата (<uuid>.png) в хранилище по хешу содержимого;
+- gc: удаление файлов, на которые больше не ссылается ни один пользователь.
+
+Пример: python manage_avatars.py migrate --batch-size 1000
+"""
+
+import argparse
+import asyncio
+
+from src.config.database import SessionLocal
+from src.config.settings import AVATAR_DIR, AVATAR_URL_PREFIX, AVATAR_MIGRATION_BATCH_SIZE, AVATAR_GC_GRACE_SECONDS
+from src.services.avatar_blob_service import AvatarBlobService
+from src.services.avatar_migration import AvatarMigrationService
+from src.services.avatar_storage import avatar_storage
+
+
+async def migrate(batch_size: int) -> None:
+    async with SessionLocal() as session:
+        stats = await AvatarMigrationService(session, AVATAR_URL_PREFIX, AVATAR_DIR).migrate(batch_size)
+    await avatar_storage.close()
+    print(f"Avatars migrated: {stats.as_dict()}")
+
+
+async def collect_garbage(grace_seconds: int) -> None:
+    async with SessionLocal() as session:
+        removed = await AvatarBlobService(session).collect_garbage(grace_seconds)
+    await avatar_storage.close()
+    print(f"Unreferenced avatars removed: {removed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание хранилища аватаров")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="Перенести аватары старого формата")
+    migrate_parser.add_argument("--batch-size", type=int, default=AVATAR_MIGRATION_BATCH_SIZE)
+    gc_parser = commands.add_parser("gc", help="Удалить аватары без ссылок")
+    gc_parser.add_argument("--grace", type=int, default=AVATAR_GC_GRACE_SECONDS,
+                           help="Сколько секунд хранить файл без ссылок")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        asyncio.run(migrate(args.batch_size))
+    else:
+        asyncio.run(collect_garbage(args.grace))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Модуль: manage_like_graph
+
+Аналитика по графу лайков (снимок в LIKE_GRAPH_SNAPSHOT_DIR):
+- snapshot: построить или обновить снимок (открывает прежний и дочитывает новые лайки, после удаления
+  лайков перестраивает; --full - заново);
+- stats: число лайков, объем массивов и самые популярные пользователи;
+- user: лайки пользователя, взаимные лайки и "понравились тем, кто понравился вам";
+- benchmark: скорость запросов на синтетическом графе.
+
+Пример: python manage_like_graph.py snapshot && python manage_like_graph.py user 42
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from src.config.database import ReadSessionLocal
+from src.config.settings import LIKE_GRAPH_SNAPSHOT_DIR
+from src.services.like_graph import LikeGraph
+
+
+async def build_snapshot(directory: str, full: bool) -> None:
+    started = time.perf_counter()
+    graph = None if full else _open(directory)
+    async with ReadSessionLocal() as session:
+        if graph is None:
+            graph = LikeGraph()
+            await graph.reload(session)
+        else:
+            print(f"New likes since snapshot: {await graph.refresh(session)}")
+    graph.save(directory)
+    print(f"Snapshot saved: {graph.edge_count} likes, {graph.nbytes / 2 ** 20:.1f} MB "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+def _open(directory: str) -> LikeGraph | None:
+    try:
+        return LikeGraph.load(directory)
+    except FileNotFoundError:
+        return None
+
+
+def _load(directory: str) -> LikeGraph:
+    graph = _open(directory)
+    if graph is None:
+        raise SystemExit(f"Snapshot not found in {directory}: run `python manage_like_graph.py snapshot`")
+    return graph
+
+
+def show_stats(directory: str, k: int) -> None:
+    graph = _load(directory)
+    print(f"Likes: {graph.edge_count}, last like id: {graph.last_like_id}, arrays: {graph.nbytes / 2 ** 20:.1f} MB")
+    for user_id, count in graph.most_liked(k):
+        print(f"{user_id}\t{count}")
+
+
+def show_user(directory: str, user_id: int, k: int) -> None:
+    graph = _load(directory)
+    print(f"Liked: {graph.out_degree(user_id)}, liked by: {graph.in_degree(user_id)}, "
+          f"mutual: {len(graph.mutual(user_id))}")
+    for candidate_id, paths in graph.liked_by_liked(user_id, k):
+        print(f"{candidate_id}\t{paths}")
+
+
+def benchmark(users: int, edges: int, queries: int) -> None:
+    rng = np.random.default_rng(0)
+    graph = LikeGraph()
+    started = time.perf_counter()
+    graph.add_edges(rng.integers(1, users + 1, edges), rng.integers(1, users + 1, edges))
+    graph.compact()
+    print(f"Built {graph.edge_count} likes ({graph.nbytes / 2 ** 20:.1f} MB) in {time.perf_counter() - started:.2f}s")
+    user_ids = rng.integers(1, users + 1, queries).tolist()
+    for name, query in (("degree", graph.in_degree), ("mutual", graph.mutual),
+                        ("two-hop", lambda user_id: graph.liked_by_liked(user_id, 20))):
+        started = time.perf_counter()
+        for user_id in user_ids:
+            query(user_id)
+        print(f"{name}: {(time.perf_counter() - started) / queries * 1e6:.1f} us per query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Аналитика по графу лайков")
+    parser.add_argument("--dir", default=LIKE_GRAPH_SNAPSHOT_DIR, help="Каталог снимка")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="Построить или обновить снимок графа")
+    snapshot_parser.add_argument("--full", action="store_true", help="Перечитать все лайки")
+    stats_parser = commands.add_parser("stats", help="Статистика и самые популярные пользователи")
+    stats_parser.add_argument("--k", type=int, default=20)
+    user_parser = commands.add_parser("user", help="Лайки пользователя и рекомендации через два шага")
+    user_parser.add_argument("user_id", type=int)
+    user_parser.add_argument("--k", type=int, default=20)
+    benchmark_parser = commands.add_parser("benchmark", help="Измерить скорость запросов на синтетическом графе")
+    benchmark_parser.add_argument("--users", type=int, default=1_000_000)
+    benchmark_parser.add_argument("--edges", type=int, default=10_000_000)
+    benchmark_parser.add_argument("--queries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        asyncio.run(build_snapshot(args.dir, args.full))
+    elif args.command == "stats":
+        show_stats(args.dir, args.k)
+    elif args.command == "user":
+        show_user(args.dir, args.user_id, args.k)
+    elif args.command == "benchmark":
+        benchmark(args.users, args.edges, args.queries)
+
+
+if __name__ == "__main__":
+    main()
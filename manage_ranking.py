@@ -0,0 +1,81 @@
+"""
+Модуль: manage_ranking
+
+Ранжирование анкет:
+- top: лучшие анкеты для пользователя по текущим данным базы;
+- benchmark: скорость ранжирования на синтетических признаках (кандидатов в секунду).
+
+Пример: python manage_ranking.py benchmark --users 1000000 --candidates 5000 --k 100
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from src.config.database import ReadSessionLocal
+from src.services.ranking import FeatureStore, RankingEngine
+
+
+async def show_top(user_id: int, k: int) -> None:
+    store = FeatureStore()
+    async with ReadSessionLocal() as session:
+        await store.reload(session)
+    for candidate_id, score in RankingEngine(store).rank(user_id, None, k):
+        print(f"{candidate_id}\t{score:.4f}")
+
+
+def synthetic_store(users: int, seed: int = 0) -> FeatureStore:
+    rng = np.random.default_rng(seed)
+    store = FeatureStore(capacity=users)
+    latitudes = rng.uniform(41.0, 70.0, users)
+    longitudes = rng.uniform(20.0, 60.0, users)
+    store.append_users([
+        (user_id, gender, active, avatar, latitude, longitude)
+        for user_id, gender, active, avatar, latitude, longitude in zip(
+            range(1, users + 1), rng.choice(["male", "female"], users).tolist(),
+            (rng.random(users) < 0.9).tolist(), (rng.random(users) < 0.7).tolist(),
+            latitudes.tolist(), longitudes.tolist())
+    ])
+    ids = np.arange(1, users + 1)
+    store.add_like_counts("likes_received", ids, rng.poisson(20, users))
+    store.add_like_counts("likes_given", ids, rng.poisson(20, users))
+    return store
+
+
+def benchmark(users: int, candidates: int, k: int, rounds: int) -> None:
+    store = synthetic_store(users)
+    engine = RankingEngine(store)
+    rng = np.random.default_rng(1)
+    pools = [rng.choice(users, candidates, replace=False) + 1 for _ in range(rounds)]
+    viewers = rng.integers(1, users + 1, rounds)
+    started = time.perf_counter()
+    for viewer_id, pool in zip(viewers.tolist(), pools):
+        engine.rank(viewer_id, pool, k)
+    elapsed = time.perf_counter() - started
+    print(f"Ranked {rounds} x {candidates} candidates (top {k}) in {elapsed:.3f}s: "
+          f"{rounds * candidates / elapsed:,.0f} candidates/s, {elapsed / rounds * 1000:.2f} ms per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ранжирование анкет")
+    commands = parser.add_subparsers(dest="command", required=True)
+    top_parser = commands.add_parser("top", help="Показать лучшие анкеты для пользователя")
+    top_parser.add_argument("user_id", type=int)
+    top_parser.add_argument("--k", type=int, default=20)
+    benchmark_parser = commands.add_parser("benchmark", help="Измерить скорость ранжирования на синтетических данных")
+    benchmark_parser.add_argument("--users", type=int, default=100_000)
+    benchmark_parser.add_argument("--candidates", type=int, default=1000)
+    benchmark_parser.add_argument("--k", type=int, default=100)
+    benchmark_parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.command == "top":
+        asyncio.run(show_top(args.user_id, args.k))
+    elif args.command == "benchmark":
+        benchmark(args.users, args.candidates, args.k, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
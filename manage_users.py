@@ -0,0 +1,78 @@
+"""
+Модуль: manage_users
+
+Обслуживание пользователей:
+- import: массовый импорт пользователей из CSV или NDJSON с отчетом об отклоненных строках;
+- rebuild-search-index: перестройка полнотекстового индекса имен (после загрузки данных в обход триггеров).
+
+Пример: python manage_users.py import partner.csv --batch-size 2000 --report errors.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import sys
+
+from src.config.database import SessionLocal
+from src.config.settings import USER_IMPORT_BATCH_SIZE, USER_IMPORT_AVATAR_CONCURRENCY
+from src.services.avatar_storage import avatar_storage
+from src.services.image_processor import image_processor
+from src.services.password_hasher import PasswordHasher
+from src.services.user_import import IMPORT_FORMATS, ImportRowError, UserImporter, detect_format, import_hasher_executor
+from src.services.user_search import UserSearchService
+from src.services.user_service import UserService
+
+
+async def import_users(path: str, fmt: str, batch_size: int, avatar_concurrency: int,
+                       avatar_dir: str | None, report_path: str | None) -> None:
+    report_file = open(report_path, "w", newline="", encoding="utf-8") if report_path else sys.stderr
+    report = csv.writer(report_file)
+    report.writerow(["line", "email", "error"])
+
+    def write_error(error: ImportRowError) -> None:
+        report.writerow([error.line, error.email or "", error.error])
+
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            async with SessionLocal() as session:
+                hasher = PasswordHasher(import_hasher_executor)
+                importer = UserImporter(UserService(session, hasher), hasher, batch_size=batch_size,
+                                        avatar_concurrency=avatar_concurrency, avatar_root=avatar_dir)
+                stats = await importer.run(stream, fmt, write_error)
+    finally:
+        if report_path:
+            report_file.close()
+        import_hasher_executor.shutdown()
+        image_processor.shutdown()
+        await avatar_storage.close()
+    print(f"Users imported: {stats.as_dict()}")
+
+
+async def rebuild_search_index() -> None:
+    async with SessionLocal() as session:
+        count = await UserSearchService(session).rebuild()
+    print(f"Search index rebuilt: {count} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание пользователей")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Импортировать пользователей из CSV или NDJSON")
+    import_parser.add_argument("path", help="Входной файл")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, help="По умолчанию - по расширению файла")
+    import_parser.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    import_parser.add_argument("--avatar-concurrency", type=int, default=USER_IMPORT_AVATAR_CONCURRENCY)
+    import_parser.add_argument("--avatar-dir", help="Каталог, относительно которого заданы пути к аватарам")
+    import_parser.add_argument("--report", help="CSV-файл отчета об отклоненных строках (по умолчанию stderr)")
+    commands.add_parser("rebuild-search-index", help="Перестроить полнотекстовый индекс имен пользователей")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        asyncio.run(import_users(args.path, args.format or detect_format(args.path), args.batch_size,
+                                 args.avatar_concurrency, args.avatar_dir, args.report))
+    elif args.command == "rebuild-search-index":
+        asyncio.run(rebuild_search_index())
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,89 @@
 подключаем маршрутизаторы, используемые в приложении.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from routers.clients import router as users_router
 from routers.auth import router as auth_router
+from routers.avatars import router as avatars_router
+from routers.listings import router as listings_router
+from config.database import SQLITE_TUNED, ReadSessionLocal, SessionLocal, engine, pool_stats, dispose_engines
+from config.settings import (AVATAR_URL_PREFIX, LIKE_BUFFER_ENABLED, JOB_WORKER_ENABLED, JOB_WORKER_CONCURRENCY, JOB_BATCH_SIZE,
+                             JOB_VISIBILITY_TIMEOUT_SECONDS, JOB_POLL_INTERVAL_SECONDS, JOB_RETRY_BASE_SECONDS,
+                             SQLITE_MAINTENANCE_INTERVAL_SECONDS, RANKING_ENABLED)
 from config.logging import setup_logging
 from exceptions.error_handlers import register_error_handlers
+from services.avatar_file_cache import avatar_file_cache
+from services.avatar_jobs import AvatarJobHandler
+from services.avatar_storage import avatar_storage
+from services.database_maintenance import DatabaseMaintenance
+from services.email_filter import registered_emails
+from services.feed_service import FeedRefillHandler
+from services.image_processor import image_processor
+from services.job_worker import JobWorker
+from services.like_buffer import like_buffer
+from services.password_hasher import hasher_executor
+from services.ranking import feature_store, ranking_engine
+from services.refresh_token_service import RefreshTokenPurger
+from services.user_import import import_hasher_executor
+from services.watermark_service import get_watermark_service
 
 setup_logging()
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Запуск и остановка ресурсов приложения (пулов воркеров и т.п.)."""
+    get_watermark_service()  # Загружаем водяной знак до первого запроса (и до fork воркеров)
+    if registered_emails.enabled:
+        async with ReadSessionLocal() as session:
+            await registered_emails.load(session)
+    token_purger = RefreshTokenPurger(SessionLocal)
+    token_purger.start()
+    maintenance = None
+    if SQLITE_TUNED:
+        maintenance = DatabaseMaintenance(engine, SQLITE_MAINTENANCE_INTERVAL_SECONDS, pool_stats)
+        maintenance.start()
+    if LIKE_BUFFER_ENABLED:
+        like_buffer.start(SessionLocal)
+    if RANKING_ENABLED:
+        async with ReadSessionLocal() as session:
+            await feature_store.reload(session)
+        feature_store.start(ReadSessionLocal)
+    job_worker = None
+    if JOB_WORKER_ENABLED:
+        feed_handler = FeedRefillHandler(like_buffer if LIKE_BUFFER_ENABLED else None,
+                                         ranking_engine if RANKING_ENABLED else None)
+        job_worker = JobWorker(SessionLocal, [AvatarJobHandler(), feed_handler], concurrency=JOB_WORKER_CONCURRENCY,
+                               batch_size=JOB_BATCH_SIZE, visibility_timeout=JOB_VISIBILITY_TIMEOUT_SECONDS,
+                               poll_interval=JOB_POLL_INTERVAL_SECONDS, retry_base=JOB_RETRY_BASE_SECONDS)
+        job_worker.start()
+    yield
+    if job_worker is not None:
+        await job_worker.stop()
+    if RANKING_ENABLED:
+        await feature_store.stop()
+    if LIKE_BUFFER_ENABLED:
+        await like_buffer.stop()
+    await token_purger.stop()
+    avatar_file_cache.clear()
+    await avatar_storage.close()
+    if maintenance is not None:
+        await maintenance.stop()
+    await dispose_engines()
+    image_processor.shutdown()
+    hasher_executor.shutdown()
+    import_hasher_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Списки подключаются раньше клиентов: иначе /api/clients/search совпадет с /api/clients/{user_id}
+app.include_router(listings_router, prefix="/api", tags=["listings"])
 app.include_router(users_router, prefix="/api/clients")
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
+app.include_router(avatars_router, prefix=f"/{AVATAR_URL_PREFIX.strip('/')}", tags=["avatars"])
 # app.include_router(matches_router, prefix="/api/clients")
-# app.include_router(listings_router, prefix="/api")
 
 register_error_handlers(app)
@@ -5,20 +5,181 @@
 асинхронными сессиями SQLAlchemy + функция для инициализации
 базы данных.
 
+Для файловой SQLite применяется профиль производительности (SQLITE_PROFILE=performance):
+- при каждом подключении: WAL, synchronous, busy_timeout, mmap_size, cache_size, temp_store;
+- один писатель: все изменения идут через единственное соединение, и запись сериализуется
+  очередью пула SQLAlchemy, а не ошибками "database is locked";
+- несколько читателей (PRAGMA query_only): в режиме WAL чтение не ждет записи.
+Проверка внешних ключей (PRAGMA foreign_keys) включается для любой SQLite.
+Пул выбирается явно при создании сессии, а не по запросам: сессии SessionLocal целиком
+работают с писателем (чтение-изменение-запись в одной транзакции видит одно состояние БД),
+сессии ReadSessionLocal - с читателями и только читают.
+
 Основные компоненты:
-- engine: Асинхронный движок базы данных.
-- SessionLocal: Фабрика сессий для взаимодействия с базой данных.
+- engine: Асинхронный движок базы данных (писатель).
+- read_engine: Движок для чтения (при профиле 'default' совпадает с engine).
+- SessionLocal: Фабрика сессий для взаимодействия с базой данных (писатель).
+- ReadSessionLocal: Фабрика сессий только для чтения (читатели).
+- pool_stats: Статистика пулов соединений.
 - init_db: Функция для создания таблиц при начальной настройке.
 """
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import logging
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .settings import DATABASE_URL
+from .settings import (DATABASE_URL, SQLITE_PROFILE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_SYNCHRONOUS,
+                       SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE_BYTES, SQLITE_TEMP_STORE, SQLITE_READ_POOL_SIZE,
+                       SQLITE_WRITE_TIMEOUT_SECONDS)
 from models.user import UserModel  # type: ignore
+from models.like import LikeModel  # type: ignore
+from models.refresh_token import RefreshTokenModel  # type: ignore
+from models.avatar_blob import AvatarBlobModel  # type: ignore
+from models.job import JobModel  # type: ignore
+from models.match import MatchModel  # type: ignore
+from models.feed import FeedCandidateModel, FeedStateModel  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+def is_file_sqlite(url: str) -> bool:
+    """Указывает ли URL на файловую базу SQLite (не в памяти)."""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    """PRAGMA профиля производительности, выполняемые при каждом подключении."""
+    pragmas = [
+        "PRAGMA foreign_keys = ON",
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA journal_mode = WAL",
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_BYTES}",
+        f"PRAGMA temp_store = {SQLITE_TEMP_STORE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+class PoolStats:
+    """
+    Счетчики пула соединений (собираются по событиям пула).
+
+    Attributes:
+        connects (int): Открыто соединений,
+        checkouts (int): Выдано соединений из пула,
+        peak_checked_out (int): Максимальное число одновременно выданных соединений.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.connects = 0
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        event.listen(engine.sync_engine, "connect", self._on_connect)
+        event.listen(engine.sync_engine.pool, "checkout", self._on_checkout)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.engine.pool.checkedout())
+
+    def as_dict(self) -> dict[str, Any]:
+        pool = self.engine.pool
+        data = {"connects": self.connects, "checkouts": self.checkouts, "peak_checked_out": self.peak_checked_out}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                data[name] = getattr(pool, name)()
+        return data
+
+
+# Профиль применяется только к файловой SQLite
+SQLITE_TUNED = SQLITE_PROFILE == "performance" and is_file_sqlite(DATABASE_URL)
+
+
+def _create_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """Создает движок; при SQLITE_TUNED настраивает пул и PRAGMA."""
+    if not SQLITE_TUNED:
+        new_engine = create_async_engine(url, connect_args={"check_same_thread": False})
+        if make_url(url).get_backend_name() != "sqlite":
+            return new_engine
+        pragmas = ["PRAGMA foreign_keys = ON"]
+    else:
+        if read_only:
+            pool_options = {"pool_size": max(1, SQLITE_READ_POOL_SIZE), "max_overflow": 0}
+        else:
+            # Единственное соединение-писатель: остальные запросы на запись ждут его в очереди пула
+            pool_options = {"pool_size": 1, "max_overflow": 0, "pool_timeout": SQLITE_WRITE_TIMEOUT_SECONDS}
+        # По умолчанию aiosqlite открывает новое соединение на каждый запрос (NullPool);
+        # постоянный пул сохраняет кеш страниц и mmap между запросами
+        new_engine = create_async_engine(url, connect_args={"check_same_thread": False},
+                                         poolclass=AsyncAdaptedQueuePool, **pool_options)
+        pragmas = sqlite_pragmas(read_only)
 
-engine = create_async_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return new_engine
+
+
+engine = _create_engine(DATABASE_URL)
+read_engine = _create_engine(DATABASE_URL, read_only=True) if SQLITE_TUNED else engine
+_pool_stats = {"writer": PoolStats(engine)}
+if read_engine is not engine:
+    _pool_stats["reader"] = PoolStats(read_engine)
+
+
+class RoutingSession(Session):
+    """
+    Сессия, работающая с писателем или (read_only=True) с пулом читателей.
+
+    Пул задается при создании сессии и не меняется: все запросы транзакции идут через одно
+    соединение. Запись в сессии читателя завершается ошибкой (PRAGMA query_only).
+
+    Attributes:
+        read_only (bool): Сессия только для чтения.
+    """
+
+    def __init__(self, *args, read_only: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_only = read_only
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return (read_engine if self.read_only else engine).sync_engine
+
+
+SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, sync_session_class=RoutingSession,
+                            expire_on_commit=False)
+# Сессии только для чтения: маршруты и фоновые задачи, которые ничего не изменяют
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, sync_session_class=RoutingSession,
+                                expire_on_commit=False, read_only=True)
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """Возвращает статистику пулов соединений (писатель и читатели)."""
+    return {role: stats.as_dict() for role, stats in _pool_stats.items()}
+
+
+async def dispose_engines() -> None:
+    """Закрывает соединения всех движков."""
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
 
 
 async def init_db():
@@ -32,4 +193,3 @@ async def init_db():
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-
@@ -5,11 +5,22 @@
 и задаются значения по умолчанию для ключевых параметров.
 
 Обрабатываемые параметры:
-- URL базы данных
-- секретный ключ для генерации JWT-токенов
-- каталог для хранения изображений аватаров
-- префикс URL для аватаров
+- URL базы данных и профиль производительности SQLite
+- секретный ключ для генерации JWT-токенов и параметры кеша проверенных токенов
+- время жизни refresh-токенов и интервал удаления истекших
+- лимиты частоты попыток входа
+- параметры фильтра Блума зарегистрированных email
+- параметры буфера лайков с отложенной записью
+- параметры очереди анкет для просмотра и их ранжирования
+- параметры снимка графа лайков для аналитики
+- параметры пула для хеширования паролей
+- каталог для хранения изображений аватаров и параметры хранилища по хешу содержимого (локального или S3)
+- префикс URL для аватаров, размеры и формат производных аватаров
+- параметры выдачи аватаров (кеш открытых файлов, Cache-Control)
+- параметры фоновой очереди задач
+- параметры массового импорта пользователей
 - путь к файлу вотермарка
+- ограничения на загружаемые аватары и параметры пула обработки изображений
 
 Также создается каталог для хранения изображений аватаров, если не создан ранее
 
@@ -74,11 +85,145 @@ def get_env_variable_only_from_env(name: str) -> str:
 DATABASE_URL = get_env_variable('DATABASE_URL', f'sqlite+aiosqlite:///{BASE_DIR / "database.db"}')
 AUTH_SECRET = get_env_variable('AUTH_SECRET', 'default_secret_key')
 AUTH_EXPIRES_SECONDS = int(get_env_variable('AUTH_EXPIRES_SECONDS', '600'))  # 10 минут
+REFRESH_EXPIRES_SECONDS = int(get_env_variable('REFRESH_EXPIRES_SECONDS', str(30 * 24 * 3600)))  # 30 дней
+REFRESH_PURGE_INTERVAL_SECONDS = float(get_env_variable('REFRESH_PURGE_INTERVAL_SECONDS', '3600'))
+REFRESH_COOKIE_SECURE = get_env_variable('REFRESH_COOKIE_SECURE', 'false').lower() == 'true'
+
+# Профиль SQLite: 'performance' (WAL, PRAGMA при подключении, один писатель и пул читателей) или 'default'.
+# Таймаут ожидания блокировки, режим synchronous, размер кеша страниц (КиБ), размер mmap (байты),
+# хранение временных таблиц, число соединений-читателей, сколько ждать соединения-писателя,
+# интервал обслуживания (PRAGMA optimize и контрольная точка WAL)
+SQLITE_PROFILE = get_env_variable('SQLITE_PROFILE', 'performance').lower()
+SQLITE_BUSY_TIMEOUT_MS = int(get_env_variable('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_SYNCHRONOUS = get_env_variable('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_CACHE_SIZE_KB = int(get_env_variable('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+SQLITE_MMAP_SIZE_BYTES = int(get_env_variable('SQLITE_MMAP_SIZE_BYTES', str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = get_env_variable('SQLITE_TEMP_STORE', 'MEMORY').upper()
+SQLITE_READ_POOL_SIZE = int(get_env_variable('SQLITE_READ_POOL_SIZE', '4'))
+SQLITE_WRITE_TIMEOUT_SECONDS = float(get_env_variable('SQLITE_WRITE_TIMEOUT_SECONDS', '30'))
+SQLITE_MAINTENANCE_INTERVAL_SECONDS = float(get_env_variable('SQLITE_MAINTENANCE_INTERVAL_SECONDS', '600'))
+
+# Ограничение частоты попыток входа (скользящее окно): по email и по IP клиента
+LOGIN_RATE_LIMIT_WINDOW_SECONDS = int(get_env_variable('LOGIN_RATE_LIMIT_WINDOW_SECONDS', '60'))
+LOGIN_RATE_LIMIT_PER_EMAIL = int(get_env_variable('LOGIN_RATE_LIMIT_PER_EMAIL', '5'))
+LOGIN_RATE_LIMIT_PER_IP = int(get_env_variable('LOGIN_RATE_LIMIT_PER_IP', '20'))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(get_env_variable('LOGIN_RATE_LIMIT_MAX_KEYS', '100000'))
+
+# Фильтр Блума зарегистрированных email (быстрый ответ "email свободен" без запроса к БД):
+# включение, ожидаемое число адресов и допустимая доля ложноположительных ответов
+EMAIL_BLOOM_ENABLED = get_env_variable('EMAIL_BLOOM_ENABLED', 'false').lower() == 'true'
+EMAIL_BLOOM_CAPACITY = int(get_env_variable('EMAIL_BLOOM_CAPACITY', '1000000'))
+EMAIL_BLOOM_ERROR_RATE = float(get_env_variable('EMAIL_BLOOM_ERROR_RATE', '0.01'))
+
+# Буфер лайков с отложенной записью: включение, интервал сброса (мс), размер пачки,
+# максимальное число ожидающих лайков и сколько ждать места в заполненном буфере
+LIKE_BUFFER_ENABLED = get_env_variable('LIKE_BUFFER_ENABLED', 'false').lower() == 'true'
+LIKE_BUFFER_FLUSH_MS = int(get_env_variable('LIKE_BUFFER_FLUSH_MS', '50'))
+LIKE_BUFFER_MAX_BATCH = int(get_env_variable('LIKE_BUFFER_MAX_BATCH', '500'))
+LIKE_BUFFER_MAX_PENDING = int(get_env_variable('LIKE_BUFFER_MAX_PENDING', '10000'))
+LIKE_BUFFER_BACKPRESSURE_SECONDS = float(get_env_variable('LIKE_BUFFER_BACKPRESSURE_SECONDS', '1'))
+
+# Очередь анкет для просмотра: сколько анкет добавлять за одно пополнение и при каком
+# остатке ставить пополнение в фоновую очередь задач
+FEED_BATCH_SIZE = int(get_env_variable('FEED_BATCH_SIZE', '100'))
+FEED_LOW_WATERMARK = int(get_env_variable('FEED_LOW_WATERMARK', '20'))
+
+# Ранжирование анкет: включение, интервалы инкрементального обновления и полной перезагрузки
+# признаков (с), во сколько раз больше кандидатов отбирать для ранжирования при пополнении очереди
+RANKING_ENABLED = get_env_variable('RANKING_ENABLED', 'false').lower() == 'true'
+RANKING_REFRESH_SECONDS = float(get_env_variable('RANKING_REFRESH_SECONDS', '30'))
+RANKING_FULL_RELOAD_SECONDS = float(get_env_variable('RANKING_FULL_RELOAD_SECONDS', '3600'))
+RANKING_POOL_FACTOR = int(get_env_variable('RANKING_POOL_FACTOR', '10'))
+
+# Граф лайков для аналитики: каталог снимка на диске и число новых лайков, после которого
+# они сливаются с основными массивами
+LIKE_GRAPH_SNAPSHOT_DIR = get_env_variable('LIKE_GRAPH_SNAPSHOT_DIR', str(BASE_DIR / 'like_graph'))
+LIKE_GRAPH_COMPACT_THRESHOLD = int(get_env_variable('LIKE_GRAPH_COMPACT_THRESHOLD', '100000'))
+
+# Кеш проверенных токенов: максимальное число записей и время жизни записи
+TOKEN_CACHE_SIZE = int(get_env_variable('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_CACHE_TTL_SECONDS = int(get_env_variable('TOKEN_CACHE_TTL_SECONDS', '60'))
+
+# Пул для bcrypt: 'thread' или 'process', число воркеров и допустимая длина очереди
+PASSWORD_HASHER_POOL = get_env_variable('PASSWORD_HASHER_POOL', 'thread')
+PASSWORD_HASHER_WORKERS = int(get_env_variable('PASSWORD_HASHER_WORKERS', '4'))
+PASSWORD_HASHER_MAX_QUEUE = int(get_env_variable('PASSWORD_HASHER_MAX_QUEUE', '64'))
 
 AVATAR_DIR = get_env_variable('AVATAR_DIR', str(BASE_DIR / 'avatars'))
 AVATAR_URL_PREFIX = get_env_variable('AVATAR_URL_PREFIX', 'avatars')
+# Хранилище аватаров по хешу содержимого: число уровней вложенных каталогов (по 2 hex-символа),
+# размер пачки при переносе старых файлов и время, через которое удаляются аватары без ссылок
+AVATAR_SHARD_LEVELS = int(get_env_variable('AVATAR_SHARD_LEVELS', '2'))
+AVATAR_MIGRATION_BATCH_SIZE = int(get_env_variable('AVATAR_MIGRATION_BATCH_SIZE', '500'))
+AVATAR_GC_GRACE_SECONDS = int(get_env_variable('AVATAR_GC_GRACE_SECONDS', '3600'))
+# Где хранятся аватары: 'local' (AVATAR_DIR) или 's3' (общее хранилище для нескольких узлов API;
+# AVATAR_DIR тогда служит локальным кешем скачанных файлов)
+AVATAR_STORAGE = get_env_variable('AVATAR_STORAGE', 'local').lower()
+S3_ENDPOINT_URL = get_env_variable('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+S3_BUCKET = get_env_variable('S3_BUCKET', 'avatars')
+S3_REGION = get_env_variable('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY = get_env_variable('S3_ACCESS_KEY', '')
+S3_SECRET_KEY = get_env_variable('S3_SECRET_KEY', '')
+S3_MAX_CONNECTIONS = int(get_env_variable('S3_MAX_CONNECTIONS', '20'))
+S3_MULTIPART_THRESHOLD_BYTES = int(get_env_variable('S3_MULTIPART_THRESHOLD_BYTES', str(8 * 1024 * 1024)))
+S3_PART_SIZE_BYTES = int(get_env_variable('S3_PART_SIZE_BYTES', str(8 * 1024 * 1024)))
+S3_CONCURRENCY = int(get_env_variable('S3_CONCURRENCY', '4'))
+S3_TIMEOUT_SECONDS = float(get_env_variable('S3_TIMEOUT_SECONDS', '10'))
 WATERMARK_PATH = get_env_variable('WATERMARK_FILE', str(BASE_DIR / 'watermark.png'))
-
+# Размеры аватаров (сторона в пикселях), для которых уменьшенный водяной знак готовится заранее
+WATERMARK_PRESCALE_SIZES = tuple(
+    int(size) for size in get_env_variable('WATERMARK_PRESCALE_SIZES', '64,128,256').split(',') if size.strip()
+)
+
+
+# Производные размеры аватаров ("имя:максимальная сторона"), формат (webp, jpeg или png) и качество.
+# Самый большой размер сохраняется при регистрации, остальные создаются при первом запросе
+AVATAR_VARIANTS = {
+    name.strip(): int(size)
+    for name, size in (item.split(':') for item in
+                       get_env_variable('AVATAR_VARIANTS', 'thumb:128,card:512,full:1024').split(',') if item.strip())
+}
+AVATAR_FORMAT = get_env_variable('AVATAR_FORMAT', 'webp').lower()
+AVATAR_QUALITY = int(get_env_variable('AVATAR_QUALITY', '80'))
+# Фоновая очередь задач (асинхронная регистрация): запуск воркера вместе с приложением,
+# число параллельно выполняемых задач, размер пачки, время видимости задачи, интервал опроса,
+# число попыток и базовая задержка перед повтором (удваивается с каждой попыткой)
+JOB_WORKER_ENABLED = get_env_variable('JOB_WORKER_ENABLED', 'true').lower() == 'true'
+JOB_WORKER_CONCURRENCY = int(get_env_variable('JOB_WORKER_CONCURRENCY', '2'))
+JOB_BATCH_SIZE = int(get_env_variable('JOB_BATCH_SIZE', '8'))
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(get_env_variable('JOB_VISIBILITY_TIMEOUT_SECONDS', '60'))
+JOB_POLL_INTERVAL_SECONDS = float(get_env_variable('JOB_POLL_INTERVAL_SECONDS', '1'))
+JOB_MAX_ATTEMPTS = int(get_env_variable('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = float(get_env_variable('JOB_RETRY_BASE_SECONDS', '2'))
+# Массовый импорт пользователей: размер пачки вставки, число процессов для bcrypt,
+# число одновременно загружаемых аватаров, таймаут загрузки аватара и доступность маршрута импорта.
+# Маршрут импорта требует служебный ключ (заголовок X-Import-Key; без ключа маршрут недоступен),
+# аватары по URL загружаются через него только с перечисленных хостов (через запятую; по умолчанию - ни с каких)
+USER_IMPORT_BATCH_SIZE = int(get_env_variable('USER_IMPORT_BATCH_SIZE', '1000'))
+USER_IMPORT_HASH_WORKERS = int(get_env_variable('USER_IMPORT_HASH_WORKERS', str(os.cpu_count() or 2)))
+USER_IMPORT_AVATAR_CONCURRENCY = int(get_env_variable('USER_IMPORT_AVATAR_CONCURRENCY', '16'))
+USER_IMPORT_AVATAR_TIMEOUT_SECONDS = float(get_env_variable('USER_IMPORT_AVATAR_TIMEOUT_SECONDS', '10'))
+USER_IMPORT_API_ENABLED = get_env_variable('USER_IMPORT_API_ENABLED', 'false').lower() == 'true'
+USER_IMPORT_API_KEY = get_env_variable('USER_IMPORT_API_KEY', '')
+USER_IMPORT_API_AVATAR_HOSTS = frozenset(
+    host.strip().lower() for host in get_env_variable('USER_IMPORT_API_AVATAR_HOSTS', '').split(',') if host.strip())
+# Выдача аватаров: число открытых файлов в кеше и время кеширования на клиенте (файлы неизменяемы)
+AVATAR_FD_CACHE_SIZE = int(get_env_variable('AVATAR_FD_CACHE_SIZE', '256'))
+AVATAR_CACHE_MAX_AGE = int(get_env_variable('AVATAR_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+
+# Ограничения для загружаемых аватаров: размер файла в байтах, число пикселей и максимальная сторона
+AVATAR_MAX_BYTES = int(get_env_variable('AVATAR_MAX_BYTES', str(10 * 1024 * 1024)))
+AVATAR_MAX_PIXELS = int(get_env_variable('AVATAR_MAX_PIXELS', str(40_000_000)))
+AVATAR_MAX_DIMENSION = int(get_env_variable('AVATAR_MAX_DIMENSION', '10000'))
+# Потоковое чтение загрузок: размер читаемой части и порог сброса во временный файл
+AVATAR_UPLOAD_CHUNK_BYTES = int(get_env_variable('AVATAR_UPLOAD_CHUNK_BYTES', str(64 * 1024)))
+AVATAR_SPOOL_THRESHOLD_BYTES = int(get_env_variable('AVATAR_SPOOL_THRESHOLD_BYTES', str(1024 * 1024)))
+
+# Пул процессов для обработки аватаров: число воркеров (0 - обработка в потоке без пула),
+# таймаут одной задачи и число одновременно обрабатываемых изображений
+IMAGE_PROCESS_WORKERS = int(get_env_variable('IMAGE_PROCESS_WORKERS', '2'))
+IMAGE_PROCESS_TIMEOUT_SECONDS = float(get_env_variable('IMAGE_PROCESS_TIMEOUT_SECONDS', '10'))
+IMAGE_PROCESS_MAX_CONCURRENCY = int(get_env_variable('IMAGE_PROCESS_MAX_CONCURRENCY', '4'))
 
 # Без дефолтного значения для YANDEX_SMTP_SECRET
 YANDEX_SMTP_SECRET = get_env_variable('YANDEX_SMTP_SECRET', default='')
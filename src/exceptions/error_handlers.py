@@ -13,7 +13,7 @@ from fastapi.exceptions import RequestValidationError
 
 import logging
 
-from .exceptions import FileValidationError, FileProcessingError
+from .exceptions import FileValidationError, FileProcessingError, PasswordHasherOverloaded, RateLimitExceeded
 
 
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +24,8 @@ def register_error_handlers(app: FastAPI) -> None:
     """
     Регистрация обработчиков ошибок для приложения FastAPI.
 
-    Добавляет обработчики для исключений FileValidationError и FileProcessingError,
+    Добавляет обработчики для исключений FileValidationError, FileProcessingError,
+    PasswordHasherOverloaded и RateLimitExceeded,
     генерируя JSON-ответы с соответствующими статус-кодами и деталями ошибки.
 
     Args:
@@ -58,6 +59,24 @@ def register_error_handlers(app: FastAPI) -> None:
             content={"message": "File processing error", "details": str(exc)}
         )
 
+    @app.exception_handler(PasswordHasherOverloaded)
+    async def password_hasher_overloaded_handler(_request: Request, exc: PasswordHasherOverloaded) -> JSONResponse:
+        """Обработчик для исключений PasswordHasherOverloaded."""
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": "1"}
+        )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded_handler(_request: Request, exc: RateLimitExceeded) -> JSONResponse:
+        """Обработчик для исключений RateLimitExceeded."""
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
         logger.error(f"Validation error: {exc.errors()}. Path: {request.url.path}")
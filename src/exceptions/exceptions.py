@@ -17,6 +17,11 @@ class FileProcessingError(IOError):
     pass
 
 
+class StorageError(FileProcessingError):
+    """При ошибке хранилища файлов (диска или S3)."""
+    pass
+
+
 # Ошибки, связанные с обработкой пользователя
 
 class EmailAlreadyRegistered(Exception):
@@ -34,6 +39,24 @@ class DatabaseError(Exception):
     pass
 
 
+class PasswordHasherOverloaded(Exception):
+    """Если очередь задач хеширования паролей переполнена"""
+    pass
+
+
+class LikeBufferOverloaded(Exception):
+    """Если буфер лайков заполнен и не освободился за отведенное время"""
+    pass
+
+
+class RateLimitExceeded(Exception):
+    """Если превышен лимит частоты запросов"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 # Ошибки связанные с jwt-токеном
 class TokenExpired(Exception):
     pass
@@ -41,3 +64,15 @@ class TokenExpired(Exception):
 
 class TokenInvalid(Exception):
     pass
+
+
+class TokenReused(TokenInvalid):
+    """Если уже использованный refresh-токен предъявлен повторно"""
+    pass
+
+
+# Ошибки фоновых задач
+
+class PermanentJobError(Exception):
+    """Если фоновая задача не может быть выполнена и повторять ее бессмысленно."""
+    pass
@@ -6,7 +6,7 @@
 
 """
 
-from typing import Protocol
+from typing import Any, Mapping, Protocol
 
 
 class PasswordHasherProtocol(Protocol):
@@ -37,4 +37,224 @@ class PasswordHasherProtocol(Protocol):
         """
         ...
 
+    async def hash_password_async(self, password: str) -> str:
+        """
+        Хэширует пароль, не блокируя цикл событий.
+
+        Args:
+            password (str): Пароль, который необходимо хэшировать.
+
+        Returns:
+            str: Хэшированный пароль.
+        """
+        ...
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Проверяет пароль, не блокируя цикл событий.
+
+        Args:
+            plain_password (str): Пароль в открытом виде.
+            hashed_password (str): Хэшированный пароль.
+
+        Returns:
+            bool: True, если пароли совпадают, иначе False.
+        """
+        ...
+
+
+class RateLimitBackendProtocol(Protocol):
+    """
+    Протокол хранилища счетчиков для ограничения частоты запросов.
+
+    Счетчики ведутся по окнам фиксированной длины (bucket - номер окна).
+    Реализация в памяти работает в пределах одного процесса; чтобы несколько
+    воркеров разделяли лимиты, достаточно реализовать протокол поверх общего
+    хранилища (например, Redis INCR + EXPIRE).
+    """
+
+    async def increment(self, key: str, bucket: int, ttl: float) -> int:
+        """
+        Увеличивает счетчик ключа в окне bucket.
+
+        Args:
+            key (str): Ключ лимита,
+            bucket (int): Номер окна,
+            ttl (float): Сколько секунд счетчик должен храниться.
+
+        Returns:
+            int: Значение счетчика после увеличения.
+        """
+        ...
+
+    async def get(self, key: str, bucket: int) -> int:
+        """
+        Возвращает значение счетчика ключа в окне bucket.
+
+        Args:
+            key (str): Ключ лимита,
+            bucket (int): Номер окна.
+
+        Returns:
+            int: Значение счетчика или 0, если его нет.
+        """
+        ...
+
+
+class StorageDriverProtocol(Protocol):
+    """
+    Протокол хранилища файлов (объектов) по ключу.
+
+    Ключ - относительный путь вида 'ab/cd/<имя>'. Все методы асинхронные и не блокируют
+    цикл событий. Реализации: локальный диск и S3-совместимое хранилище, которое
+    позволяет нескольким узлам API использовать общие аватары без NFS.
+    """
+
+    async def exists(self, key: str) -> bool:
+        """
+        Проверяет наличие объекта.
+
+        Args:
+            key (str): Ключ объекта.
+
+        Returns:
+            bool: True, если объект существует.
+        """
+        ...
+
+    async def get(self, key: str) -> bytes:
+        """
+        Читает объект целиком.
+
+        Args:
+            key (str): Ключ объекта.
+
+        Returns:
+            bytes: Содержимое объекта.
+
+        Raises:
+            FileNotFoundError: Если объекта нет.
+        """
+        ...
+
+    async def put(self, key: str, data: bytes | memoryview) -> None:
+        """
+        Атомарно записывает объект (читатели видят либо старое, либо новое содержимое целиком).
+
+        Args:
+            key (str): Ключ объекта,
+            data (bytes | memoryview): Содержимое.
+        """
+        ...
+
+    async def touch(self, key: str) -> None:
+        """
+        Обновляет время изменения объекта.
+
+        Args:
+            key (str): Ключ объекта.
+
+        Raises:
+            FileNotFoundError: Если объекта нет.
+        """
+        ...
+
+    async def modified_at(self, key: str) -> float | None:
+        """
+        Возвращает время последнего изменения объекта.
+
+        Args:
+            key (str): Ключ объекта.
+
+        Returns:
+            float | None: Unix timestamp или None, если объекта нет.
+        """
+        ...
+
+    async def delete_many(self, keys: list[str]) -> int:
+        """
+        Удаляет объекты; отсутствующие ключи пропускаются.
+
+        Args:
+            keys (list[str]): Ключи объектов.
+
+        Returns:
+            int: Число удаленных объектов (для S3 - число ключей без ошибок).
+        """
+        ...
+
+    async def local_path(self, key: str) -> str:
+        """
+        Возвращает путь к локальному файлу с содержимым объекта (для отдачи через sendfile).
+
+        Удаленные хранилища скачивают объект в локальный кеш; объекты по хешу
+        содержимого неизменяемы, поэтому кеш не нужно инвалидировать.
+
+        Args:
+            key (str): Ключ объекта.
+
+        Returns:
+            str: Путь к файлу.
 
+        Raises:
+            FileNotFoundError: Если объекта нет.
+        """
+        ...
+
+    async def close(self) -> None:
+        """Освобождает ресурсы (соединения)."""
+        ...
+
+
+class JobHandlerProtocol(Protocol):
+    """
+    Протокол обработчика фоновых задач одного типа.
+
+    Attributes:
+        kind (str): Тип задач, которые обрабатывает обработчик.
+    """
+
+    kind: str
+
+    async def run(self, db: Any, payload: dict) -> None:
+        """
+        Выполняет задачу. Обработчик должен быть идемпотентным: после сбоя воркера
+        задача может быть выполнена повторно.
+
+        Args:
+            db (AsyncSession): Сессия базы данных, открытая для этой задачи,
+            payload (dict): Параметры задачи.
+
+        Raises:
+            PermanentJobError: Если повторять задачу бессмысленно (например, файл не является изображением).
+            Exception: Любая другая ошибка - задача будет повторена.
+        """
+        ...
+
+    async def on_failure(self, db: Any, payload: dict, error: str) -> None:
+        """
+        Вызывается один раз, когда задача окончательно не выполнена (для компенсирующих действий).
+
+        Args:
+            db (AsyncSession): Сессия базы данных,
+            payload (dict): Параметры задачи,
+            error (str): Описание последней ошибки.
+        """
+        ...
+
+
+class RankingScorerProtocol(Protocol):
+    """Протокол функции оценки кандидатов для ранжирования анкет."""
+
+    def __call__(self, candidates: Mapping[str, Any], viewer: Mapping[str, Any]) -> Any:
+        """
+        Оценивает всех кандидатов сразу (векторно).
+
+        Args:
+            candidates (Mapping[str, np.ndarray]): Столбцы признаков кандидатов одинаковой длины,
+            viewer (Mapping[str, Any]): Признаки пользователя, для которого ранжируются анкеты.
+
+        Returns:
+            np.ndarray: Оценки кандидатов (больше - выше в выдаче; -inf - исключить).
+        """
+        ...
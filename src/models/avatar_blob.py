@@ -0,0 +1,33 @@
+"""
+Модуль: models.avatar_blob
+
+Модуль содержит класс AvatarBlobModel, представляющий таблицу `avatar_blobs` в базе данных.
+Хранит счетчики ссылок на файлы аватаров в хранилище по хешу содержимого.
+"""
+
+from sqlalchemy import Column, Integer, String
+
+from . import Base
+
+
+class AvatarBlobModel(Base):
+    """Модель для представления таблицы счетчиков ссылок на аватары.
+
+    Одинаковые аватары хранятся одним файлом; счетчик показывает, сколько пользователей
+    на него ссылается. Файл с нулевым счетчиком удаляется сборщиком мусора не сразу,
+    а спустя AVATAR_GC_GRACE_SECONDS, чтобы не потерять файл, который как раз
+    загружается повторно.
+
+    Attributes:
+        content_key (str): SHA-256 содержимого файла, первичный ключ,
+        extension (str): Расширение файла,
+        refcount (int): Число пользователей, ссылающихся на файл,
+        released_at (int, optional): Когда счетчик стал нулевым (unix timestamp).
+    """
+
+    __tablename__ = 'avatar_blobs'
+
+    content_key = Column(String(64), primary_key=True, doc="SHA-256 содержимого файла.")
+    extension = Column(String(8), nullable=False, doc="Расширение файла.")
+    refcount = Column(Integer, nullable=False, default=0, doc="Число пользователей, ссылающихся на файл.")
+    released_at = Column(Integer, nullable=True, index=True, doc="Когда счетчик стал нулевым (unix timestamp).")
@@ -0,0 +1,62 @@
+"""
+Модуль: models.feed
+
+Модуль содержит классы FeedCandidateModel и FeedStateModel, представляющие таблицы
+`feed_candidates` и `feed_state` в базе данных: заранее подобранную очередь анкет
+для просмотра каждым пользователем и состояние ее пополнения.
+"""
+
+from sqlalchemy import Column, Integer, Float, Boolean, ForeignKey, UniqueConstraint, Index
+
+from . import Base
+
+
+class FeedCandidateModel(Base):
+    """Модель для представления таблицы очереди анкет.
+
+    Очередь пополняется в фоне пачками, а следующая анкета читается по первичному ключу
+    (user_id, position) без соединения с likes. Записи удаляются при лайке или пропуске
+    анкеты и каскадно - при удалении любого из двух пользователей.
+
+    Attributes:
+        user_id (int): Владелец очереди,
+        position (int): Порядковый номер анкеты в очереди,
+        candidate_id (int): Пользователь, чья анкета показывается.
+    """
+
+    __tablename__ = 'feed_candidates'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True,
+                     doc="Владелец очереди.")
+    position = Column(Integer, primary_key=True, doc="Порядковый номер анкеты в очереди.")
+    candidate_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False,
+                          doc="Пользователь, чья анкета показывается.")
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'candidate_id', name='unique_feed_candidate'),
+        # Каскадное удаление записей, где удаленный пользователь - кандидат
+        Index('ix_feed_candidates_candidate_id', 'candidate_id'),
+    )
+
+
+class FeedStateModel(Base):
+    """Модель для представления таблицы состояния очередей анкет.
+
+    Пополнение просматривает пользователей по возрастанию ID, начиная после cursor, и по
+    достижении конца таблицы начинает сначала; поэтому пропущенные анкеты возвращаются
+    только после полного круга.
+
+    Attributes:
+        user_id (int): Владелец очереди,
+        cursor (int): ID последнего просмотренного при пополнении пользователя,
+        refill_pending (bool): Задача пополнения уже поставлена в очередь,
+        refilled_at (float, optional): Время последнего пополнения (unix timestamp).
+    """
+
+    __tablename__ = 'feed_state'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True,
+                     doc="Владелец очереди.")
+    cursor = Column(Integer, nullable=False, default=0, doc="ID последнего просмотренного пользователя.")
+    refill_pending = Column(Boolean, nullable=False, default=False, doc="Пополнение уже поставлено в очередь.")
+    refilled_at = Column(Float, nullable=True, doc="Время последнего пополнения (unix timestamp).")
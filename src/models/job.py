@@ -0,0 +1,50 @@
+"""
+Модуль: models.job
+
+Модуль содержит класс JobModel, представляющий таблицу `jobs` в базе данных.
+Таблица служит надежной очередью фоновых задач (например, обработки аватаров).
+"""
+
+from sqlalchemy import Column, Integer, Float, String, Text, JSON, Index
+
+from . import Base
+
+
+class JobModel(Base):
+    """Модель для представления таблицы фоновых задач.
+
+    Задача берется воркером атомарным UPDATE ... RETURNING: статус становится 'running',
+    а available_at сдвигается на время видимости. Если воркер не успел завершить задачу
+    за это время (упал или завис), задача снова становится доступной другим воркерам.
+
+    Attributes:
+        id (str): Идентификатор задачи (случайный, чтобы статус нельзя было перебрать),
+        kind (str): Тип задачи (определяет обработчик),
+        payload (dict): Параметры задачи,
+        status (str): 'queued', 'running', 'done' или 'failed',
+        attempts (int): Число выполненных попыток,
+        max_attempts (int): Максимальное число попыток,
+        available_at (float): Когда задачу можно брать (unix timestamp),
+        locked_by (str, optional): Идентификатор воркера, выполняющего задачу,
+        last_error (str, optional): Ошибка последней попытки,
+        created_at (float): Время создания,
+        updated_at (float): Время последнего изменения.
+    """
+
+    __tablename__ = 'jobs'
+
+    id = Column(String(32), primary_key=True, doc="Идентификатор задачи.")
+    kind = Column(String(32), nullable=False, doc="Тип задачи.")
+    payload = Column(JSON, nullable=False, doc="Параметры задачи.")
+    status = Column(String(16), nullable=False, default="queued", doc="Статус задачи.")
+    attempts = Column(Integer, nullable=False, default=0, doc="Число выполненных попыток.")
+    max_attempts = Column(Integer, nullable=False, doc="Максимальное число попыток.")
+    available_at = Column(Float, nullable=False, doc="Когда задачу можно брать (unix timestamp).")
+    locked_by = Column(String(64), nullable=True, doc="Воркер, выполняющий задачу.")
+    last_error = Column(Text, nullable=True, doc="Ошибка последней попытки.")
+    created_at = Column(Float, nullable=False, doc="Время создания.")
+    updated_at = Column(Float, nullable=False, doc="Время последнего изменения.")
+
+    __table_args__ = (
+        Index('ix_jobs_status_available_at', 'status', 'available_at'),
+    )
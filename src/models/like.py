@@ -3,9 +3,12 @@
 
 Модуль содержит класс LikeModel, представляющий таблицу `like` в базе данных.
 Описывает структуру таблицы и хранит информацию о лайках пользователей друг другу.
+
+Число удаленных лайков хранит таблица-счетчик `like_deletions`; в SQLite ее увеличивает
+триггер на `likes` (LIKE_DELETIONS_DDL).
 """
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, Index, Table, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -37,10 +40,32 @@ class LikeModel(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'liked_user_id', name='unique_user_like'),
+        # Обратный поиск: кто лайкнул пользователя (проверка ответного лайка, входящие лайки)
+        Index('ix_likes_liked_user_id_user_id', 'liked_user_id', 'user_id'),
+        # ID не переиспользуются после удаления: по ним дочитываются новые лайки (граф лайков, ранжирование)
+        {'sqlite_autoincrement': True},
     )
 
     # Определяем связи с другим пользователем, если требуется
     user = relationship("UserModel", foreign_keys=[user_id],
                         doc="Отношение к пользователю, который поставил лайк.")
     liked_user = relationship("UserModel", foreign_keys=[liked_user_id],
-                              doc="Отношение к пользователю, получившему лайк.")
\ No newline at end of file
+                              doc="Отношение к пользователю, получившему лайк.")
+
+# Счетчик удаленных лайков (одна строка, id = 1): снимки лайков в памяти (граф лайков) узнают
+# об удалениях одним чтением по первичному ключу, без подсчета всей таблицы likes.
+like_deletions = Table(
+    "like_deletions", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("deleted", Integer, nullable=False, doc="Сколько лайков удалено за все время."),
+)
+
+# Триггер срабатывает и при каскадном удалении лайков вместе с пользователем
+LIKE_DELETIONS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS likes_count_deleted AFTER DELETE ON likes BEGIN "
+    "INSERT INTO like_deletions (id, deleted) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET deleted = deleted + 1; END",
+)
+
+for _statement in LIKE_DELETIONS_DDL:
+    event.listen(LikeModel.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,39 @@
+"""
+Модуль: models.match
+
+Модуль содержит класс MatchModel, представляющий таблицу `matches` в базе данных.
+Хранит взаимные симпатии: пары пользователей, лайкнувших друг друга.
+"""
+
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint, CheckConstraint, Index
+
+from . import Base
+
+
+class MatchModel(Base):
+    """Модель для представления таблицы взаимных симпатий.
+
+    Пара хранится один раз в упорядоченном виде (first_user_id < second_user_id), поэтому
+    уникальное ограничение исключает повторную запись пары, кто бы ни поставил второй лайк.
+    Запись создается в той же транзакции, что и второй (ответный) лайк.
+
+    Attributes:
+        id (int): Уникальный идентификатор пары,
+        first_user_id (int): Меньший ID пользователя пары,
+        second_user_id (int): Больший ID пользователя пары.
+    """
+
+    __tablename__ = 'matches'
+
+    id = Column(Integer, primary_key=True)
+    first_user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False,
+                           doc="Меньший ID пользователя пары.")
+    second_user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False,
+                            doc="Больший ID пользователя пары.")
+
+    __table_args__ = (
+        UniqueConstraint('first_user_id', 'second_user_id', name='unique_match'),
+        CheckConstraint('first_user_id < second_user_id', name='ordered_match'),
+        # Поиск пар пользователя по второму столбцу (по первому работает уникальный индекс)
+        Index('ix_matches_second_user_id', 'second_user_id'),
+    )
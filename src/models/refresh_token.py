@@ -0,0 +1,36 @@
+"""
+Модуль: models.refresh_token
+
+Модуль содержит класс RefreshTokenModel, представляющий таблицу `refresh_tokens` в базе данных.
+Хранит выданные refresh-токены для их ротации и обнаружения повторного использования.
+"""
+
+from sqlalchemy import Column, Integer, ForeignKey, LargeBinary, Boolean
+
+from . import Base
+
+
+class RefreshTokenModel(Base):
+    """Модель для представления таблицы refresh-токенов.
+
+    Сам токен не хранится - только его SHA-256 дайджест, поэтому утечка таблицы
+    не дает готовых токенов. Все токены, полученные ротацией из одного логина,
+    образуют семейство; при повторном предъявлении использованного токена
+    семейство отзывается целиком.
+
+    Attributes:
+        token_hash (bytes): SHA-256 дайджест токена, первичный ключ,
+        user_id (int): Идентификатор владельца токена,
+        family_id (bytes): Идентификатор семейства токенов,
+        expires_at (int): Время истечения (unix timestamp),
+        used (bool): Токен уже обменян на новый.
+    """
+
+    __tablename__ = 'refresh_tokens'
+
+    token_hash = Column(LargeBinary(32), primary_key=True, doc="SHA-256 дайджест токена.")
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True,
+                     doc="Идентификатор владельца токена.")
+    family_id = Column(LargeBinary(16), nullable=False, index=True, doc="Идентификатор семейства токенов.")
+    expires_at = Column(Integer, nullable=False, doc="Время истечения (unix timestamp).")
+    used = Column(Boolean, nullable=False, default=False, doc="Токен уже обменян на новый.")
@@ -3,9 +3,13 @@
 
 Модуль содержит класс UserModel, представляющий таблицу `users` в базе данных.
 Описывает структуру таблицы и хранит информацию о пользователях приложения.
+
+Для SQLite местоположения пользователей дополнительно индексируются виртуальной таблицей
+R*Tree `users_geo` (USERS_GEO_DDL), а имена - полнотекстовым индексом FTS5 `users_fts`
+(USERS_FTS_DDL); оба индекса поддерживают триггеры на `users`.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Float, Index, MetaData, Table, DDL, event
 
 from . import Base
 
@@ -24,6 +28,9 @@ class UserModel(Base):
         email (str): Уникальный адрес электронной почты пользователя.
         hashed_password (str): Хэшированный пароль для аутентификации.
         is_active (bool): Флаг, отображающий активен ли пользователь; для soft delete.
+        latitude (float, optional): Широта местоположения пользователя.
+        longitude (float, optional): Долгота местоположения пользователя.
+        geohash (str, optional): Geohash местоположения; индекс близости для баз без R*Tree.
     """
 
     __tablename__ = "users"
@@ -37,6 +44,17 @@ class UserModel(Base):
     hashed_password = Column(String, comment="Хэшированный пароль для аутентификации.")
     is_active = Column(Boolean, default=True,
                        comment="Флаг активности пользователя; используется для мягкого удаления.")
+    latitude = Column(Float, nullable=True, comment="Широта местоположения пользователя.")
+    longitude = Column(Float, nullable=True, comment="Долгота местоположения пользователя.")
+    geohash = Column(String(12), index=True, nullable=True, comment="Geohash местоположения пользователя.")
+
+    __table_args__ = (
+        # Keyset-пагинация списка пользователей (WHERE ... AND id > :cursor ORDER BY id)
+        Index('ix_users_is_active_id', 'is_active', 'id'),
+        Index('ix_users_gender_is_active_id', 'gender', 'is_active', 'id'),
+        # ID не переиспользуются после удаления: по ним дочитываются новые пользователи (ранжирование)
+        {'sqlite_autoincrement': True},
+    )
 
     def __repr__(self) -> str:
         """Возвращает строковое представление экземпляра UserModel.
@@ -48,3 +66,53 @@ class UserModel(Base):
             f"UserModel(id={self.id}, email={self.email}, first_name={self.first_name}, "
             f"last_name={self.last_name}, is_active={self.is_active})"
         )
+
+
+# Индекс R*Tree по местоположению (только SQLite). Таблица не входит в метаданные моделей:
+# ее создает USERS_GEO_DDL, а триггеры обновляют ее в той же транзакции, что и users.
+users_geo = Table(
+    "users_geo", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float), Column("max_lat", Float),
+    Column("min_lon", Float), Column("max_lon", Float),
+)
+
+USERS_GEO_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_insert AFTER INSERT ON users "
+    "WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+    "INSERT INTO users_geo VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_update AFTER UPDATE OF latitude, longitude ON users BEGIN "
+    "DELETE FROM users_geo WHERE id = old.id; "
+    "INSERT INTO users_geo SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+    "WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL; END",
+    "CREATE TRIGGER IF NOT EXISTS users_geo_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_geo WHERE id = old.id; END",
+)
+
+# Полнотекстовый индекс имен (FTS5, только SQLite). Внешнее содержимое (content='users'):
+# индекс хранит только токены, сами строки читаются из users по rowid = users.id.
+# Скрытый столбец users_fts принимает запрос MATCH, rank - релевантность (bm25, меньше - лучше).
+users_fts = Table(
+    "users_fts", MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("first_name", String), Column("last_name", String),
+    Column("users_fts", String), Column("rank", Float),
+)
+
+USERS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(first_name, last_name, content='users', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF first_name, last_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); "
+    "INSERT INTO users_fts(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); END",
+)
+
+for _statement in USERS_GEO_DDL + USERS_FTS_DDL:
+    event.listen(UserModel.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
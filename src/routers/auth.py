@@ -1,21 +1,27 @@
 # routers/auth.py
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Header, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Header, Response, Cookie
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 
 from fastapi.responses import JSONResponse
 
 
+from config.settings import REFRESH_EXPIRES_SECONDS, REFRESH_COOKIE_SECURE
 from exceptions.exceptions import UserNotFound, TokenInvalid, TokenExpired
+from models.user import UserModel
 from schemas.errors import (BadRequestResponse, InternalServerErrorResponse,
-                            UnauthorizedResponse)
+                            UnauthorizedResponse, ServiceUnavailableResponse,
+                            TooManyRequestsResponse)
 from schemas.token import TokenData, TokenPayload, TokenVerification
 
 from services.authentication_service import AuthenticationService
+from services.refresh_token_service import RefreshTokenService
 from services.token_service import TokenGenerator
-from .dependencies import get_db, get_user_service, get_password_hasher, token_required
+from services.user_service import UserService
+from .dependencies import (get_db, get_user_service, get_password_hasher, token_required,
+                           get_refresh_token_service, login_rate_limit)
 
 logger = logging.getLogger(__name__)
 
@@ -23,26 +29,51 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
 router = APIRouter()
 
+REFRESH_COOKIE_NAME = "refresh_token"
+REFRESH_COOKIE_PATH = "/api/auth"
 
-def create_auth_response(token_data: TokenData) -> Response:
+
+def create_auth_response(token_data: TokenData, refresh_token: str) -> Response:
     """
     Create JSON response with the access token and set the refresh token in HTTP-only cookie.
 
     Args:
-        authentication (AuthTokens): The authentication response containing tokens.
+        token_data (TokenData): The access token and its lifetime.
+        refresh_token (str): The refresh token to put into the cookie.
 
     Returns:
         Response: FastAPI response object with access token in JSON and refresh token in cookie.
     """
-    logger.info(f"Создаем ответ для {token_data.access_token}")
+    logger.debug("Создаем ответ с токенами")
 
     response_data = token_data.dict()
     response = JSONResponse(content=response_data, status_code=200)
     # Set the refresh token in HTTP-only cookie
+    response.set_cookie(
+        key=REFRESH_COOKIE_NAME,
+        value=refresh_token,
+        max_age=REFRESH_EXPIRES_SECONDS,
+        path=REFRESH_COOKIE_PATH,
+        httponly=True,
+        secure=REFRESH_COOKIE_SECURE,
+        samesite="strict",
+    )
     logger.info("Auth response created")
 
     return response
 
+
+def build_token_payload(user: UserModel) -> TokenPayload:
+    """Формирует полезную нагрузку access-токена для пользователя."""
+    return TokenPayload(
+        id=user.id,
+        username=user.first_name,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        email=user.email,
+        exp=None  # Установим exp при генерации токена
+    )
+
 async def get_authentication_service(
         db=Depends(get_db),
         user_service=Depends(get_user_service),
@@ -56,39 +87,69 @@ async def get_authentication_service(
     response_model=TokenData,
     summary="Получение токена",
     description="Генерирует и возвращает JWT токен для аутентифицированного пользователя",
+    dependencies=[Depends(login_rate_limit)],
     responses={
         status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
         status.HTTP_401_UNAUTHORIZED: {"model": UnauthorizedResponse},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"model": TooManyRequestsResponse},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ServiceUnavailableResponse},
     },
 )
 async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
         auth_service: AuthenticationService = Depends(get_authentication_service),
+        refresh_service: RefreshTokenService = Depends(get_refresh_token_service),
 ) -> Response:
     try:
         # Пытаемся найти пользователя по email и проверить пароль
         user = await auth_service.authenticate_user(form_data.username, form_data.password)
 
-        # Создаем JWT токен
-        payload = TokenPayload(
-            id=user.id,
-            username=user.first_name,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            email=user.email,
-            exp=None  # Установим exp при генерации токена
-        )
-        token_data = TokenGenerator.generate_token(payload)
+        # Создаем JWT токен и refresh-токен нового семейства
+        token_data = TokenGenerator.generate_token(build_token_payload(user))
+        refresh_token = await refresh_service.issue(user.id)
 
         logger.info("User %s successfully logged in", user.first_name)
-        return create_auth_response(token_data)
+        return create_auth_response(token_data, refresh_token)
 
     except UserNotFound as e:
         logger.warning("Failed login attempt for user: %s", form_data.username)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
 
+@router.post(
+    "/refresh",
+    response_model=TokenData,
+    summary="Обновление токена",
+    description="Выдает новый JWT токен по refresh-токену из HTTP-only cookie без проверки пароля",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": UnauthorizedResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def refresh_access_token(
+        refresh_token: str | None = Cookie(default=None),
+        refresh_service: RefreshTokenService = Depends(get_refresh_token_service),
+        user_service: UserService = Depends(get_user_service),
+) -> Response:
+    if not refresh_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is missing")
+
+    try:
+        user_id, new_refresh_token = await refresh_service.rotate(refresh_token)
+        user = await user_service.get_user_by_id(user_id)
+    except TokenExpired as e:
+        logger.info("Refresh token expired: %s", e)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token expired. Log in again")
+    except (TokenInvalid, UserNotFound) as e:
+        logger.warning("Refresh rejected: %s", e)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+    token_data = TokenGenerator.generate_token(build_token_payload(user))
+    logger.info("Access token refreshed for user %d", user.id)
+    return create_auth_response(token_data, new_refresh_token)
+
+
 @router.post("/verify", response_model=TokenVerification,
              summary="Проверка токена",
              responses={
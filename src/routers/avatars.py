@@ -0,0 +1,195 @@
+"""
+Модуль: routers.avatars
+
+Определяет API-маршрут для выдачи файлов аватаров.
+Недостающие размеры аватара создаются при первом запросе.
+
+Выдача рассчитана на большой поток запросов в том же процессе, что и API:
+- открытые файлы и их метаданные берутся из LRU-кеша (AvatarFileCache);
+- если ASGI-сервер поддерживает расширение http.response.zerocopysend, файл отправляется
+  через sendfile, иначе читается по открытому дескриптору через os.pread;
+- строгий ETag по ключу содержимого из имени файла, If-None-Match (304), Range/If-Range (206/416);
+- файлы аватаров неизменяемы, поэтому отдаются с долгим Cache-Control immutable.
+"""
+import asyncio
+import logging
+import os
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from starlette.types import Receive, Scope, Send
+
+from config.settings import AVATAR_CACHE_MAX_AGE
+from schemas.errors import NotFoundResponse
+from services.avatar_derivatives import avatar_derivatives
+from services.avatar_file_cache import AvatarFile, AvatarFileCache, avatar_file_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Части меньше этого размера читаются прямо в цикле событий (из page cache это микросекунды)
+INLINE_READ_BYTES = 64 * 1024
+CHUNK_BYTES = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Если запрошенный диапазон лежит за пределами файла."""
+    pass
+
+
+def parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+
+    Args:
+        range_header (str): Значение заголовка, например 'bytes=0-99', 'bytes=100-' или 'bytes=-100',
+        size (int): Размер файла.
+
+    Returns:
+        tuple[int, int] | None: Начало и конец (включительно) или None, если заголовок
+                                не поддерживается (тогда отдается весь файл).
+
+    Raises:
+        RangeNotSatisfiable: Если диапазон за пределами файла.
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(0, size - suffix), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class AvatarFileResponse(Response):
+    """
+    Ответ с содержимым (или частью) открытого файла аватара.
+
+    После отправки файл возвращается в кеш через release().
+    """
+
+    def __init__(self, entry: AvatarFile, cache: AvatarFileCache, headers: dict[str, str],
+                 status_code: int = 200, start: int = 0, length: int | None = None, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers, media_type=entry.media_type)
+        self.entry = entry
+        self.cache = cache
+        self.start = start
+        self.length = entry.size - start if length is None else length
+        self.send_body = send_body
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body or self.length == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": self.entry.file,
+                            "offset": self.start, "count": self.length})
+            else:
+                await self._send_chunks(send)
+        finally:
+            self.cache.release(self.entry)
+
+    async def _send_chunks(self, send: Send) -> None:
+        """Отправляет файл частями, читая его по открытому дескриптору."""
+        offset, remaining = self.start, self.length
+        while remaining > 0:
+            size = min(CHUNK_BYTES, remaining)
+            if size <= INLINE_READ_BYTES:
+                chunk = os.pread(self.entry.fd, size, offset)
+            else:
+                chunk = await asyncio.to_thread(os.pread, self.entry.fd, size, offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Совпадает ли ETag со списком из If-None-Match (слабое сравнение: префикс W/ не учитывается).
+
+    Args:
+        if_none_match (str): Значение заголовка ("*" или ETag через запятую),
+        etag (str): ETag файла.
+    """
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+async def open_avatar(filename: str) -> AvatarFile:
+    """
+    Возвращает открытый файл аватара из кеша, при необходимости создавая запрошенный размер.
+
+    Raises:
+        HTTPException: 404, если аватар не найден.
+    """
+    entry = avatar_file_cache.acquire(filename)
+    if entry is not None:
+        return entry
+    try:
+        path = await avatar_derivatives.resolve(filename)
+        entry = await asyncio.to_thread(AvatarFile.open, path, filename)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Аватар не найден")
+    return avatar_file_cache.add(filename, entry)
+
+
+@router.api_route(
+    "/{filename}",
+    methods=["GET", "HEAD"],
+    summary="Получение аватара",
+    description=("Возвращает файл аватара с ETag и поддержкой Range; недостающий размер "
+                 "(например, <имя>_thumb.webp) создается при первом запросе"),
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundResponse},
+    },
+)
+async def get_avatar(filename: str, request: Request) -> Response:
+    entry = await open_avatar(filename)
+    headers = {
+        "etag": entry.etag,
+        "cache-control": f"public, max-age={AVATAR_CACHE_MAX_AGE}, immutable",
+        "accept-ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        avatar_file_cache.release(entry)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    send_body = request.method != "HEAD"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range сравнивается строго: слабый ETag (W/...) не совпадает
+    if range_header and (if_range is None or if_range.strip() == entry.etag):
+        try:
+            byte_range = parse_range(range_header, entry.size)
+        except RangeNotSatisfiable:
+            avatar_file_cache.release(entry)
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                            headers={**headers, "content-range": f"bytes */{entry.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{entry.size}"
+            return AvatarFileResponse(entry, avatar_file_cache, headers, status.HTTP_206_PARTIAL_CONTENT,
+                                      start=start, length=end - start + 1, send_body=send_body)
+
+    return AvatarFileResponse(entry, avatar_file_cache, headers, send_body=send_body)
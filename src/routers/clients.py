@@ -4,36 +4,72 @@
 Определяет API-маршруты для управления клиентами в приложении.
 """
 import asyncio
+import io
 import logging
-from typing import Union
+import uuid
+from typing import Literal, Union
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, Response, status
+from pydantic import EmailStr
 
-from config.settings import WATERMARK_PATH, AVATAR_URL_PREFIX
+from config.settings import (AVATAR_URL_PREFIX, AVATAR_MAX_BYTES, AVATAR_UPLOAD_CHUNK_BYTES,
+                             AVATAR_SPOOL_THRESHOLD_BYTES, JOB_MAX_ATTEMPTS, USER_IMPORT_API_AVATAR_HOSTS)
 from exceptions.exceptions import (UserNotFound, EmailAlreadyRegistered,
                                    FileProcessingError, FileValidationError,
-                                   DatabaseError)
+                                   DatabaseError, PasswordHasherOverloaded, LikeBufferOverloaded)
 from models.user import UserModel
 from schemas.errors import (BadRequestResponse, InternalServerErrorResponse,
-                            NotFoundResponse, EmailAlreadyRegisteredResponse)
+                            NotFoundResponse, EmailAlreadyRegisteredResponse,
+                            ServiceUnavailableResponse)
+from schemas.job import JobStatusResponse, RegistrationAcceptedResponse
 from schemas.token import TokenVerification
-from schemas.user import UserCreate, UserResponse
+from schemas.user import (UserCreate, UserResponse, EmailAvailabilityResponse, LikeResponse, LocationUpdate,
+                          NearbyUserResponse, UserListItem)
+from schemas.user_import import ImportRowErrorResponse, UserImportResponse
+from services.avatar_derivatives import avatar_derivatives
+from services.avatar_jobs import AVATAR_JOB, INCOMING_PREFIX
+from services.avatar_storage import avatar_storage
+from services.image_processor import ImageProcessingExecutor
 from services.image_service import LocalImageService
 from services.image_validation_service import ImageValidationService
+from services.job_queue import JobQueue
+from services.feed_service import FeedService
 from services.like_service import LikeService
+from services.upload_buffer import UploadBuffer
+from services.user_import import IMPORT_FORMATS, ImportRowError, UserImporter, detect_format
 from services.user_service import UserService
-from services.watermark_service import WatermarkService
-from .dependencies import get_user_service, get_like_service, token_required
+from .dependencies import (get_user_service, get_user_reader, get_like_service, get_like_reader, get_feed_service,
+                           get_image_processor, get_job_queue, get_job_reader, import_access_required, token_required)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Сколько отклоненных строк импорта возвращать в ответе
+IMPORT_ERRORS_LIMIT = 1000
+# Ограничения поиска поблизости
+NEARBY_MAX_RADIUS_KM = 500
+NEARBY_MAX_LIMIT = 100
+# Сколько анкет можно получить из очереди просмотра за один запрос
+FEED_MAX_COUNT = 50
 
-def get_watermark_service() -> WatermarkService:
-    """Возвращает экземпляр WatermarkService для наложения водяного знака"""
-    return WatermarkService(WATERMARK_PATH)
+
+async def read_avatar(avatar: UploadFile) -> UploadBuffer:
+    """
+    Читает загруженный аватар частями.
+
+    Сначала читаются первые байты, и неподдерживаемый формат отклоняется до чтения остального файла;
+    затем файл читается частями, и чтение прерывается, как только превышен AVATAR_MAX_BYTES.
+    Крупные файлы сбрасываются во временный файл, а не держатся в памяти.
+
+    Raises:
+        FileValidationError: Если формат не поддерживается или файл слишком большой.
+    """
+    header = await avatar.read(ImageValidationService.HEADER_SIZE)
+    ImageValidationService.sniff_format(header)
+    return await UploadBuffer.from_upload(avatar, AVATAR_MAX_BYTES, AVATAR_SPOOL_THRESHOLD_BYTES,
+                                          AVATAR_UPLOAD_CHUNK_BYTES, prefix=header)
 
 
 def handle_exception(exception, status_code):
@@ -57,26 +93,26 @@ def handle_exception(exception, status_code):
         status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
         status.HTTP_409_CONFLICT: {"model": EmailAlreadyRegisteredResponse},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ServiceUnavailableResponse},
     },
 )
 async def create_client(
         user: UserCreate = Depends(UserCreate.as_form),
         avatar: UploadFile = File(...),
         user_service: UserService = Depends(get_user_service),
-        watermark_service: WatermarkService = Depends(get_watermark_service),
+        image_processor: ImageProcessingExecutor = Depends(get_image_processor),
 ) -> UserResponse:
 
     user_name = user.email
     logger.info(f"Создание нового пользователя {user_name} инициировано")
-    unique_name = LocalImageService.generate_unique_filename('.png')
-    avatar_url = f"{AVATAR_URL_PREFIX}/{unique_name}"
 
-    async def process_image() -> Union[None, HTTPException]:
+    async def process_image() -> Union[str, HTTPException]:
         try:
-            file_data = await avatar.read()
-            ImageValidationService.validate_image(file_data)
-            image_with_watermark = watermark_service.add_watermark(file_data)
-            await LocalImageService.upload_image(image_with_watermark, unique_name)
+            with await read_avatar(avatar) as upload:
+                # Проверка и наложение водяного знака выполняются в пуле процессов
+                image_with_watermark = await image_processor.process(upload.view())
+            # Имя файла - хеш содержимого, поэтому URL аватара известен только после обработки
+            return await LocalImageService.upload_image(image_with_watermark, avatar_derivatives.extension)
         except FileValidationError as e:
             return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         except FileProcessingError as e:
@@ -85,9 +121,11 @@ async def create_client(
 
     async def save_user() -> Union['UserModel', HTTPException]:
         try:
-            return await user_service.create_user(user, avatar_url)
+            return await user_service.create_user(user, None)
         except EmailAlreadyRegistered as e:
             return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except PasswordHasherOverloaded as e:
+            return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
         except DatabaseError as e:
             return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                  detail=f"User creation error: {str(e)}")
@@ -104,8 +142,11 @@ async def create_client(
 
         # Логика определения ошибки
         if isinstance(process_image_result, HTTPException) and isinstance(db_user_result, HTTPException):
-            if (process_image_result.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-                    or db_user_result.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR):
+            # Перегрузка хеширования - временная ошибка: отвечаем 503, как и при единственной ошибке
+            if db_user_result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                handle_exception(db_user_result.detail, db_user_result.status_code)
+            if (process_image_result.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR
+                    or db_user_result.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR):
                 handle_exception("Обе операции завершились с внутренней ошибкой сервера",
                                  status.HTTP_500_INTERNAL_SERVER_ERROR)
             else:
@@ -126,17 +167,20 @@ async def create_client(
 
             handle_exception(process_image_result.detail, process_image_result.status_code)
 
-        # Если пользователя не удалось создать, удаляем изображение
+        # Если пользователя не удалось создать, отдаем изображение сборщику мусора
+        # (такой же файл может использоваться другим пользователем)
         if isinstance(db_user_result, HTTPException):
             try:
-                await LocalImageService.delete_image(unique_name)
-                logger.info(f"Операции сброшены, изображение {unique_name} удалено.")
+                await user_service.avatar_blobs.discard(process_image_result)
+                logger.info(f"Операции сброшены, изображение {process_image_result} освобождено.")
             except Exception as deletion_error:
-                logger.error(f"Ошибка при удалении изображения: {deletion_error}")
+                logger.error(f"Ошибка при освобождении изображения: {deletion_error}")
 
             handle_exception(db_user_result.detail, db_user_result.status_code)
 
-        # Если успешно, db_user_result - это объект пользователя
+        # Если успешно, db_user_result - это объект пользователя, а process_image_result - имя файла
+        db_user_result = await user_service.set_avatar_url(db_user_result,
+                                                           f"{AVATAR_URL_PREFIX}/{process_image_result}")
         logger.info(f"Пользователь {db_user_result.email} успешно создан")
         return UserResponse.from_orm(db_user_result)
 
@@ -158,6 +202,7 @@ async def create_client(
         status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
         status.HTTP_409_CONFLICT: {"model": EmailAlreadyRegisteredResponse},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ServiceUnavailableResponse},
 
     },
 )
@@ -165,33 +210,337 @@ async def create_client_simple(
         user: UserCreate = Depends(UserCreate.as_form),
         avatar: UploadFile = File(...),
         user_service: UserService = Depends(get_user_service),
-        watermark_service: WatermarkService = Depends(get_watermark_service)
+        image_processor: ImageProcessingExecutor = Depends(get_image_processor)
 ) -> UserResponse:
 
     logger.info("Создание нового пользователя инициировано")
-    unique_name = LocalImageService.generate_unique_filename('.png')
-    avatar_url = f"{AVATAR_URL_PREFIX}/{unique_name}"
+    avatar_url = None
+    db_user = None
 
     try:
 
-        file_data = await avatar.read()
-
-        # Проверим, что файл является изображением
-        ImageValidationService.validate_image(file_data)
-        # Наложение водяного знака
-        image_with_watermark = watermark_service.add_watermark(file_data)
-        await LocalImageService.upload_image(image_with_watermark, unique_name)
+        with await read_avatar(avatar) as upload:
+            # Проверка изображения и наложение водяного знака в пуле процессов
+            image_with_watermark = await image_processor.process(upload.view())
+        unique_name = await LocalImageService.upload_image(image_with_watermark, avatar_derivatives.extension)
+        avatar_url = f"{AVATAR_URL_PREFIX}/{unique_name}"
 
         db_user = await user_service.create_user(user, avatar_url)
-        logger.info(f"Пользователь {db_user.email} успешно создан")
-        return UserResponse.from_orm(db_user)
-    except EmailAlreadyRegistered as e:
-        handle_exception(e, status.HTTP_409_CONFLICT)
-    except FileValidationError as e:
-        handle_exception(e, status.HTTP_400_BAD_REQUEST)
-    except (FileProcessingError, Exception) as e:
+    except Exception as e:
+        # Сохраненный файл без пользователя отдаем сборщику мусора при любой ошибке
+        if avatar_url is not None and db_user is None:
+            try:
+                await user_service.avatar_blobs.discard(avatar_url)
+            except Exception as cleanup_error:
+                logger.error(f"Ошибка при освобождении изображения: {cleanup_error}")
+        if isinstance(e, EmailAlreadyRegistered):
+            handle_exception(e, status.HTTP_409_CONFLICT)
+        if isinstance(e, FileValidationError):
+            handle_exception(e, status.HTTP_400_BAD_REQUEST)
+        if isinstance(e, PasswordHasherOverloaded):
+            handle_exception(e, status.HTTP_503_SERVICE_UNAVAILABLE)
         handle_exception(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    logger.info(f"Пользователь {db_user.email} успешно создан")
+    return UserResponse.from_orm(db_user)
+
+
+@router.post(
+    "/create_async",
+    response_model=RegistrationAcceptedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Создание клиента (асинхронное)",
+    description=("Сохраняет неактивного клиента и исходный аватар и сразу возвращает 202; "
+                 "аватар обрабатывается фоновым воркером, состояние - по адресу status_url"),
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
+        status.HTTP_409_CONFLICT: {"model": EmailAlreadyRegisteredResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ServiceUnavailableResponse},
+    },
+)
+async def create_client_async(
+        request: Request,
+        response: Response,
+        user: UserCreate = Depends(UserCreate.as_form),
+        avatar: UploadFile = File(...),
+        user_service: UserService = Depends(get_user_service),
+        job_queue: JobQueue = Depends(get_job_queue),
+) -> RegistrationAcceptedResponse:
+
+    logger.info("Асинхронное создание пользователя инициировано")
+    upload_key = f"{INCOMING_PREFIX}{uuid.uuid4().hex}"
+    db_user = None
+
+    try:
+        # В запросе только дешевые проверки (формат по сигнатуре, размер); декодирование - в воркере
+        with await read_avatar(avatar) as upload:
+            await avatar_storage.put(upload_key, upload.view())
+        db_user = await user_service.create_user(user, None, is_active=False)
+        job = await job_queue.enqueue(AVATAR_JOB, {"user_id": db_user.id, "upload_key": upload_key},
+                                      JOB_MAX_ATTEMPTS)
+    except Exception as e:
+        try:
+            await avatar_storage.delete(upload_key, with_variants=False)
+            if db_user is not None:
+                await user_service.delete_inactive_user(db_user.id)
+        except Exception as cleanup_error:
+            logger.error(f"Ошибка при отмене регистрации: {cleanup_error}")
+        if isinstance(e, EmailAlreadyRegistered):
+            handle_exception(e, status.HTTP_409_CONFLICT)
+        if isinstance(e, FileValidationError):
+            handle_exception(e, status.HTTP_400_BAD_REQUEST)
+        if isinstance(e, PasswordHasherOverloaded):
+            handle_exception(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+        handle_exception(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    status_url = str(request.url_for("get_job_status", job_id=job.id))
+    response.headers["Location"] = status_url
+    logger.info(f"Пользователь {db_user.email} принят, задача {job.id}")
+    return RegistrationAcceptedResponse(user_id=db_user.id, job=JobStatusResponse.from_job(job),
+                                        status_url=status_url)
+
+
+@router.post(
+    "/import",
+    response_model=UserImportResponse,
+    summary="Массовый импорт клиентов",
+    description=("Импортирует клиентов из CSV или NDJSON (email, password, first_name, last_name, gender, "
+                 "avatar - URL аватара с хостов из USER_IMPORT_API_AVATAR_HOSTS); требует служебный ключ "
+                 "в заголовке X-Import-Key; для больших файлов предпочтительна команда manage_users.py import"),
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
+        status.HTTP_403_FORBIDDEN: {"description": "Импорт через API отключен или не передан служебный ключ."},
+    },
+    dependencies=[Depends(import_access_required)],
+)
+async def import_clients(
+        file: UploadFile = File(...),
+        fmt: str | None = Query(None, alias="format", description="csv или ndjson; по умолчанию - по расширению"),
+        user_service: UserService = Depends(get_user_service),
+        verification: TokenVerification = Depends(token_required),
+) -> UserImportResponse:
+    fmt = fmt or detect_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Неподдерживаемый формат: {fmt}")
+
+    logger.info(f"Импорт клиентов из {file.filename} инициирован пользователем {verification.id}")
+    errors: list[ImportRowError] = []
+    failed = 0
+
+    def collect(error: ImportRowError) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_ERRORS_LIMIT:
+            errors.append(error)
+
+    # Загруженный файл читается потоково, без чтения целиком в память
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        # Аватары по URL - только с разрешенных хостов: иначе сервер загружал бы любые адреса по запросу клиента
+        importer = UserImporter(user_service, avatar_hosts=USER_IMPORT_API_AVATAR_HOSTS)
+        stats = await importer.run(stream, fmt, collect)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Файл должен быть в UTF-8: {e}")
+    finally:
+        stream.detach()
+    return UserImportResponse(
+        rows=stats.rows, imported=stats.imported, failed=stats.failed, batches=stats.batches,
+        seconds=round(stats.seconds, 3), rows_per_second=round(stats.rows_per_second, 1),
+        errors=[ImportRowErrorResponse(line=error.line, email=error.email, error=error.error) for error in errors],
+        errors_truncated=failed > len(errors),
+    )
+
+
+@router.get(
+    "/email_available",
+    response_model=EmailAvailabilityResponse,
+    summary="Проверка email",
+    description="Проверяет, свободен ли email, при заполнении формы регистрации (по уникальному индексу в БД)",
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def check_email_available(
+        email: EmailStr = Query(..., description="Электронная почта пользователя."),
+        user_service: UserService = Depends(get_user_reader),
+) -> EmailAvailabilityResponse:
+    try:
+        return EmailAvailabilityResponse(email=email, available=not await user_service.email_exists(email))
+    except Exception as e:
+        logger.error(f"Ошибка проверки email: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    summary="Состояние фоновой задачи",
+    description="Возвращает состояние задачи, например обработки аватара при асинхронной регистрации",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundResponse},
+    },
+)
+async def get_job_status(
+        job_id: str,
+        job_queue: JobQueue = Depends(get_job_reader),
+) -> JobStatusResponse:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    return JobStatusResponse.from_job(job)
+
+
+@router.put(
+    "/location",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Местоположение текущего пользователя",
+    description="Сохраняет местоположение владельца токена для поиска поблизости",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def update_location(
+        location: LocationUpdate,
+        user_service: UserService = Depends(get_user_service),
+        verification: TokenVerification = Depends(token_required)
+) -> Response:
+    try:
+        await user_service.set_location(verification.id, location.latitude, location.longitude)
+    except UserNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка сохранения местоположения: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/nearby",
+    response_model=list[NearbyUserResponse],
+    summary="Пользователи поблизости",
+    description=("Активные пользователи в радиусе radius_km, ближайшие первыми. По умолчанию центр - "
+                 "сохраненное местоположение владельца токена"),
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": BadRequestResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def get_nearby_users(
+        radius_km: float = Query(..., gt=0, le=NEARBY_MAX_RADIUS_KM, description="Радиус поиска в километрах"),
+        latitude: float | None = Query(None, ge=-90, le=90, description="Широта центра"),
+        longitude: float | None = Query(None, ge=-180, le=180, description="Долгота центра"),
+        gender: Literal['male', 'female'] | None = Query(None, description="Пол"),
+        limit: int = Query(20, ge=1, le=NEARBY_MAX_LIMIT, description="Максимальное число результатов"),
+        user_service: UserService = Depends(get_user_reader),
+        verification: TokenVerification = Depends(token_required)
+) -> list[NearbyUserResponse]:
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Широта и долгота задаются вместе")
+    try:
+        if latitude is None:
+            db_user = await user_service.get_user_by_id(verification.id)
+            latitude, longitude = db_user.latitude, db_user.longitude
+            if latitude is None or longitude is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="Местоположение не задано")
+        found = await user_service.find_nearby(latitude, longitude, radius_km, limit, gender,
+                                               exclude_id=verification.id)
+    except HTTPException:
+        raise
+    except UserNotFound as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка поиска пользователей поблизости: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return [NearbyUserResponse.model_validate({**row._mapping, "distance_km": round(distance, 3)})
+            for row, distance in found]
+
+
+@router.get(
+    "/feed",
+    response_model=list[UserListItem],
+    summary="Следующие анкеты",
+    description=("Следующие анкеты из очереди просмотра текущего пользователя (без уже лайкнутых). "
+                 "Анкета уходит из очереди после лайка или пропуска"),
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def get_feed(
+        count: int = Query(10, ge=1, le=FEED_MAX_COUNT, description="Сколько анкет вернуть"),
+        feed_service: FeedService = Depends(get_feed_service),
+        verification: TokenVerification = Depends(token_required)
+) -> list[UserListItem]:
+    try:
+        rows = await feed_service.next_candidates(verification.id, count)
+    except Exception as e:
+        logger.error(f"Ошибка получения очереди анкет: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return [UserListItem.model_validate(row) for row in rows]
+
+
+@router.post(
+    "/feed/{candidate_id}/skip",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Пропуск анкеты",
+    description="Убирает анкету из очереди просмотра без лайка; она вернется после полного круга",
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def skip_feed_candidate(
+        candidate_id: int,
+        feed_service: FeedService = Depends(get_feed_service),
+        verification: TokenVerification = Depends(token_required)
+) -> Response:
+    try:
+        await feed_service.skip(verification.id, candidate_id)
+    except Exception as e:
+        logger.error(f"Ошибка пропуска анкеты: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/likes",
+    response_model=list[int],
+    summary="Лайки текущего пользователя",
+    description="ID пользователей, которых лайкнул текущий пользователь, включая еще не записанные в БД",
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def get_my_likes(
+        like_service: LikeService = Depends(get_like_reader),
+        verification: TokenVerification = Depends(token_required)
+) -> list[int]:
+    try:
+        return await like_service.get_liked_user_ids(verification.id)
+    except Exception as e:
+        logger.error(f"Ошибка получения лайков: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+
 
 @router.get(
     "/{user_id}",
@@ -206,7 +555,7 @@ async def create_client_simple(
 )
 async def get_user_by_id(
         user_id: int,
-        user_service: UserService = Depends(get_user_service),
+        user_service: UserService = Depends(get_user_reader),
 ) -> UserResponse:
 
     logger.info(f"Поиск пользователя по ID: {user_id}")
@@ -227,44 +576,41 @@ async def get_user_by_id(
 @router.post(
     "/{user_id}/match",
     status_code=status.HTTP_201_CREATED,
+    response_model=LikeResponse,
     summary="Лайк пользователя",
-    description="Позволяет лайкнуть пользователя",
+    description="Позволяет лайкнуть пользователя; matched=true, если пользователи лайкнули друг друга",
     responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "A user cannot match themselves."},
         status.HTTP_404_NOT_FOUND: {"description": "User not found."},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "Internal Server Error."},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ServiceUnavailableResponse},
     },
 )
 async def create_match(
         user_id: int,
-        user_service: UserService = Depends(get_user_service),
         like_service: LikeService = Depends(get_like_service),
         verification: TokenVerification = Depends(token_required)
-):
+) -> LikeResponse:
     matched_user_id = user_id
     source_user_id = verification.id
     logger.info(f"Attempting to create a match between user {source_user_id} and {matched_user_id}")
+    if source_user_id == matched_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A user cannot match themselves."
+        )
     try:
-
-        # Ensure matched users exist
-        matched_user = await user_service.get_user_by_id(matched_user_id)
-
-        if source_user_id == matched_user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="A user cannot match themselves."
-            )
-        # if match
-
-        # Create a new match between users
-
-        await like_service.create_like(source_user_id, matched_user_id)
+        # Существование получателя проверяется в том же запросе, что и вставка лайка,
+        # а взаимная симпатия записывается в той же транзакции
+        result = await like_service.like(source_user_id, matched_user_id)
 
         logger.info(f"Successfully created a match between {source_user_id} and {matched_user_id}")
-        return {"message": "Match created"}
-
+        return LikeResponse(message="Match created", matched=result.matched)
 
     except UserNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except LikeBufferOverloaded as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating match: {e}")
         raise HTTPException(
@@ -1,16 +1,26 @@
 # routers.dependencies
 from typing import AsyncGenerator
+import hmac
 import logging
-from fastapi import Depends, HTTPException, Header, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Header, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
-from config.database import SessionLocal
+from config.database import ReadSessionLocal, SessionLocal
+from config.settings import LIKE_BUFFER_ENABLED, RANKING_ENABLED, USER_IMPORT_API_ENABLED, USER_IMPORT_API_KEY
 from services.authentication_service import AuthenticationService
+from services.image_processor import ImageProcessingExecutor, image_processor
 from services.password_hasher import PasswordHasher
 from services.user_service import UserService
+from services.user_search import UserSearchService
+from services.feed_service import FeedService
+from services.like_buffer import like_buffer
 from services.like_service import LikeService
+from services.ranking import ranking_engine
+from services.job_queue import JobQueue
+from services.rate_limiter import login_rate_limiter
+from services.refresh_token_service import RefreshTokenService
 from services.token_service import TokenVerifier
 from schemas.headers import AuthorizationHeaders
 from exceptions.exceptions import TokenExpired, TokenInvalid
@@ -25,6 +35,12 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия только для чтения (пул читателей) - для маршрутов, которые ничего не изменяют."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
 async def get_password_hasher() -> PasswordHasher:
     return PasswordHasher()
 
@@ -33,13 +49,47 @@ async def get_token_verifier() -> TokenVerifier:
     return TokenVerifier()
 
 
+async def get_image_processor() -> ImageProcessingExecutor:
+    return image_processor
+
+
 async def get_user_service(db: AsyncSession = Depends(get_db),
                            hasher: PasswordHasher = Depends(get_password_hasher)) -> UserService:
     return UserService(db, hasher)
 
 
+async def get_user_reader(db: AsyncSession = Depends(get_read_db),
+                          hasher: PasswordHasher = Depends(get_password_hasher)) -> UserService:
+    return UserService(db, hasher)
+
+
+async def get_user_search_service(db: AsyncSession = Depends(get_read_db)) -> UserSearchService:
+    return UserSearchService(db)
+
+
 async def get_like_service(db: AsyncSession = Depends(get_db)) -> LikeService:
-    return LikeService(db)
+    return LikeService(db, like_buffer if LIKE_BUFFER_ENABLED else None)
+
+
+async def get_like_reader(db: AsyncSession = Depends(get_read_db)) -> LikeService:
+    return LikeService(db, like_buffer if LIKE_BUFFER_ENABLED else None)
+
+
+async def get_feed_service(db: AsyncSession = Depends(get_db)) -> FeedService:
+    return FeedService(db, like_buffer if LIKE_BUFFER_ENABLED else None,
+                       ranker=ranking_engine if RANKING_ENABLED else None)
+
+
+async def get_job_queue(db: AsyncSession = Depends(get_db)) -> JobQueue:
+    return JobQueue(db)
+
+
+async def get_job_reader(db: AsyncSession = Depends(get_read_db)) -> JobQueue:
+    return JobQueue(db)
+
+
+async def get_refresh_token_service(db: AsyncSession = Depends(get_db)) -> RefreshTokenService:
+    return RefreshTokenService(db)
 
 
 async def get_authentication_service(
@@ -50,11 +100,31 @@ async def get_authentication_service(
     return AuthenticationService(db, user_service, password_hasher)
 
 
+async def login_rate_limit(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    """
+    Dependency to throttle login attempts by email and client IP.
+
+    Runs before any DB lookup or bcrypt work; raises RateLimitExceeded (429 with Retry-After).
+    """
+    client_ip = request.client.host if request.client else None
+    await login_rate_limiter.check(form_data.username, client_ip)
+
+
+async def import_access_required(x_import_key: Annotated[str | None, Header()] = None) -> None:
+    """Dependency: bulk import is allowed only with the internal key from USER_IMPORT_API_KEY."""
+    if not USER_IMPORT_API_ENABLED:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Импорт через API отключен")
+    if not USER_IMPORT_API_KEY or x_import_key is None or \
+            not hmac.compare_digest(x_import_key.encode(), USER_IMPORT_API_KEY.encode()):
+        logger.warning("Импорт через API отклонен: неверный служебный ключ")
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Импорт требует служебный ключ")
+
+
 async def token_required(authorization: Annotated[AuthorizationHeaders, Header()],
                          token: str = Depends(oauth2_scheme),
                          token_verifier: TokenVerifier = Depends(get_token_verifier)):
     """Dependency to verify the presence and validity of a Bearer token in the request headers."""
-    logger.info(f"TOKEN_REQUIRED called for {token}, header: {authorization.authorization}")
+    logger.debug("TOKEN_REQUIRED called")
 
     # token = authorization.token() # I like this method more than use OAuth2PasswordBearer but now...
 
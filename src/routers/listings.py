@@ -0,0 +1,85 @@
+"""
+Модуль: routers.listings
+
+Определяет API-маршрут для просмотра списка клиентов.
+
+Список отдается страницами с keyset-пагинацией по ID: клиент передает next_cursor
+предыдущей страницы в параметре cursor. В отличие от OFFSET, стоимость каждой страницы
+не растет с ее номером. Поиск по имени и фамилии использует полнотекстовый индекс FTS5.
+Неактивные пользователи в результаты не попадают.
+"""
+import logging
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from schemas.errors import InternalServerErrorResponse
+from schemas.user import UserListItem, UserListResponse
+from services.user_search import UserSearchService
+from services.user_service import UserService
+
+from .dependencies import get_user_reader, get_user_search_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+LIST_DEFAULT_LIMIT = 20
+LIST_MAX_LIMIT = 100
+SEARCH_MAX_LIMIT = 50
+
+
+@router.get(
+    "/clients",
+    response_model=UserListResponse,
+    summary="Список клиентов",
+    description="Активные клиенты по возрастанию ID с фильтрами по полу и началу имени или фамилии, "
+                "без авторизации",
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def list_clients(
+        cursor: int | None = Query(None, ge=0, description="next_cursor предыдущей страницы"),
+        limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT, description="Размер страницы"),
+        gender: Literal['male', 'female'] | None = Query(None, description="Пол"),
+        name: str | None = Query(None, min_length=1, max_length=64,
+                                 description="Начало имени или фамилии (с учетом регистра)"),
+        user_service: UserService = Depends(get_user_reader),
+) -> UserListResponse:
+    try:
+        rows, next_cursor = await user_service.list_users(limit, cursor, gender, name)
+    except Exception as e:
+        logger.error(f"Ошибка получения списка клиентов: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return UserListResponse(items=[UserListItem.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+
+@router.get(
+    "/clients/search",
+    response_model=list[UserListItem],
+    summary="Поиск клиентов",
+    description="Полнотекстовый поиск активных клиентов по словам (и началам слов) из имени и фамилии, "
+                "самые релевантные первыми, без авторизации",
+    responses={
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": InternalServerErrorResponse},
+    },
+)
+async def search_clients(
+        q: str = Query(..., min_length=1, max_length=100, description="Текст поиска"),
+        gender: Literal['male', 'female'] | None = Query(None, description="Пол"),
+        limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT, description="Максимальное число результатов"),
+        search_service: UserSearchService = Depends(get_user_search_service),
+) -> list[UserListItem]:
+    try:
+        rows = await search_service.search(q, limit, gender)
+    except Exception as e:
+        logger.error(f"Ошибка поиска клиентов: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+    return [UserListItem.model_validate(row) for row in rows]
@@ -80,3 +80,29 @@ class UnauthorizedResponse(ErrorResponse):
         "Пользователь не авторизован",
         description="Стандартное сообщение для не верной авторизации"
     )
+
+
+class ServiceUnavailableResponse(ErrorResponse):
+    """
+    Сообщение об ошибке 503 Service Unavailable.
+
+    Attributes:
+        detail (str): Описание ошибки.
+    """
+    detail: str = Field(
+        "Сервис перегружен, повторите попытку позже",
+        description="Стандартное сообщение для временной перегрузки сервиса."
+    )
+
+
+class TooManyRequestsResponse(ErrorResponse):
+    """
+    Сообщение об ошибке 429 Too Many Requests.
+
+    Attributes:
+        detail (str): Описание ошибки.
+    """
+    detail: str = Field(
+        "Слишком много попыток, повторите позже",
+        description="Стандартное сообщение при превышении лимита частоты запросов."
+    )
@@ -0,0 +1,50 @@
+"""
+Модуль: schemas.job
+
+Определяет схемы данных для фоновых задач и асинхронной регистрации.
+
+Состав:
+- JobStatusResponse: Состояние фоновой задачи.
+- RegistrationAcceptedResponse: Ответ 202 на асинхронную регистрацию.
+"""
+
+from pydantic import BaseModel, Field
+
+from models.job import JobModel
+
+
+class JobStatusResponse(BaseModel):
+    """Схема состояния фоновой задачи.
+
+    Attributes:
+        id (str): Идентификатор задачи.
+        kind (str): Тип задачи.
+        status (str): 'queued', 'running', 'done' или 'failed'.
+        attempts (int): Число выполненных попыток.
+        error (str | None): Ошибка последней попытки.
+        user_id (int | None): Пользователь, к которому относится задача.
+    """
+    id: str = Field(..., description="Идентификатор задачи.")
+    kind: str = Field(..., description="Тип задачи.")
+    status: str = Field(..., description="Статус: queued, running, done или failed.")
+    attempts: int = Field(..., description="Число выполненных попыток.")
+    error: str | None = Field(None, description="Ошибка последней попытки.")
+    user_id: int | None = Field(None, description="Пользователь, к которому относится задача.")
+
+    @classmethod
+    def from_job(cls, job: JobModel) -> "JobStatusResponse":
+        return cls(id=job.id, kind=job.kind, status=job.status, attempts=job.attempts,
+                   error=job.last_error, user_id=job.payload.get("user_id"))
+
+
+class RegistrationAcceptedResponse(BaseModel):
+    """Схема ответа на асинхронную регистрацию.
+
+    Attributes:
+        user_id (int): Идентификатор пользователя (станет доступен после обработки аватара).
+        job (JobStatusResponse): Задача обработки аватара.
+        status_url (str): URL для проверки состояния задачи.
+    """
+    user_id: int = Field(..., description="Идентификатор пользователя; активируется после обработки аватара.")
+    job: JobStatusResponse = Field(..., description="Задача обработки аватара.")
+    status_url: str = Field(..., description="URL для проверки состояния задачи.")
@@ -29,7 +29,7 @@ class TokenPayload(BaseModel):
     exp: datetime | None = Field(default=None, description="Expiration time, set during token generation")
 
     def to_response(self) -> 'TokenVerification':
-        logger.info(f"to_response called: {self.dict()}")
+        logger.debug("to_response called for user %s", self.id)
         res = TokenVerification(
             id=self.id,
             username=self.username,
@@ -39,7 +39,7 @@ class TokenPayload(BaseModel):
             exp=self.exp.isoformat(),
             success=True
         )
-        logger.info(f"ro_response done: {res}")
+        logger.debug("to_response done for user %s", self.id)
         return res
 
 
@@ -8,7 +8,9 @@
 from typing import Literal
 
 from fastapi import Form
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, computed_field
+
+from services.avatar_derivatives import avatar_derivatives
 
 
 class UserCreate(BaseModel):
@@ -75,6 +77,7 @@ class UserResponse(BaseModel):
         last_name (str): Фамилия пользователя.
         gender (str): Пол пользователя.
         avatar_url (str | None): URL аватара пользователя, если есть.
+        avatar_variants (dict[str, str] | None): URL аватара в каждом из размеров (например, thumb, card, full).
     """
     id: int = Field(..., description="Уникальный идентификатор пользователя.")
     email: EmailStr = Field(..., description="Адрес электронной почты пользователя.")
@@ -83,6 +86,91 @@ class UserResponse(BaseModel):
     gender: str = Field(..., description="Пол пользователя.")
     avatar_url: str | None = Field(None, description="URL аватара пользователя.")
 
+    @computed_field(description="URL аватара в каждом из размеров; недостающие размеры создаются при первом запросе.")
+    @property
+    def avatar_variants(self) -> dict[str, str] | None:
+        return avatar_derivatives.variant_urls(self.avatar_url)
+
     class Config:
         from_attributes = True
         """Поддержка работы с ORM моделями, позволяет доступ к атрибутам."""
+
+
+class UserListItem(BaseModel):
+    """Схема пользователя в списке (без email).
+
+    Attributes:
+        id (int): Уникальный идентификатор пользователя.
+        first_name (str): Имя пользователя.
+        last_name (str): Фамилия пользователя.
+        gender (str): Пол пользователя.
+        avatar_url (str | None): URL аватара пользователя, если есть.
+        avatar_variants (dict[str, str] | None): URL аватара в каждом из размеров.
+    """
+    id: int = Field(..., description="Уникальный идентификатор пользователя.")
+    first_name: str = Field(..., description="Имя пользователя.")
+    last_name: str = Field(..., description="Фамилия пользователя.")
+    gender: str = Field(..., description="Пол пользователя.")
+    avatar_url: str | None = Field(None, description="URL аватара пользователя.")
+
+    @computed_field(description="URL аватара в каждом из размеров; недостающие размеры создаются при первом запросе.")
+    @property
+    def avatar_variants(self) -> dict[str, str] | None:
+        return avatar_derivatives.variant_urls(self.avatar_url)
+
+    class Config:
+        from_attributes = True
+
+
+class NearbyUserResponse(UserListItem):
+    """Схема пользователя в результатах поиска поблизости.
+
+    Attributes:
+        distance_km (float): Расстояние до пользователя в километрах.
+    """
+    distance_km: float = Field(..., description="Расстояние до пользователя в километрах.")
+
+
+class LocationUpdate(BaseModel):
+    """Схема местоположения пользователя.
+
+    Attributes:
+        latitude (float): Широта.
+        longitude (float): Долгота.
+    """
+    latitude: float = Field(..., ge=-90, le=90, description="Широта.")
+    longitude: float = Field(..., ge=-180, le=180, description="Долгота.")
+
+
+class UserListResponse(BaseModel):
+    """Схема страницы списка пользователей.
+
+    Attributes:
+        items (list[UserListItem]): Пользователи страницы по возрастанию ID.
+        next_cursor (int | None): Курсор следующей страницы; None, если страница последняя.
+    """
+    items: list[UserListItem] = Field(..., description="Пользователи страницы по возрастанию ID.")
+    next_cursor: int | None = Field(None, description="Значение cursor для следующей страницы; "
+                                                      "null, если страница последняя.")
+
+
+class EmailAvailabilityResponse(BaseModel):
+    """Схема ответа на проверку email при заполнении формы регистрации.
+
+    Attributes:
+        email (EmailStr): Проверенный адрес электронной почты.
+        available (bool): Свободен ли адрес.
+    """
+    email: EmailStr = Field(..., description="Проверенный адрес электронной почты.")
+    available: bool = Field(..., description="Свободен ли адрес для регистрации.")
+
+
+class LikeResponse(BaseModel):
+    """Схема ответа на лайк пользователя.
+
+    Attributes:
+        message (str): Сообщение о результате.
+        matched (bool): Пользователи лайкнули друг друга.
+    """
+    message: str = Field(..., description="Сообщение о результате.")
+    matched: bool = Field(..., description="Образовалась ли взаимная симпатия.")
@@ -0,0 +1,47 @@
+"""
+Модуль: schemas.user_import
+
+Определяет схемы данных для массового импорта пользователей.
+
+Состав:
+- ImportRowErrorResponse: Отклоненная строка входного файла.
+- UserImportResponse: Итоги импорта и отчет об ошибках.
+"""
+
+from pydantic import BaseModel, Field
+
+
+class ImportRowErrorResponse(BaseModel):
+    """Схема отклоненной строки.
+
+    Attributes:
+        line (int): Номер строки входного файла.
+        email (str | None): Email из строки, если есть.
+        error (str): Причина.
+    """
+    line: int = Field(..., description="Номер строки входного файла.")
+    email: str | None = Field(None, description="Email из строки, если есть.")
+    error: str = Field(..., description="Причина отклонения строки.")
+
+
+class UserImportResponse(BaseModel):
+    """Схема итогов импорта.
+
+    Attributes:
+        rows (int): Прочитано строк.
+        imported (int): Создано пользователей.
+        failed (int): Отклонено строк.
+        batches (int): Обработано пачек.
+        seconds (float): Общее время импорта.
+        rows_per_second (float): Пропускная способность.
+        errors (list[ImportRowErrorResponse]): Отклоненные строки (не больше errors_limit).
+        errors_truncated (bool): Отчет об ошибках обрезан.
+    """
+    rows: int = Field(..., description="Прочитано строк.")
+    imported: int = Field(..., description="Создано пользователей.")
+    failed: int = Field(..., description="Отклонено строк.")
+    batches: int = Field(..., description="Обработано пачек.")
+    seconds: float = Field(..., description="Общее время импорта в секундах.")
+    rows_per_second: float = Field(..., description="Пропускная способность, строк в секунду.")
+    errors: list[ImportRowErrorResponse] = Field(default_factory=list, description="Отклоненные строки.")
+    errors_truncated: bool = Field(False, description="Отчет об ошибках обрезан.")
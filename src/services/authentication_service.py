@@ -41,6 +41,7 @@ class AuthenticationService:
         Raises:
             UserNotFound: Если пользователь не найден или пароль неверный.
             DatabaseError: В случае ошибки базы данных.
+            PasswordHasherOverloaded: Если пул хеширования перегружен.
             ValueError: Если email или пароль пусты.
         """
         logger.info("Аутентификация пользователя с email: %s", email)
@@ -60,7 +61,7 @@ class AuthenticationService:
                 raise UserNotFound("Пользователь не найден")
 
             # Проверяем пароль
-            if not self.password_hasher.verify_password(password, user.hashed_password):
+            if not await self.password_hasher.verify_password_async(password, user.hashed_password):
                 logger.warning("Неверный пароль для пользователя с email \"%s\"", email)
                 raise UserNotFound("Пароль неверный")
 
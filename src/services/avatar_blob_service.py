@@ -0,0 +1,207 @@
+"""
+Модуль: services.avatar_blob_service
+
+Предоставляет сервис счетчиков ссылок на файлы аватаров в хранилище по хешу содержимого.
+
+Счетчик меняется в той же транзакции, что и ссылка пользователя на аватар, поэтому
+не расходится с таблицей users. Файлы, на которые больше никто не ссылается,
+удаляет сборщик мусора (collect_garbage) спустя заданное время.
+
+Перед сохранением файла загрузка берет аренду (lease) - запись с released_at = сейчас,
+а сборщик удаляет запись и файл в одной транзакции записи. Поэтому они не пересекаются:
+либо аренда взята раньше и сборщик файл не трогает, либо она ждет конца сборки
+и файл записывается заново.
+"""
+
+import logging
+import time
+
+from sqlalchemy import case, delete, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from exceptions.exceptions import DatabaseError
+from models.avatar_blob import AvatarBlobModel
+from services.avatar_storage import ContentAddressedStorage, avatar_storage
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarBlobService:
+    """
+    Сервис счетчиков ссылок на файлы аватаров.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных,
+        storage (ContentAddressedStorage): Хранилище файлов аватаров.
+    """
+
+    def __init__(self, db: AsyncSession, storage: ContentAddressedStorage = avatar_storage):
+        self.db = db
+        self.storage = storage
+
+    @staticmethod
+    def _split(avatar_url: str) -> tuple[str, str] | None:
+        """Возвращает ключ и расширение аватара или None для файлов старого формата."""
+        filename = avatar_url.rpartition("/")[2]
+        key = ContentAddressedStorage.key_from_filename(filename)
+        if key is None:
+            return None
+        return key, filename[len(key):]
+
+    async def acquire(self, avatar_url: str | None, count: int = 1) -> None:
+        """
+        Увеличивает счетчик ссылок (без commit - в транзакции вызывающего кода).
+
+        Args:
+            avatar_url (str | None): URL или имя файла аватара; файлы старого формата не учитываются,
+            count (int): На сколько увеличить счетчик.
+        """
+        parts = self._split(avatar_url) if avatar_url else None
+        if parts is None or count <= 0:
+            return
+        key, extension = parts
+        statement = insert(AvatarBlobModel).values(content_key=key, extension=extension, refcount=count)
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[AvatarBlobModel.content_key],
+            set_={"refcount": AvatarBlobModel.refcount + count, "released_at": None},
+        ))
+
+    async def release(self, avatar_url: str | None) -> None:
+        """
+        Уменьшает счетчик ссылок (без commit - в транзакции вызывающего кода).
+
+        Args:
+            avatar_url (str | None): URL или имя файла аватара.
+        """
+        parts = self._split(avatar_url) if avatar_url else None
+        if parts is None:
+            return
+        remaining = AvatarBlobModel.refcount - 1
+        await self.db.execute(
+            update(AvatarBlobModel)
+            .where(AvatarBlobModel.content_key == parts[0])
+            .values(refcount=remaining,
+                    released_at=case((remaining <= 0, int(time.time())), else_=AvatarBlobModel.released_at))
+        )
+
+    async def lease(self, avatar_url: str | None) -> None:
+        """
+        Защищает файл от сборщика мусора на grace_seconds (без commit - в транзакции вызывающего кода).
+
+        Вызывается до сохранения файла: если сборщик уже удаляет этот файл, запрос ждет
+        конца его транзакции, и файл затем записывается заново.
+
+        Args:
+            avatar_url (str | None): URL или имя файла аватара.
+        """
+        parts = self._split(avatar_url) if avatar_url else None
+        if parts is None:
+            return
+        key, extension = parts
+        now = int(time.time())
+        statement = insert(AvatarBlobModel).values(content_key=key, extension=extension, refcount=0, released_at=now)
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[AvatarBlobModel.content_key],
+            set_={"released_at": case((AvatarBlobModel.refcount <= 0, now), else_=AvatarBlobModel.released_at)},
+        ))
+
+    async def store(self, data: bytes | memoryview, extension: str) -> tuple[str, bool]:
+        """
+        Сохраняет файл в хранилище под арендой (lease фиксируется до записи файла).
+
+        Args:
+            data (bytes | memoryview): Содержимое файла,
+            extension (str): Расширение (например, '.webp').
+
+        Returns:
+            tuple[str, bool]: Имя файла и признак того, что файл был записан (False - уже существовал).
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        filename = self.storage.filename_for(data, extension)
+        try:
+            await self.lease(filename)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при аренде аватара: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+        return filename, await self.storage.store_as(filename, data)
+
+    async def discard(self, avatar_url: str | None) -> None:
+        """
+        Передает сохраненный, но так и не использованный файл сборщику мусора.
+
+        Если на файл уже есть ссылки (такой же аватар у другого пользователя), ничего не меняется.
+
+        Args:
+            avatar_url (str | None): URL или имя файла аватара.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        parts = self._split(avatar_url) if avatar_url else None
+        if parts is None:
+            return
+        key, extension = parts
+        try:
+            await self.db.execute(
+                insert(AvatarBlobModel)
+                .values(content_key=key, extension=extension, refcount=0, released_at=int(time.time()))
+                .on_conflict_do_nothing(index_elements=[AvatarBlobModel.content_key])
+            )
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при освобождении аватара: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def collect_garbage(self, grace_seconds: int, batch_size: int = 500) -> int:
+        """
+        Удаляет файлы, на которые никто не ссылается дольше grace_seconds.
+
+        Записи удаляются условно (счетчик все еще нулевой и аренда не обновлялась), а файлы -
+        до commit той же транзакции. Загрузка, взявшая аренду раньше, сохраняет файл;
+        взявшая позже ждет commit и записывает файл заново.
+
+        Args:
+            grace_seconds (int): Сколько секунд файл без ссылок сохраняется,
+            batch_size (int): Сколько записей обрабатывать за проход.
+
+        Returns:
+            int: Число удаленных аватаров.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        deadline = time.time() - grace_seconds
+        unused = (AvatarBlobModel.refcount <= 0, AvatarBlobModel.released_at < deadline)
+        removed: list[str] = []
+        try:
+            result = await self.db.execute(
+                select(AvatarBlobModel.content_key, AvatarBlobModel.extension).where(*unused).limit(batch_size))
+            candidates = result.all()
+            # Удаление начинается в новой транзакции: условие проверяется по последнему состоянию
+            await self.db.commit()
+            for key, extension in candidates:
+                deleted = await self.db.execute(
+                    delete(AvatarBlobModel).where(AvatarBlobModel.content_key == key, *unused))
+                if deleted.rowcount:
+                    removed.append(f"{key}{extension}")
+            if removed:
+                # Файлы удаляются одним пакетом (для S3 - запросами DeleteObjects), пока записи заблокированы
+                await self.storage.delete(*removed)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при сборке мусора аватаров: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+        except Exception:
+            await self.db.rollback()
+            raise
+        logger.info("Сборка мусора аватаров: удалено %d", len(removed))
+        return len(removed)
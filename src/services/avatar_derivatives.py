@@ -0,0 +1,157 @@
+"""
+Модуль: services.avatar_derivatives
+
+Предоставляет сервис производных размеров аватаров.
+
+При регистрации сохраняется только самый большой размер (уже уменьшенный до него
+и с водяным знаком) в компактном формате (WebP или JPEG). Остальные размеры
+(например, миниатюра для списков) создаются из него при первом запросе и
+сохраняются на диск рядом с оригиналом (в том же каталоге хранилища) как
+<имя>_<размер><расширение>.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import re
+
+from PIL import Image
+
+from config.settings import AVATAR_VARIANTS, AVATAR_FORMAT, AVATAR_QUALITY
+from services.avatar_storage import AVATAR_EXTENSIONS, ContentAddressedStorage, avatar_storage
+
+logger = logging.getLogger(__name__)
+
+
+# Формат -> (формат Pillow, расширение файла, параметры сохранения)
+AVATAR_FORMATS: dict[str, tuple[str, str, dict]] = {
+    "webp": ("WEBP", ".webp", {"method": 4}),
+    "jpeg": ("JPEG", ".jpg", {"optimize": True, "progressive": True}),
+    "png": ("PNG", ".png", {"optimize": True}),
+}
+
+FILENAME_PATTERN = re.compile(r"^(?P<stem>[A-Za-z0-9-]+)(?:_(?P<variant>[a-z0-9]+))?(?P<ext>\.[a-z0-9]+)$")
+
+
+class AvatarDerivativeService:
+    """
+    Сервис производных размеров аватаров.
+
+    Attributes:
+        storage (ContentAddressedStorage): Хранилище файлов аватаров,
+        variants (dict[str, int]): Имя размера -> максимальная сторона в пикселях,
+        image_format (str): Формат Pillow для сохранения,
+        extension (str): Расширение файлов аватаров,
+        save_options (dict): Параметры сохранения (качество и т.п.),
+        full_variant (str): Имя самого большого размера; он сохраняется при регистрации.
+    """
+
+    def __init__(self, storage: ContentAddressedStorage, variants: dict[str, int],
+                 image_format: str = "webp", quality: int = 80):
+        if image_format not in AVATAR_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат аватаров: {image_format}")
+        if not variants:
+            raise ValueError("Не задан ни один размер аватаров")
+        self.storage = storage
+        self.variants = dict(variants)
+        self.image_format, self.extension, options = AVATAR_FORMATS[image_format]
+        self.save_options = {**options, "quality": quality} if image_format != "png" else dict(options)
+        self.full_variant = max(self.variants, key=self.variants.get)
+
+    @property
+    def full_size(self) -> int:
+        """Максимальная сторона сохраняемого при регистрации аватара."""
+        return self.variants[self.full_variant]
+
+    def encode(self, image: Image.Image) -> bytes:
+        """
+        Кодирует изображение в формат аватаров.
+
+        Args:
+            image (Image): Изображение.
+
+        Returns:
+            bytes: Закодированное изображение.
+        """
+        if self.image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        output_stream = io.BytesIO()
+        image.save(output_stream, format=self.image_format, **self.save_options)
+        return output_stream.getvalue()
+
+    def variant_urls(self, avatar_url: str | None) -> dict[str, str] | None:
+        """
+        Возвращает URL всех размеров аватара.
+
+        Args:
+            avatar_url (str | None): URL сохраненного аватара (самого большого размера).
+
+        Returns:
+            dict[str, str] | None: Имя размера -> URL, или None, если аватара нет.
+        """
+        if not avatar_url:
+            return None
+        prefix, _, filename = avatar_url.rpartition("/")
+        stem = os.path.splitext(filename)[0]
+        base = f"{prefix}/" if prefix else ""
+        return {
+            name: avatar_url if name == self.full_variant else f"{base}{stem}_{name}{self.extension}"
+            for name in self.variants
+        }
+
+    async def _find_base(self, stem: str) -> str | None:
+        """Ищет исходный файл аватара по имени без расширения."""
+        for extension in AVATAR_EXTENSIONS:
+            if await self.storage.exists(stem + extension):
+                return stem + extension
+        return None
+
+    def _generate(self, base_data: bytes, size: int) -> bytes:
+        """Создает уменьшенный вариант (блокирующий вызов)."""
+        with Image.open(io.BytesIO(base_data)) as image:
+            image.draft("RGB", (size, size))
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            return self.encode(image)
+
+    async def resolve(self, filename: str) -> str:
+        """
+        Возвращает путь к локальному файлу аватара, при необходимости создавая запрошенный размер.
+
+        Созданный размер сохраняется в хранилище, поэтому с общим хранилищем (S3)
+        его получают и остальные узлы API.
+
+        Args:
+            filename (str): Имя файла из URL аватара.
+
+        Returns:
+            str: Путь к файлу на диске.
+
+        Raises:
+            FileNotFoundError: Если имя некорректно или исходного аватара нет.
+        """
+        match = FILENAME_PATTERN.match(filename)
+        if match is None:
+            raise FileNotFoundError(filename)
+
+        try:
+            return await self.storage.local_path(filename)
+        except FileNotFoundError:
+            pass
+
+        variant = match.group("variant")
+        if variant not in self.variants or match.group("ext") != self.extension:
+            raise FileNotFoundError(filename)
+        base_filename = await self._find_base(match.group("stem"))
+        if base_filename is None:
+            raise FileNotFoundError(filename)
+
+        base_data = await self.storage.read(base_filename)
+        data = await asyncio.to_thread(self._generate, base_data, self.variants[variant])
+        await self.storage.put(filename, data)
+        logger.info("Создан вариант аватара: %s", filename)
+        return await self.storage.local_path(filename)
+
+
+# Общий сервис приложения
+avatar_derivatives = AvatarDerivativeService(avatar_storage, AVATAR_VARIANTS, AVATAR_FORMAT, AVATAR_QUALITY)
@@ -0,0 +1,173 @@
+"""
+Модуль: services.avatar_file_cache
+
+Предоставляет LRU-кеш открытых файлов аватаров и их метаданных (размер, тип, ETag).
+
+Повторная выдача аватара не требует ни open/stat, ни повторного хеширования:
+файл читается по уже открытому дескриптору (os.pread или zero-copy отправка).
+ETag файлов в хранилище по хешу содержимого берется из имени (ключ уже и есть SHA-256),
+содержимое хешируется только у файлов старого формата (<uuid>.png).
+Записи защищены счетчиком ссылок - дескриптор закрывается только после того,
+как его отпустят все ответы, которые сейчас его отдают.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from config.settings import AVATAR_FD_CACHE_SIZE
+from services.avatar_storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class AvatarFile:
+    """
+    Открытый файл аватара и его метаданные.
+
+    Attributes:
+        path (str): Путь к файлу,
+        file (io.FileIO): Открытый файл (небуферизованный),
+        size (int): Размер в байтах,
+        etag (str): Строгий ETag (ключ содержимого из имени файла или хеш содержимого),
+        media_type (str): MIME-тип,
+        refs (int): Число ответов, использующих файл,
+        evicted (bool): Запись вытеснена из кеша и будет закрыта при освобождении.
+    """
+    path: str
+    file: object
+    size: int
+    etag: str
+    media_type: str
+    refs: int = 0
+    evicted: bool = False
+
+    @property
+    def fd(self) -> int:
+        return self.file.fileno()
+
+    @classmethod
+    def open(cls, path: str, filename: str) -> "AvatarFile":
+        """
+        Открывает файл и вычисляет метаданные (блокирующий вызов, выполнять вне цикла событий).
+
+        Args:
+            path (str): Путь к файлу,
+            filename (str): Имя файла из URL (<хеш>.webp, <хеш>_thumb.webp или имя старого формата).
+        """
+        file = open(path, "rb", buffering=0)
+        try:
+            size = os.fstat(file.fileno()).st_size
+            # Имя в хранилище неизменяемо: <хеш>[_<размер>] однозначно задает содержимое
+            stem = os.path.splitext(filename)[0]
+            content_key = ContentAddressedStorage.is_content_key(stem.partition("_")[0])
+            etag = stem if content_key else _file_digest(file, size)
+        except BaseException:
+            file.close()
+            raise
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return cls(path=path, file=file, size=size, etag=f'"{etag}"', media_type=media_type)
+
+
+def _file_digest(file, size: int) -> str:
+    digest = hashlib.sha256()
+    offset = 0
+    while offset < size:
+        chunk = os.pread(file.fileno(), 1024 * 1024, offset)
+        if not chunk:
+            break
+        digest.update(chunk)
+        offset += len(chunk)
+    return digest.hexdigest()[:32]
+
+
+class AvatarFileCache:
+    """
+    LRU-кеш открытых файлов аватаров.
+
+    Attributes:
+        max_entries (int): Максимальное число открытых файлов,
+        hits (int): Число попаданий,
+        misses (int): Число промахов.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, AvatarFile] = OrderedDict()
+
+    def acquire(self, key: str) -> AvatarFile | None:
+        """
+        Возвращает закешированный файл и увеличивает счетчик ссылок.
+
+        Если файл был удален с диска (st_nlink == 0), запись выбрасывается и возвращается None.
+
+        Args:
+            key (str): Ключ (имя файла из URL).
+
+        Returns:
+            AvatarFile | None: Открытый файл; после отправки его нужно передать в release().
+        """
+        entry = self._entries.get(key)
+        if entry is not None and os.fstat(entry.fd).st_nlink == 0:
+            self._evict(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        entry.refs += 1
+        return entry
+
+    def add(self, key: str, entry: AvatarFile) -> AvatarFile:
+        """
+        Добавляет открытый файл в кеш и увеличивает его счетчик ссылок.
+
+        Args:
+            key (str): Ключ (имя файла из URL),
+            entry (AvatarFile): Открытый файл.
+
+        Returns:
+            AvatarFile: Тот же файл; после отправки его нужно передать в release().
+        """
+        if key in self._entries:
+            self._evict(key)
+        entry.refs += 1
+        if self.max_entries > 0:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+        else:
+            entry.evicted = True
+        return entry
+
+    def release(self, entry: AvatarFile) -> None:
+        """Уменьшает счетчик ссылок; вытесненный файл закрывается, когда он больше никем не используется."""
+        entry.refs -= 1
+        if entry.evicted and entry.refs <= 0:
+            entry.file.close()
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        entry.evicted = True
+        if entry.refs <= 0:
+            entry.file.close()
+
+    def clear(self) -> None:
+        """Закрывает все неиспользуемые файлы и очищает кеш."""
+        for key in list(self._entries):
+            self._evict(key)
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает счетчики кеша."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_entries": self.max_entries}
+
+
+# Общий кеш приложения
+avatar_file_cache = AvatarFileCache(AVATAR_FD_CACHE_SIZE)
@@ -0,0 +1,87 @@
+"""
+Модуль: services.avatar_jobs
+
+Предоставляет обработчик фоновых задач обработки аватаров (асинхронная регистрация).
+
+Маршрут регистрации сохраняет неактивного пользователя и исходный файл
+(incoming/<uuid>) и ставит задачу в очередь. Обработчик проверяет изображение,
+накладывает водяной знак, сохраняет аватар и активирует пользователя.
+Если изображение некорректно или попытки исчерпаны, регистрация отменяется:
+неактивный пользователь и исходный файл удаляются.
+"""
+
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import AVATAR_URL_PREFIX
+from exceptions.exceptions import FileValidationError, PermanentJobError, UserNotFound
+from services.avatar_derivatives import avatar_derivatives
+from services.avatar_storage import ContentAddressedStorage, avatar_storage
+from services.image_processor import ImageProcessingExecutor, image_processor
+from services.image_service import LocalImageService
+from services.password_hasher import PasswordHasher
+from services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+AVATAR_JOB = "avatar"
+INCOMING_PREFIX = "incoming/"
+
+
+class AvatarJobHandler:
+    """
+    Обработчик задач обработки аватара (реализует JobHandlerProtocol).
+
+    Параметры задачи: user_id - неактивный пользователь, upload_key - исходный файл в хранилище.
+
+    Attributes:
+        processor (ImageProcessingExecutor): Пул обработки изображений,
+        storage (ContentAddressedStorage): Хранилище файлов.
+    """
+
+    kind = AVATAR_JOB
+
+    def __init__(self, processor: ImageProcessingExecutor = image_processor,
+                 storage: ContentAddressedStorage = avatar_storage):
+        self.processor = processor
+        self.storage = storage
+
+    async def run(self, db: AsyncSession, payload: dict) -> None:
+        user_service = UserService(db, PasswordHasher())
+        try:
+            db_user = await user_service.get_user_by_id(payload["user_id"], include_inactive=True)
+        except UserNotFound as e:
+            raise PermanentJobError("Пользователь не найден") from e
+        # Транзакция чтения не держит соединение-писатель на время обработки изображения
+        await db.commit()
+
+        if not db_user.is_active:
+            try:
+                data = await self.storage.read(payload["upload_key"])
+            except FileNotFoundError as e:
+                raise PermanentJobError("Исходный файл аватара не найден") from e
+            try:
+                image_with_watermark = await self.processor.process(data)
+            except FileValidationError as e:
+                raise PermanentJobError(str(e)) from e
+            filename = await LocalImageService.upload_image(image_with_watermark, avatar_derivatives.extension)
+            avatar_url = f"{AVATAR_URL_PREFIX}/{filename}"
+            try:
+                await user_service.set_avatar_url(db_user, avatar_url, activate=True)
+            except Exception:
+                # Сохраненный файл не достался пользователю - отдаем его сборщику мусора
+                # (если ссылка все же сохранена или файл нужен другим, discard ничего не меняет)
+                try:
+                    await user_service.avatar_blobs.discard(avatar_url)
+                except Exception as cleanup_error:
+                    logger.error("Ошибка при освобождении аватара %s: %s", avatar_url, cleanup_error)
+                raise
+            logger.info("Аватар пользователя %d обработан", db_user.id)
+
+        # Пользователь уже активен, если предыдущая попытка упала после commit - осталось убрать исходный файл
+        await self.storage.delete(payload["upload_key"], with_variants=False)
+
+    async def on_failure(self, db: AsyncSession, payload: dict, error: str) -> None:
+        await UserService(db, PasswordHasher()).delete_inactive_user(payload["user_id"])
+        await self.storage.delete(payload["upload_key"], with_variants=False)
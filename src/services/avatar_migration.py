@@ -0,0 +1,138 @@
+"""
+Модуль: services.avatar_migration
+
+Предоставляет перенос аватаров старого формата (<uuid>.png в корне AVATAR_DIR)
+в хранилище по хешу содержимого (локальное или S3).
+
+Перенос идет пачками; для каждой пачки:
+1. файлы копируются в хранилище (атомарно, одинаковые файлы сохраняются один раз);
+2. в одной транзакции обновляются ссылки пользователей и счетчики ссылок;
+3. после commit удаляются старые файлы и их производные размеры.
+Если перенос прерван, его можно запустить повторно: уже перенесенные файлы
+удалены, а повторное сохранение непереносенных не создает дубликатов.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, asdict
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions.exceptions import DatabaseError
+from models.user import UserModel
+from services.avatar_blob_service import AvatarBlobService
+from services.avatar_storage import ContentAddressedStorage, avatar_storage
+from services.local_storage import LocalStorageDriver
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AvatarMigrationStats:
+    """
+    Итоги переноса аватаров.
+
+    Attributes:
+        batches (int): Число обработанных пачек,
+        files (int): Число перенесенных файлов,
+        deduplicated (int): Сколько из них уже было в хранилище,
+        users (int): Число обновленных пользователей,
+        orphans (int): Файлы, на которые не ссылался ни один пользователь (переданы сборщику мусора).
+    """
+    batches: int = 0
+    files: int = 0
+    deduplicated: int = 0
+    users: int = 0
+    orphans: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def list_legacy_files(directory: str) -> list[str]:
+    """Возвращает имена исходных файлов старого формата в каталоге (без производных размеров)."""
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.is_file() and "_" not in entry.name and not entry.name.endswith(".tmp")
+            and not ContentAddressedStorage.is_content_key(os.path.splitext(entry.name)[0])
+        )
+
+
+class AvatarMigrationService:
+    """
+    Сервис переноса аватаров старого формата в хранилище по хешу содержимого.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных,
+        storage (ContentAddressedStorage): Хранилище файлов аватаров,
+        url_prefix (str): Префикс URL аватаров,
+        legacy_dir (str): Каталог с файлами старого формата.
+    """
+
+    def __init__(self, db: AsyncSession, url_prefix: str, legacy_dir: str,
+                 storage: ContentAddressedStorage = avatar_storage):
+        self.db = db
+        self.url_prefix = url_prefix
+        self.legacy_dir = legacy_dir
+        self.storage = storage
+        self.avatar_blobs = AvatarBlobService(db, storage)
+        self._legacy = ContentAddressedStorage(LocalStorageDriver(legacy_dir), storage.variants)
+
+    async def _migrate_batch(self, batch: list[str], stats: AvatarMigrationStats) -> None:
+        moved: list[str] = []
+        orphans: list[str] = []
+        try:
+            for old_name in batch:
+                data = await self._legacy.read(old_name)
+                new_name = self.storage.filename_for(data, os.path.splitext(old_name)[1].lower())
+                # Аренда в транзакции пакета: сборщик мусора не удалит файл до commit
+                await self.avatar_blobs.lease(new_name)
+                created = await self.storage.store_as(new_name, data)
+                result = await self.db.execute(
+                    update(UserModel)
+                    .where(UserModel.avatar_url == f"{self.url_prefix}/{old_name}")
+                    .values(avatar_url=f"{self.url_prefix}/{new_name}")
+                )
+                await self.avatar_blobs.acquire(new_name, result.rowcount)
+                if not result.rowcount:
+                    orphans.append(new_name)
+                moved.append(old_name)
+                stats.files += 1
+                stats.deduplicated += not created
+                stats.users += result.rowcount
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при переносе аватаров: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+        for new_name in orphans:
+            await self.avatar_blobs.discard(new_name)
+        stats.orphans += len(orphans)
+        await self._legacy.delete(*moved)
+        stats.batches += 1
+
+    async def migrate(self, batch_size: int = 500) -> AvatarMigrationStats:
+        """
+        Переносит все аватары старого формата.
+
+        Args:
+            batch_size (int): Число файлов в одной транзакции.
+
+        Returns:
+            AvatarMigrationStats: Итоги переноса.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        stats = AvatarMigrationStats()
+        legacy_files = await asyncio.to_thread(list_legacy_files, self.legacy_dir)
+        logger.info("Найдено аватаров старого формата: %d", len(legacy_files))
+        for start in range(0, len(legacy_files), batch_size):
+            await self._migrate_batch(legacy_files[start:start + batch_size], stats)
+            logger.info("Перенесено аватаров: %d из %d", stats.files, len(legacy_files))
+        return stats
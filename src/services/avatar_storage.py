@@ -0,0 +1,195 @@
+"""
+Модуль: services.avatar_storage
+
+Предоставляет хранилище аватаров, адресуемое по хешу содержимого.
+
+Имя файла - SHA-256 обработанного изображения (<хеш><расширение>), поэтому одинаковые
+аватары хранятся один раз. Ключи раскладываются по вложенным каталогам (префиксам)
+по первым символам хеша (ab/cd/abcd....webp), чтобы ни один каталог не разрастался.
+URL аватара остается плоским (avatars/<хеш>.webp) - ключ вычисляется из имени.
+Производные размеры (<хеш>_thumb.webp) лежат рядом с исходным файлом.
+
+Сами байты хранит драйвер (StorageDriverProtocol): локальный диск или S3-совместимое
+хранилище, выбирается настройкой AVATAR_STORAGE.
+Файлы, сохраненные до появления хранилища (<uuid>.png), лежат в корне AVATAR_DIR и
+по-прежнему доступны с локальным драйвером; перенести их можно командой manage_avatars.py migrate.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from typing import Iterable
+
+from config.settings import (AVATAR_DIR, AVATAR_SHARD_LEVELS, AVATAR_VARIANTS, AVATAR_STORAGE,
+                             S3_ENDPOINT_URL, S3_BUCKET, S3_REGION, S3_ACCESS_KEY, S3_SECRET_KEY,
+                             S3_MAX_CONNECTIONS, S3_MULTIPART_THRESHOLD_BYTES, S3_PART_SIZE_BYTES,
+                             S3_CONCURRENCY, S3_TIMEOUT_SECONDS)
+from interfaces.protocols import StorageDriverProtocol
+from services.local_storage import LocalStorageDriver
+from services.s3_storage import S3StorageDriver
+
+logger = logging.getLogger(__name__)
+
+CONTENT_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Расширения, с которыми могут храниться аватары (в том числе загруженные до появления вариантов)
+AVATAR_EXTENSIONS = (".webp", ".jpg", ".png")
+
+
+class ContentAddressedStorage:
+    """
+    Хранилище файлов аватаров по хешу содержимого.
+
+    Attributes:
+        driver (StorageDriverProtocol): Драйвер, хранящий байты,
+        variants (tuple[str, ...]): Имена производных размеров (удаляются вместе с исходным файлом),
+        shard_levels (int): Число уровней вложенных каталогов,
+        shard_width (int): Число символов хеша на один уровень.
+    """
+
+    def __init__(self, driver: StorageDriverProtocol, variants: Iterable[str] = (),
+                 shard_levels: int = 2, shard_width: int = 2):
+        self.driver = driver
+        self.variants = tuple(variants)
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+
+    @staticmethod
+    def content_key(data: bytes | memoryview) -> str:
+        """Возвращает ключ содержимого (SHA-256 в hex)."""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def is_content_key(stem: str) -> bool:
+        """Является ли имя файла (без расширения и размера) ключом содержимого."""
+        return CONTENT_KEY_PATTERN.match(stem) is not None
+
+    @classmethod
+    def key_from_filename(cls, filename: str) -> str | None:
+        """
+        Возвращает ключ содержимого по имени файла или URL аватара.
+
+        Args:
+            filename (str): Имя файла или URL (avatars/<хеш>.webp).
+
+        Returns:
+            str | None: Ключ или None для файлов в старом формате.
+        """
+        stem = os.path.splitext(filename.rpartition("/")[2])[0]
+        return stem if cls.is_content_key(stem) else None
+
+    def object_key(self, filename: str) -> str:
+        """Ключ объекта в драйвере для файла аватара (в том числе производного размера)."""
+        key = filename.partition("_")[0].partition(".")[0]
+        if not self.is_content_key(key):
+            return filename
+        shards = [key[i * self.shard_width:(i + 1) * self.shard_width] for i in range(self.shard_levels)]
+        return "/".join(shards + [filename])
+
+    def related_filenames(self, filename: str) -> list[str]:
+        """Имя файла и имена всех его возможных производных размеров."""
+        stem = os.path.splitext(filename)[0]
+        return [filename] + [f"{stem}_{variant}{extension}"
+                             for variant in self.variants for extension in AVATAR_EXTENSIONS]
+
+    def filename_for(self, data: bytes | memoryview, extension: str) -> str:
+        """Имя файла для содержимого (<хеш><расширение>)."""
+        return f"{self.content_key(data)}{extension}"
+
+    async def store(self, data: bytes | memoryview, extension: str) -> tuple[str, bool]:
+        """
+        Сохраняет файл, если такого содержимого еще нет.
+
+        Args:
+            data (bytes | memoryview): Содержимое файла,
+            extension (str): Расширение (например, '.webp').
+
+        Returns:
+            tuple[str, bool]: Имя файла и признак того, что файл был записан (False - уже существовал).
+        """
+        filename = self.filename_for(data, extension)
+        return filename, await self.store_as(filename, data)
+
+    async def store_as(self, filename: str, data: bytes | memoryview) -> bool:
+        """
+        Сохраняет содержимое под именем filename_for(data, ...), если такого файла еще нет.
+
+        Args:
+            filename (str): Имя файла,
+            data (bytes | memoryview): Содержимое файла.
+
+        Returns:
+            bool: Был ли файл записан (False - уже существовал).
+        """
+        key = self.object_key(filename)
+        if await self.driver.exists(key):
+            try:
+                # Обновляем время изменения: сборщик мусора не удаляет недавно использованные файлы
+                await self.driver.touch(key)
+                return False
+            except FileNotFoundError:
+                # Файл удален между проверкой и обновлением - записываем заново
+                pass
+        await self.driver.put(key, data)
+        return True
+
+    async def exists(self, filename: str) -> bool:
+        """Есть ли файл в хранилище."""
+        return await self.driver.exists(self.object_key(filename))
+
+    async def read(self, filename: str) -> bytes:
+        """Читает файл (FileNotFoundError, если его нет)."""
+        return await self.driver.get(self.object_key(filename))
+
+    async def put(self, filename: str, data: bytes | memoryview) -> None:
+        """Записывает файл под заданным именем (для производных размеров)."""
+        await self.driver.put(self.object_key(filename), data)
+
+    async def local_path(self, filename: str) -> str:
+        """Путь к локальному файлу для отдачи клиенту (FileNotFoundError, если его нет)."""
+        return await self.driver.local_path(self.object_key(filename))
+
+    async def modified_at(self, filename: str) -> float | None:
+        """Время последнего изменения файла или None, если файла нет."""
+        return await self.driver.modified_at(self.object_key(filename))
+
+    async def delete(self, *filenames: str, with_variants: bool = True) -> int:
+        """
+        Удаляет файлы аватаров вместе со всеми их производными размерами (одним пакетом).
+
+        Args:
+            filenames (str): Имена файлов,
+            with_variants (bool): Удалять и производные размеры.
+
+        Returns:
+            int: Число удаленных объектов.
+        """
+        names = [name for filename in filenames
+                 for name in (self.related_filenames(filename) if with_variants else [filename])]
+        keys = [self.object_key(name) for name in names]
+        removed = await self.driver.delete_many(keys)
+        logger.info("Удалены аватары: %d (объектов: %d)", len(filenames), removed)
+        return removed
+
+    async def close(self) -> None:
+        """Закрывает соединения драйвера."""
+        await self.driver.close()
+
+
+def create_storage_driver() -> StorageDriverProtocol:
+    """Создает драйвер хранилища по настройке AVATAR_STORAGE."""
+    if AVATAR_STORAGE == "s3":
+        return S3StorageDriver(
+            S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY, S3_SECRET_KEY,
+            cache_dir=AVATAR_DIR, region=S3_REGION, max_connections=S3_MAX_CONNECTIONS,
+            multipart_threshold=S3_MULTIPART_THRESHOLD_BYTES, part_size=S3_PART_SIZE_BYTES,
+            concurrency=S3_CONCURRENCY, timeout=S3_TIMEOUT_SECONDS,
+        )
+    if AVATAR_STORAGE != "local":
+        raise ValueError(f"Неподдерживаемое хранилище аватаров: {AVATAR_STORAGE}")
+    return LocalStorageDriver(AVATAR_DIR)
+
+
+# Общее хранилище приложения
+avatar_storage = ContentAddressedStorage(create_storage_driver(), AVATAR_VARIANTS, AVATAR_SHARD_LEVELS)
@@ -0,0 +1,94 @@
+"""
+Модуль: services.database_maintenance
+
+Предоставляет периодическое обслуживание SQLite в режиме WAL.
+
+- PRAGMA optimize: обновляет статистику планировщика для таблиц, где она устарела;
+- PRAGMA wal_checkpoint(PASSIVE): переносит страницы из WAL в основной файл, не дожидаясь
+  читателей, чтобы WAL не разрастался при постоянном чтении;
+- при остановке - wal_checkpoint(TRUNCATE) и optimize, как рекомендует документация SQLite.
+Команды выполняются через соединение-писатель, вне транзакции; статистика пулов пишется в лог.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseMaintenance:
+    """
+    Фоновое обслуживание базы данных.
+
+    Attributes:
+        engine (AsyncEngine): Движок-писатель,
+        interval (float): Интервал между запусками в секундах,
+        stats_provider (Callable | None): Источник статистики пулов для лога,
+        runs (int): Число выполненных запусков,
+        last_checkpoint (tuple[int, int, int] | None): Результат последней контрольной точки
+                                                      (занято, страниц в WAL, перенесено страниц).
+    """
+
+    def __init__(self, engine: AsyncEngine, interval: float,
+                 stats_provider: Callable[[], dict[str, Any]] | None = None):
+        self.engine = engine
+        self.interval = interval
+        self.stats_provider = stats_provider
+        self.runs = 0
+        self.last_checkpoint: tuple[int, int, int] | None = None
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self, checkpoint_mode: str = "PASSIVE") -> tuple[int, int, int]:
+        """
+        Выполняет PRAGMA optimize и контрольную точку WAL.
+
+        Args:
+            checkpoint_mode (str): Режим контрольной точки: PASSIVE, FULL, RESTART или TRUNCATE.
+
+        Returns:
+            tuple[int, int, int]: Занята ли база, страниц в WAL, перенесено страниц.
+        """
+        async with self.engine.connect() as conn:
+            await conn.execute(text("PRAGMA optimize"))
+            result = await conn.execute(text(f"PRAGMA wal_checkpoint({checkpoint_mode})"))
+            busy, log_pages, checkpointed = result.one()
+        self.runs += 1
+        self.last_checkpoint = (busy, log_pages, checkpointed)
+        logger.info("Обслуживание БД: контрольная точка %s (занято=%d, WAL=%d, перенесено=%d), пулы: %s",
+                    checkpoint_mode, busy, log_pages, checkpointed,
+                    self.stats_provider() if self.stats_provider else "-")
+        return self.last_checkpoint
+
+    async def run(self) -> None:
+        """Выполняет обслуживание с заданным интервалом, пока задача не остановлена."""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка обслуживания БД: {e}")
+
+    def start(self) -> None:
+        """Запускает обслуживание в текущем цикле событий."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает обслуживание и усекает WAL."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        try:
+            await self.run_once("TRUNCATE")
+        except Exception as e:
+            logger.error(f"Ошибка обслуживания БД при остановке: {e}")
@@ -0,0 +1,107 @@
+"""
+Модуль: services.email_filter
+
+Предоставляет фильтр Блума зарегистрированных email в памяти процесса.
+
+Фильтр отвечает "не зарегистрирован в этом процессе" или "возможно зарегистрирован":
+при регистрации отрицательный ответ позволяет не проверять email в БД перед хешированием пароля,
+положительный перепроверяется в БД, чтобы не тратить bcrypt на занятый адрес. Удалить адрес
+из фильтра нельзя, поэтому адреса удаленных пользователей дают лишь ложноположительные ответы.
+Фильтр заполняется при запуске приложения и пополняется при регистрации в этом процессе;
+адреса, зарегистрированные другими процессами, он не видит, поэтому ответ "адрес свободен"
+(проверка при заполнении формы) всегда дает БД, а уникальность - уникальный индекс users.email.
+"""
+
+import hashlib
+import logging
+import math
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config.settings import EMAIL_BLOOM_ENABLED, EMAIL_BLOOM_CAPACITY, EMAIL_BLOOM_ERROR_RATE
+from models.user import UserModel
+
+logger = logging.getLogger(__name__)
+
+
+class EmailBloomFilter:
+    """
+    Фильтр Блума email-адресов.
+
+    Размер битового массива и число хеш-функций вычисляются по ожидаемому числу адресов
+    и допустимой доле ложноположительных ответов. Позиции битов получаются двойным хешированием
+    одного дайджеста BLAKE2b. Адреса сравниваются без учета регистра (это лишь добавляет
+    ложноположительные ответы, но не ложноотрицательные).
+
+    Attributes:
+        enabled (bool): Используется ли фильтр,
+        ready (bool): Фильтр заполнен; до этого на любой адрес отвечает "возможно зарегистрирован",
+        size (int): Размер битового массива,
+        hash_count (int): Число хеш-функций,
+        count (int): Число добавленных адресов.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, enabled: bool = True):
+        self.enabled = enabled
+        self.ready = False
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, email: str) -> list[int]:
+        digest = hashlib.blake2b(email.strip().lower().encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, email: str) -> None:
+        """Добавляет адрес в фильтр."""
+        if not self.enabled:
+            return
+        for position in self._positions(email):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        if self.count == self.capacity + 1:
+            logger.warning("Фильтр email заполнен сверх расчетной емкости (%d), "
+                           "доля ложноположительных ответов растет", self.capacity)
+
+    def might_contain(self, email: str) -> bool:
+        """
+        Проверяет, может ли адрес быть зарегистрирован.
+
+        Returns:
+            bool: False - адрес не регистрировался в этом процессе и не был загружен при запуске,
+            True - возможно зарегистрирован или фильтр не заполнен.
+        """
+        if not self.ready:
+            return True
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(email))
+
+    async def load(self, db: AsyncSession, batch_size: int = 10000) -> int:
+        """
+        Заполняет фильтр адресами всех пользователей (потоково, пачками).
+
+        Args:
+            db (AsyncSession): Асинхронная сессия базы данных,
+            batch_size (int): Сколько адресов читать за раз.
+
+        Returns:
+            int: Число загруженных адресов.
+        """
+        if not self.enabled:
+            return 0
+        loaded = 0
+        result = await db.stream_scalars(select(UserModel.email).execution_options(yield_per=batch_size))
+        async for email in result:
+            if email:
+                self.add(email)
+                loaded += 1
+        self.ready = True
+        logger.info("Фильтр email заполнен: %d адресов, %d бит, %d хеш-функций", loaded, self.size, self.hash_count)
+        return loaded
+
+
+# Общий фильтр процесса
+registered_emails = EmailBloomFilter(EMAIL_BLOOM_CAPACITY, EMAIL_BLOOM_ERROR_RATE, enabled=EMAIL_BLOOM_ENABLED)
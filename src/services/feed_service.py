@@ -0,0 +1,257 @@
+"""
+Модуль: services.feed_service
+
+Предоставляет очередь анкет для просмотра ("следующий профиль").
+
+Подбор анкет - соединение users с likes, исключающее уже лайкнутых, - выполняется не при
+каждом просмотре, а при пополнении очереди пачками по batch_size (таблица feed_candidates):
+- просмотр читает голову очереди по первичному ключу (user_id, position) - время не зависит
+  от числа пользователей и лайков;
+- когда в очереди остается меньше low_watermark анкет, пополнение ставится в фоновую очередь
+  задач (FeedRefillHandler); пустая очередь пополняется сразу;
+- лайк удаляет анкету из очереди в той же транзакции (LikeService), пропуск - skip;
+- при удалении пользователя его записи удаляются каскадно (внешние ключи).
+С буфером лайков еще не записанные лайки исключаются при чтении и при пополнении.
+С ранжированием (ranker) пополнение отбирает в batch_size * pool_factor раз больше кандидатов
+и добавляет в очередь лучшие batch_size из них по оценке RankingEngine.
+"""
+
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import Row, delete, exists, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config.settings import FEED_BATCH_SIZE, FEED_LOW_WATERMARK, JOB_MAX_ATTEMPTS, RANKING_POOL_FACTOR
+from exceptions.exceptions import DatabaseError
+from models.feed import FeedCandidateModel, FeedStateModel
+from models.like import LikeModel
+from models.user import UserModel
+from services.job_queue import JobQueue
+from services.like_buffer import LikeWriteBuffer
+from services.ranking import RankingEngine
+from services.user_service import LISTING_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+FEED_REFILL_JOB = "feed_refill"
+
+
+def remove_candidate_statement(user_id: int, candidate_id: int):
+    """Запрос удаления анкеты из очереди пользователя (выполняется в транзакции лайка)."""
+    return delete(FeedCandidateModel).where(FeedCandidateModel.user_id == user_id,
+                                            FeedCandidateModel.candidate_id == candidate_id)
+
+
+class FeedService:
+    """
+    Сервис очереди анкет.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных,
+        buffer (LikeWriteBuffer | None): Буфер лайков, если лайки записываются с задержкой,
+        batch_size (int): Сколько анкет добавлять за одно пополнение,
+        low_watermark (int): При каком остатке ставить пополнение в очередь задач,
+        ranker (RankingEngine | None): Ранжирование кандидатов при пополнении,
+        pool_factor (int): Во сколько раз больше кандидатов отбирать для ранжирования.
+    """
+
+    def __init__(self, db: AsyncSession, buffer: LikeWriteBuffer | None = None,
+                 batch_size: int = FEED_BATCH_SIZE, low_watermark: int = FEED_LOW_WATERMARK,
+                 ranker: RankingEngine | None = None, pool_factor: int = RANKING_POOL_FACTOR):
+        self.db = db
+        self.buffer = buffer
+        self.batch_size = max(1, batch_size)
+        self.low_watermark = low_watermark
+        self.ranker = ranker
+        self.pool_factor = max(1, pool_factor) if ranker is not None else 1
+
+    async def next_candidates(self, user_id: int, count: int) -> list[Row]:
+        """
+        Возвращает следующие анкеты из очереди пользователя (не удаляя их).
+
+        Args:
+            user_id (int): Владелец очереди,
+            count (int): Сколько анкет вернуть.
+
+        Returns:
+            list[Row]: Строки с полями LISTING_COLUMNS в порядке очереди.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных при пополнении.
+        """
+        rows = await self._head(user_id, count)
+        if not rows:
+            # Первое обращение или все анкеты просмотрены: ждать фоновое пополнение незачем
+            await self.refill(user_id)
+            return await self._head(user_id, count)
+        if len(rows) < count or await self._remaining(user_id) < self.low_watermark:
+            await self._request_refill(user_id)
+        return rows
+
+    async def _head(self, user_id: int, count: int) -> list[Row]:
+        pending = self.buffer.liked_user_ids(user_id) if self.buffer is not None else set()
+        query = (
+            select(*LISTING_COLUMNS)
+            .select_from(FeedCandidateModel)
+            .join(UserModel, UserModel.id == FeedCandidateModel.candidate_id)
+            .filter(FeedCandidateModel.user_id == user_id)
+            .order_by(FeedCandidateModel.position)
+            .limit(count + len(pending))
+        )
+        result = await self.db.execute(query)
+        return [row for row in result.all() if row.id not in pending][:count]
+
+    async def _remaining(self, user_id: int) -> int:
+        query = select(func.count()).select_from(FeedCandidateModel).filter(FeedCandidateModel.user_id == user_id)
+        return await self.db.scalar(query)
+
+    async def _request_refill(self, user_id: int) -> None:
+        state = await self.db.get(FeedStateModel, user_id)
+        if state is not None and state.refill_pending:
+            return
+        if state is None:
+            self.db.add(FeedStateModel(user_id=user_id, cursor=0, refill_pending=True))
+        else:
+            state.refill_pending = True
+        # Отметка о поставленной задаче сохраняется тем же commit, что и сама задача
+        await JobQueue(self.db).enqueue(FEED_REFILL_JOB, {"user_id": user_id}, JOB_MAX_ATTEMPTS)
+
+    async def refill(self, user_id: int) -> int:
+        """
+        Добавляет в очередь пользователя пачку анкет.
+
+        Просматривает активных пользователей после state.cursor по возрастанию ID, исключая
+        самого пользователя, уже лайкнутых и уже стоящих в очереди; дойдя до конца таблицы,
+        продолжает с начала. С ранжированием из просмотренных кандидатов добавляются лучшие
+        batch_size (остальные вернутся на следующем круге), иначе - все по возрастанию ID.
+
+        Args:
+            user_id (int): Владелец очереди.
+
+        Returns:
+            int: Число добавленных анкет.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        try:
+            state = await self.db.get(FeedStateModel, user_id)
+            if state is None:
+                state = FeedStateModel(user_id=user_id, cursor=0)
+                self.db.add(state)
+            position = await self.db.scalar(
+                select(func.max(FeedCandidateModel.position)).filter(FeedCandidateModel.user_id == user_id)) or 0
+
+            pool_size = self.batch_size * self.pool_factor
+            pool = await self._select_candidates(user_id, state.cursor, pool_size)
+            if len(pool) < pool_size and state.cursor > 0:
+                pool += await self._select_candidates(user_id, 0, pool_size - len(pool), up_to=state.cursor)
+            candidate_ids = self._rank(user_id, pool)
+            if candidate_ids:
+                await self.db.execute(
+                    sqlite_insert(FeedCandidateModel).on_conflict_do_nothing(),
+                    [{"user_id": user_id, "position": position + i, "candidate_id": candidate_id}
+                     for i, candidate_id in enumerate(candidate_ids, start=1)],
+                )
+                state.cursor = pool[-1]
+            state.refill_pending = False
+            state.refilled_at = time.time()
+            await self.db.commit()
+
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка пополнения очереди анкет пользователя {user_id}: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+        logger.info("Очередь анкет пользователя %d пополнена: %d", user_id, len(candidate_ids))
+        return len(candidate_ids)
+
+    def _rank(self, user_id: int, pool: list[int]) -> list[int]:
+        if self.ranker is None:
+            return pool[:self.batch_size]
+        ranked = [candidate_id for candidate_id, _ in self.ranker.rank(user_id, pool, self.batch_size)]
+        if len(ranked) < self.batch_size:
+            # Кандидаты, которых еще нет в признаках (зарегистрировались после обновления), - в конец
+            _, known = self.ranker.store.rows_for(np.array(pool, np.int64))
+            unknown = [candidate_id for candidate_id, is_known in zip(pool, known) if not is_known]
+            ranked += unknown[:self.batch_size - len(ranked)]
+        return ranked
+
+    async def _select_candidates(self, user_id: int, after_id: int, limit: int,
+                                 up_to: int | None = None) -> list[int]:
+        liked = exists().where(LikeModel.user_id == user_id, LikeModel.liked_user_id == UserModel.id)
+        queued = exists().where(FeedCandidateModel.user_id == user_id,
+                                FeedCandidateModel.candidate_id == UserModel.id)
+        query = (
+            select(UserModel.id)
+            .filter(UserModel.is_active == True, UserModel.id > after_id, UserModel.id != user_id, ~liked, ~queued)
+            .order_by(UserModel.id)
+            .limit(limit)
+        )
+        if up_to is not None:
+            query = query.filter(UserModel.id <= up_to)
+        if self.buffer is not None and (pending := self.buffer.liked_user_ids(user_id)):
+            query = query.filter(UserModel.id.not_in(pending))
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def skip(self, user_id: int, candidate_id: int) -> bool:
+        """
+        Убирает анкету из очереди без лайка.
+
+        Анкета снова попадет в очередь, когда пополнение пройдет всех пользователей по кругу.
+
+        Args:
+            user_id (int): Владелец очереди,
+            candidate_id (int): Пропущенный пользователь.
+
+        Returns:
+            bool: True, если анкета была в очереди.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        try:
+            result = await self.db.execute(remove_candidate_statement(user_id, candidate_id))
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка удаления анкеты из очереди: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+        return result.rowcount > 0
+
+
+class FeedRefillHandler:
+    """
+    Обработчик задач пополнения очереди анкет (реализует JobHandlerProtocol).
+
+    Параметры задачи: user_id - владелец очереди.
+
+    Attributes:
+        buffer (LikeWriteBuffer | None): Буфер лайков, если лайки записываются с задержкой,
+        ranker (RankingEngine | None): Ранжирование кандидатов при пополнении.
+    """
+
+    kind = FEED_REFILL_JOB
+
+    def __init__(self, buffer: LikeWriteBuffer | None = None, ranker: RankingEngine | None = None):
+        self.buffer = buffer
+        self.ranker = ranker
+
+    async def run(self, db: AsyncSession, payload: dict) -> None:
+        if await db.get(UserModel, payload["user_id"]) is None:
+            return  # пользователь удален, пока задача ждала
+        # Повторное выполнение безопасно: уже стоящие в очереди анкеты не добавляются
+        await FeedService(db, self.buffer, ranker=self.ranker).refill(payload["user_id"])
+
+    async def on_failure(self, db: AsyncSession, payload: dict, error: str) -> None:
+        # Снимаем отметку, чтобы следующий просмотр снова поставил пополнение
+        state = await db.get(FeedStateModel, payload["user_id"])
+        if state is not None:
+            state.refill_pending = False
+            await db.commit()
@@ -0,0 +1,132 @@
+"""
+Модуль: services.geo
+
+Геометрия для поиска пользователей поблизости.
+
+- bounding_boxes: прямоугольник широт и долгот, описанный вокруг круга поиска
+  (два прямоугольника, если круг пересекает 180-й меридиан);
+- geohash_encode и geohash_cells: ячейки geohash, покрывающие прямоугольник, - для баз
+  без R*Tree, где близость ищется по индексу users.geohash;
+- haversine_km: расстояния от центра до всех кандидатов над столбцами координат (NumPy).
+Индекс отбирает кандидатов в прямоугольнике, а точное расстояние считается только для них.
+"""
+
+from math import asin, ceil, cos, degrees, radians, sin
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = radians(1) * EARTH_RADIUS_KM
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ячейка ~5 м - точность хранения
+GEOHASH_MAX_CELLS = 16
+
+Box = tuple[float, float, float, float]  # min_lat, max_lat, min_lon, max_lon
+
+
+def bounding_boxes(latitude: float, longitude: float, radius_km: float) -> list[Box]:
+    """
+    Возвращает прямоугольники, покрывающие круг радиуса radius_km вокруг точки.
+
+    Args:
+        latitude (float): Широта центра,
+        longitude (float): Долгота центра,
+        radius_km (float): Радиус в километрах.
+
+    Returns:
+        list[Box]: Один прямоугольник или два, если круг пересекает 180-й меридиан.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - delta_lat, -90.0), min(latitude + delta_lat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0 or radius_km >= EARTH_RADIUS_KM * cos(radians(latitude)):
+        # Круг накрывает полюс: подходят все долготы
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    # Наибольшая разница долгот внутри круга (касательная к кругу на сфере)
+    delta_lon = degrees(asin(sin(radius_km / EARTH_RADIUS_KM) / cos(radians(latitude))))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: ArrayLike, longitudes: ArrayLike) -> np.ndarray:
+    """
+    Расстояния по дуге большого круга от точки до каждого кандидата.
+
+    Считается над столбцами координат целиком (NumPy), без цикла по кандидатам.
+
+    Args:
+        latitude (float): Широта центра,
+        longitude (float): Долгота центра,
+        latitudes (ArrayLike): Широты кандидатов,
+        longitudes (ArrayLike): Долготы кандидатов.
+
+    Returns:
+        np.ndarray: Расстояния в километрах в порядке кандидатов (NaN, если координат нет).
+    """
+    phi0, lambda0 = np.radians(latitude), np.radians(longitude)
+    phi = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lam = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = np.sin((phi - phi0) / 2) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin((lam - lambda0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Кодирует точку в geohash заданной длины."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision: int) -> tuple[float, float]:
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _steps(start: float, stop: float, step: float) -> list[float]:
+    # Шаг равен размеру ячейки, поэтому точки попадают в каждую ячейку, пересекающую отрезок
+    return [start + i * step for i in range(int((stop - start) // step) + 1)] + [stop]
+
+
+def geohash_cells(boxes: list[Box], max_cells: int = GEOHASH_MAX_CELLS) -> list[str]:
+    """
+    Возвращает префиксы geohash, ячейки которых покрывают прямоугольники.
+
+    Выбирается самая длинная точность, при которой ячеек не больше max_cells.
+
+    Returns:
+        list[str]: Префиксы; пустой список, если покрыть прямоугольники так мало ячейками нельзя.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        estimate = sum((ceil((max_lat - min_lat) / height) + 1) * (ceil((max_lon - min_lon) / width) + 1)
+                       for min_lat, max_lat, min_lon, max_lon in boxes)
+        if estimate > max_cells:
+            continue
+        return sorted({
+            geohash_encode(lat, lon, precision)
+            for min_lat, max_lat, min_lon, max_lon in boxes
+            for lat in _steps(min_lat, max_lat, height)
+            for lon in _steps(min_lon, max_lon, width)
+        })
+    return []
@@ -0,0 +1,164 @@
+"""
+Модуль: services.image_processor
+
+Предоставляет исполнитель конвейера обработки аватаров (проверка, уменьшение, водяной знак, кодирование)
+в пуле процессов, чтобы декодирование и кодирование Pillow не блокировали цикл событий.
+
+Данные загрузки передаются воркеру через разделяемую память (multiprocessing.shared_memory):
+по каналу пула идут только имя сегмента и размер, а не pickle-копия всего файла.
+
+Процесс, не уложившийся в таймаут, нельзя отменить по одной задаче, поэтому пул при таймауте
+пересоздается: его процессы завершаются, и ограничение параллелизма снова соответствует числу
+занятых воркеров. Задачи, выполнявшиеся в том же пуле, завершаются FileProcessingError.
+В режиме без пула (workers=0) поток остановить нельзя - таймаут ограничивает только ожидание.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+
+from PIL import Image
+
+from config.settings import IMAGE_PROCESS_WORKERS, IMAGE_PROCESS_TIMEOUT_SECONDS, IMAGE_PROCESS_MAX_CONCURRENCY
+from exceptions.exceptions import FileProcessingError
+from services.avatar_derivatives import avatar_derivatives
+from services.image_validation_service import ImageValidationService
+from services.watermark_service import get_watermark_service
+
+logger = logging.getLogger(__name__)
+
+
+def _process(image_data: bytes | memoryview) -> bytes:
+    """
+    Проверяет и декодирует изображение один раз, уменьшает до самого большого размера аватара,
+    накладывает водяной знак и кодирует в формат аватаров.
+    """
+    full_size = (avatar_derivatives.full_size, avatar_derivatives.full_size)
+    image = ImageValidationService.decode_image(image_data, draft_size=full_size)
+    image.thumbnail(full_size, Image.Resampling.LANCZOS)
+    image = get_watermark_service().apply_watermark(image)
+    return avatar_derivatives.encode(image)
+
+
+def _process_shared(shm_name: str, size: int) -> bytes:
+    """
+    Обрабатывает изображение из сегмента разделяемой памяти; выполняется в воркере пула.
+
+    Args:
+        shm_name (str): Имя сегмента,
+        size (int): Размер данных в сегменте (сегмент может быть больше).
+
+    Returns:
+        bytes: Изображение в формате аватаров с водяным знаком.
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        data = shm.buf[:size]
+        try:
+            return _process(data)
+        finally:
+            data.release()
+    finally:
+        shm.close()
+
+
+class ImageProcessingExecutor:
+    """
+    Исполнитель обработки изображений в пуле процессов.
+
+    Attributes:
+        workers (int): Число процессов; 0 - обработка в потоке текущего процесса,
+        timeout (float): Максимальное время обработки одного изображения в секундах,
+        max_concurrency (int): Сколько изображений обрабатывается одновременно; остальные ждут.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 10.0, max_concurrency: int = 4):
+        self.workers = max(0, workers)
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Лениво создает пул процессов при первой задаче."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info("Создан пул обработки изображений, процессов: %d", self.workers)
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Семафор ограничения параллелизма, привязанный к текущему циклу событий."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run_in_pool(self, executor: ProcessPoolExecutor, image_data: bytes | memoryview) -> bytes:
+        """Копирует данные в разделяемую память и обрабатывает их в пуле процессов."""
+        size = len(image_data)
+        shm = SharedMemory(create=True, size=max(1, size))
+        try:
+            shm.buf[:size] = image_data
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, _process_shared, shm.name, size)
+        except BrokenProcessPool as e:
+            logger.error("Пул обработки изображений аварийно завершился, будет создан заново")
+            if self._executor is executor:
+                self._executor = None
+            raise FileProcessingError("Ошибка обработки изображения") from e
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """Завершает процессы пула, в котором задача превысила таймаут; следующая задача создаст новый пул."""
+        if self._executor is executor:
+            self._executor = None
+        # Публичного способа завершить занятые процессы у ProcessPoolExecutor в Python 3.11 нет
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Пул обработки изображений пересоздается после таймаута")
+
+    async def process(self, image_data: bytes | memoryview) -> bytes:
+        """
+        Проверяет изображение и накладывает водяной знак вне цикла событий.
+
+        Args:
+            image_data (bytes | memoryview): Данные загруженного изображения.
+
+        Returns:
+            bytes: Изображение в формате аватаров с водяным знаком.
+
+        Raises:
+            FileValidationError: Если файл не является корректным изображением,
+            FileProcessingError: Если обработка не уложилась в таймаут или пул аварийно завершился.
+        """
+        async with self._get_semaphore():
+            executor = self._get_executor() if self.workers else None
+            if executor is not None:
+                task = self._run_in_pool(executor, image_data)
+            else:
+                task = asyncio.to_thread(_process, image_data)
+            try:
+                return await asyncio.wait_for(task, self.timeout)
+            except asyncio.TimeoutError as e:
+                logger.error("Обработка изображения превысила таймаут %.1f с", self.timeout)
+                if executor is not None:
+                    self._recycle(executor)
+                raise FileProcessingError("Превышено время обработки изображения") from e
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Останавливает пул процессов."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Общий исполнитель приложения
+image_processor = ImageProcessingExecutor(IMAGE_PROCESS_WORKERS, IMAGE_PROCESS_TIMEOUT_SECONDS,
+                                          IMAGE_PROCESS_MAX_CONCURRENCY)
@@ -2,17 +2,16 @@
 Модуль: services.image_service
 
 Предоставляет сервис для работы с изображениями на локальном диске,
-их загрузку и сохранение, а также генерацию уникальных имен.
+их загрузку и сохранение в хранилище по хешу содержимого.
+Одинаковые изображения сохраняются один раз и получают одно и то же имя.
 """
 
 import logging
-import os
-import uuid
 
-import aiofiles
-
-from config.settings import AVATAR_DIR
+from config.database import SessionLocal
 from exceptions.exceptions import FileProcessingError
+from services.avatar_blob_service import AvatarBlobService
+from services.avatar_storage import avatar_storage
 
 logger = logging.getLogger(__name__)
 
@@ -21,41 +20,31 @@ class LocalImageService:
     """Сервис для работы с локальными изображениями."""
 
     @staticmethod
-    def generate_unique_filename(extension: str) -> str:
-        """Генерирует уникальное имя файла на основе UUID.
-
-        Args:
-            extension (str): Расширение файла.
-
-        Returns:
-            str: Уникальное имя файла.
-        """
-        unique_filename = f"{uuid.uuid4()}{extension}"
-        return unique_filename
-
-    @staticmethod
-    async def upload_image(file_data: bytes, unique_filename: str) -> None:
+    async def upload_image(file_data: bytes | memoryview, extension: str) -> str:
         """Загружает изображение на локальный диск.
 
         Args:
-            file_data (bytes): Данные изображения в виде байтов,
-            unique_filename (str): Расширение файла (например, ".jpg").
+            file_data (bytes | memoryview): Данные изображения в виде байтов,
+            extension (str): Расширение файла (например, ".webp").
 
+        Returns:
+            str: Имя файла (хеш содержимого с расширением).
 
         Raises:
             FileProcessingError: Если произошла ошибка при сохранении файла.
         """
         logger.info("Начата загрузка изображения.")
 
-        # Генерация полного имени файла
-        file_path = os.path.join(AVATAR_DIR, unique_filename)
-
         try:
-            # Асинхронное сохранение изображения на диск
-            async with aiofiles.open(file_path, "wb") as buffer:
-                await buffer.write(file_data)
-
-            logger.info(f"Изображение успешно сохранено: {file_path}")
+            # Аренда фиксируется в отдельной сессии до записи: сборщик мусора не удалит файл,
+            # пока вызывающий код не сохранит ссылку на него
+            async with SessionLocal() as session:
+                filename, created = await AvatarBlobService(session, avatar_storage).store(file_data, extension)
+            if created:
+                logger.info(f"Изображение успешно сохранено: {filename}")
+            else:
+                logger.info(f"Изображение уже есть в хранилище: {filename}")
+            return filename
 
         except Exception as e:
             logger.error(f"Ошибка при сохранении файла: {str(e)}")
@@ -63,7 +52,10 @@ class LocalImageService:
 
     @staticmethod
     async def delete_image(filename: str) -> None:
-        """Удаляет изображение с локального диска.
+        """Удаляет изображение и его производные размеры с локального диска.
+
+        Вызывающий код отвечает за то, чтобы на файл больше никто не ссылался
+        (см. AvatarBlobService.discard и collect_garbage).
 
         Args:
             filename (str): Имя файла для удаления.
@@ -71,13 +63,9 @@ class LocalImageService:
         Raises:
             FileProcessingError: Если произошла ошибка при удалении файла.
         """
-        file_path = os.path.join(AVATAR_DIR, filename)
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Изображение успешно удалено: {file_path}")
-            else:
-                logger.warning(f"Файл не найден и не может быть удален: {file_path}")
+            if not await avatar_storage.delete(filename):
+                logger.warning(f"Файл не найден и не может быть удален: {filename}")
         except Exception as e:
             logger.error(f"Ошибка при удалении файла: {str(e)}")
-            raise FileProcessingError("Ошибка при удалении файла") from e
\ No newline at end of file
+            raise FileProcessingError("Ошибка при удалении файла") from e
@@ -4,32 +4,105 @@
 Предоставляет сервис для проверки валидности изображений.
 Он включает функциональность для определения, является ли загруженный файл
 корректным изображением.
+
+Проверка выполняется за одно декодирование и по шагам, от дешевых к дорогим:
+1. формат определяется по сигнатуре первых байт, неподдерживаемые типы отклоняются сразу;
+2. проверяется размер файла;
+3. по заголовку (без декодирования пикселей) проверяются размеры изображения;
+4. изображение декодируется один раз и передается дальше по конвейеру.
 """
 
 
 from PIL import Image, UnidentifiedImageError
 import io
+
+from config.settings import AVATAR_MAX_BYTES, AVATAR_MAX_PIXELS, AVATAR_MAX_DIMENSION
 from exceptions.exceptions import FileValidationError
 
 
 class ImageValidationService:
     """Сервис для проверки валидности изображений."""
 
-    @staticmethod
-    def validate_image(image_data: bytes) -> None:
-        """Проверяет, что данные представляют собой корректное изображение.
+    # Сигнатуры поддерживаемых форматов: формат Pillow -> префиксы первых байт
+    SIGNATURES: dict[str, tuple[bytes, ...]] = {
+        "JPEG": (b"\xff\xd8\xff",),
+        "PNG": (b"\x89PNG\r\n\x1a\n",),
+        "GIF": (b"GIF87a", b"GIF89a"),
+        "WEBP": (b"RIFF",),  # дополнительно проверяется b"WEBP" на смещении 8
+    }
+
+    # Сколько первых байт нужно для определения формата
+    HEADER_SIZE = 12
+
+    @classmethod
+    def sniff_format(cls, header: bytes) -> str:
+        """Определяет формат изображения по первым байтам.
 
         Args:
-            image_data (bytes): Данные изображения.
+            header (bytes): Первые HEADER_SIZE байт файла.
+
+        Returns:
+            str: Название формата в терминах Pillow ('JPEG', 'PNG', ...).
 
         Raises:
-            FileValidationError: Если файл не является корректным изображением.
+            FileValidationError: Если формат не поддерживается.
+        """
+        for image_format, prefixes in cls.SIGNATURES.items():
+            if any(header.startswith(prefix) for prefix in prefixes):
+                if image_format == "WEBP" and header[8:12] != b"WEBP":
+                    continue
+                return image_format
+        raise FileValidationError("Загруженный файл не является корректным изображением "
+                                  "(неподдерживаемый формат).")
+
+    @classmethod
+    def decode_image(cls, image_data: bytes | memoryview,
+                     max_bytes: int = AVATAR_MAX_BYTES,
+                     max_pixels: int = AVATAR_MAX_PIXELS,
+                     max_dimension: int = AVATAR_MAX_DIMENSION,
+                     draft_size: tuple[int, int] | None = None) -> Image.Image:
+        """Проверяет изображение и декодирует его один раз.
+
+        Args:
+            image_data (bytes | memoryview): Данные изображения,
+            max_bytes (int): Максимальный размер файла,
+            max_pixels (int): Максимальное число пикселей,
+            max_dimension (int): Максимальная ширина или высота,
+            draft_size (tuple[int, int] | None): Если задан, JPEG декодируется сразу в уменьшенном
+                                                 масштабе не меньше этого размера (Image.draft).
 
+        Returns:
+            Image: Полностью декодированное изображение.
+
+        Raises:
+            FileValidationError: Если файл не является корректным изображением или превышает ограничения.
         """
+        if len(image_data) > max_bytes:
+            raise FileValidationError(f"Размер файла превышает {max_bytes} байт.")
+        sniffed_format = cls.sniff_format(bytes(image_data[:cls.HEADER_SIZE]))
+
         try:
-            image = Image.open(io.BytesIO(image_data))
-            image.verify()  # Проверка, что изображение корректное
-        except (IOError, SyntaxError, UnidentifiedImageError) as e:
+            # Image.open читает только заголовок; пиксели декодируются в load()
+            image = Image.open(io.BytesIO(image_data), formats=[sniffed_format])
+            width, height = image.size
+            if width > max_dimension or height > max_dimension or width * height > max_pixels:
+                raise FileValidationError(f"Размер изображения {width}x{height} превышает допустимый.")
+            if draft_size:
+                image.draft(None, draft_size)
+            image.load()
+        except (IOError, SyntaxError, UnidentifiedImageError, Image.DecompressionBombError) as e:
             raise FileValidationError("Загруженный файл не является корректным изображением.") from e
+        return image
+
+    @classmethod
+    def validate_image(cls, image_data: bytes | memoryview) -> None:
+        """Проверяет, что данные представляют собой корректное изображение.
 
+        Args:
+            image_data (bytes | memoryview): Данные изображения.
 
+        Raises:
+            FileValidationError: Если файл не является корректным изображением.
+
+        """
+        cls.decode_image(image_data)
@@ -0,0 +1,175 @@
+"""
+Модуль: services.job_queue
+
+Предоставляет надежную очередь фоновых задач поверх таблицы `jobs`.
+
+- enqueue: задача сохраняется в БД и переживает перезапуск приложения;
+- claim: воркер одним UPDATE ... RETURNING забирает пачку доступных задач и продлевает
+  их "время видимости"; задачи воркера, который не уложился в это время, снова доступны;
+- complete / retry / fail: результат попытки; обновление выполняется только если задачу
+  все еще держит этот воркер, поэтому опоздавший воркер не перезапишет чужой результат;
+- повтор с экспоненциальной задержкой, пока не исчерпано число попыток.
+"""
+
+import logging
+import time
+import uuid
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from exceptions.exceptions import DatabaseError
+from models.job import JobModel
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач в базе данных.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _commit(self, action: str) -> None:
+        try:
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка очереди задач при {action}: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def enqueue(self, kind: str, payload: dict, max_attempts: int, delay: float = 0) -> JobModel:
+        """
+        Добавляет задачу в очередь.
+
+        Args:
+            kind (str): Тип задачи,
+            payload (dict): Параметры задачи (сериализуются в JSON),
+            max_attempts (int): Максимальное число попыток,
+            delay (float): Через сколько секунд задачу можно брать.
+
+        Returns:
+            JobModel: Созданная задача.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        now = time.time()
+        job = JobModel(id=uuid.uuid4().hex, kind=kind, payload=payload, status=QUEUED, attempts=0,
+                       max_attempts=max_attempts, available_at=now + delay, created_at=now, updated_at=now)
+        self.db.add(job)
+        await self._commit("добавлении задачи")
+        logger.info("Задача %s (%s) поставлена в очередь", job.id, kind)
+        return job
+
+    async def get(self, job_id: str) -> JobModel | None:
+        """Возвращает задачу по идентификатору или None."""
+        result = await self.db.execute(select(JobModel).where(JobModel.id == job_id))
+        return result.scalars().first()
+
+    async def claim(self, worker_id: str, batch_size: int, visibility_timeout: float,
+                    kinds: list[str] | None = None) -> list[JobModel]:
+        """
+        Забирает пачку доступных задач.
+
+        Доступны задачи в очереди, у которых наступило available_at, и задачи 'running',
+        время видимости которых истекло (воркер упал). Счетчик попыток увеличивается при захвате,
+        поэтому задача, на которой воркер каждый раз падает, не будет браться бесконечно.
+
+        Args:
+            worker_id (str): Идентификатор воркера,
+            batch_size (int): Максимальное число задач,
+            visibility_timeout (float): Сколько секунд задача невидима для других воркеров,
+            kinds (list[str] | None): Типы задач; None - любые.
+
+        Returns:
+            list[JobModel]: Захваченные задачи.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        now = time.time()
+        candidates = (
+            select(JobModel.id)
+            .where(or_(JobModel.status == QUEUED, JobModel.status == RUNNING), JobModel.available_at <= now)
+            .order_by(JobModel.available_at)
+            .limit(batch_size)
+        )
+        if kinds:
+            candidates = candidates.where(JobModel.kind.in_(kinds))
+        try:
+            result = await self.db.execute(
+                update(JobModel)
+                .where(JobModel.id.in_(candidates.scalar_subquery()))
+                .values(status=RUNNING, locked_by=worker_id, attempts=JobModel.attempts + 1,
+                        available_at=now + visibility_timeout, updated_at=now)
+                .returning(JobModel)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            jobs = list(result.scalars().all())
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка очереди задач при захвате: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+        await self._commit("захвате задач")
+        return jobs
+
+    async def _finish(self, job_id: str, worker_id: str, action: str, **values) -> bool:
+        result = await self.db.execute(
+            update(JobModel)
+            .where(JobModel.id == job_id, JobModel.locked_by == worker_id, JobModel.status == RUNNING)
+            .values(updated_at=time.time(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit(action)
+        if not result.rowcount:
+            logger.warning("Задача %s уже не принадлежит воркеру %s (%s пропущено)", job_id, worker_id, action)
+        return bool(result.rowcount)
+
+    async def complete(self, job_id: str, worker_id: str) -> bool:
+        """
+        Отмечает задачу выполненной.
+
+        Returns:
+            bool: False, если задачу уже забрал другой воркер (истекло время видимости).
+        """
+        return await self._finish(job_id, worker_id, "завершении задачи", status=DONE, locked_by=None,
+                                  last_error=None)
+
+    async def retry(self, job_id: str, worker_id: str, error: str, delay: float) -> bool:
+        """
+        Возвращает задачу в очередь после неудачной попытки.
+
+        Args:
+            job_id (str): Идентификатор задачи,
+            worker_id (str): Идентификатор воркера,
+            error (str): Описание ошибки,
+            delay (float): Через сколько секунд задачу можно брать снова.
+
+        Returns:
+            bool: False, если задачу уже забрал другой воркер.
+        """
+        return await self._finish(job_id, worker_id, "повторе задачи", status=QUEUED, locked_by=None,
+                                  last_error=error, available_at=time.time() + delay)
+
+    async def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Отмечает задачу окончательно невыполненной.
+
+        Returns:
+            bool: False, если задачу уже забрал другой воркер.
+        """
+        return await self._finish(job_id, worker_id, "отказе от задачи", status=FAILED, locked_by=None,
+                                  last_error=error)
@@ -0,0 +1,144 @@
+"""
+Модуль: services.job_worker
+
+Предоставляет фонового воркера очереди задач.
+
+Воркер работает в цикле событий приложения: забирает из очереди пачку задач
+(одним запросом), выполняет их с ограниченным параллелизмом - каждую в своей сессии БД -
+и засыпает на интервал опроса, если задач нет. Неудачные попытки повторяются
+с экспоненциальной задержкой; окончательно невыполненные задачи передаются
+обработчику для компенсирующих действий.
+Тяжелая работа (например, обработка изображений) выполняется обработчиками в пулах,
+поэтому воркер не блокирует обработку HTTP-запросов.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions.exceptions import PermanentJobError
+from interfaces.protocols import JobHandlerProtocol
+from models.job import JobModel
+from services.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Фоновый воркер очереди задач.
+
+    Время видимости должно превышать время выполнения всей пачки
+    (batch_size / concurrency задач подряд), иначе задачи будут взяты повторно.
+
+    Attributes:
+        worker_id (str): Идентификатор воркера (хост, процесс и случайный суффикс),
+        handlers (dict[str, JobHandlerProtocol]): Обработчики по типам задач,
+        concurrency (int): Число задач, выполняемых одновременно,
+        batch_size (int): Сколько задач забирать за один запрос,
+        visibility_timeout (float): Время видимости задачи в секундах,
+        poll_interval (float): Пауза между опросами пустой очереди,
+        retry_base (float): Задержка перед первым повтором (удваивается с каждой попыткой),
+        stats (dict[str, int]): Счетчики выполненных, повторенных и проваленных задач.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], handlers: Iterable[JobHandlerProtocol],
+                 concurrency: int = 2, batch_size: int = 8, visibility_timeout: float = 60,
+                 poll_interval: float = 1, retry_base: float = 2, worker_id: str | None = None):
+        self.session_factory = session_factory
+        self.handlers = {handler.kind: handler for handler in handlers}
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stats = {"done": 0, "retried": 0, "failed": 0}
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> int:
+        """
+        Забирает и выполняет одну пачку задач.
+
+        Returns:
+            int: Число взятых задач.
+        """
+        async with self.session_factory() as session:
+            jobs = await JobQueue(session).claim(self.worker_id, self.batch_size, self.visibility_timeout,
+                                                 list(self.handlers))
+        if jobs:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*(self._process(job, semaphore) for job in jobs))
+        return len(jobs)
+
+    async def _process(self, job: JobModel, semaphore: asyncio.Semaphore) -> None:
+        handler = self.handlers[job.kind]
+        async with semaphore, self.session_factory() as session:
+            queue = JobQueue(session)
+            try:
+                if job.attempts > job.max_attempts:
+                    raise PermanentJobError("Превышено число попыток")
+                await handler.run(session, job.payload)
+            except PermanentJobError as e:
+                await session.rollback()
+                await self._give_up(session, queue, handler, job, str(e))
+                return
+            except Exception as e:
+                await session.rollback()
+                logger.warning("Задача %s (%s), попытка %d: %s", job.id, job.kind, job.attempts, e)
+                if job.attempts >= job.max_attempts:
+                    await self._give_up(session, queue, handler, job, str(e))
+                else:
+                    delay = self.retry_base * 2 ** (job.attempts - 1)
+                    if await queue.retry(job.id, self.worker_id, str(e), delay):
+                        self.stats["retried"] += 1
+                return
+
+            if await queue.complete(job.id, self.worker_id):
+                self.stats["done"] += 1
+                logger.info("Задача %s (%s) выполнена", job.id, job.kind)
+
+    async def _give_up(self, session: AsyncSession, queue: JobQueue, handler: JobHandlerProtocol,
+                       job: JobModel, error: str) -> None:
+        if not await queue.fail(job.id, self.worker_id, error):
+            return
+        self.stats["failed"] += 1
+        logger.error("Задача %s (%s) не выполнена: %s", job.id, job.kind, error)
+        try:
+            await handler.on_failure(session, job.payload, error)
+        except Exception as e:
+            logger.error(f"Ошибка компенсации задачи {job.id}: {e}")
+
+    async def run(self) -> None:
+        """Выполняет задачи, пока воркер не остановлен."""
+        logger.info("Воркер задач %s запущен", self.worker_id)
+        while not self._stopping.is_set():
+            try:
+                taken = await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка воркера задач: {e}")
+                taken = 0
+            if not taken:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Запускает воркер в текущем цикле событий."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает воркер, дождавшись завершения текущей пачки."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        logger.info("Воркер задач %s остановлен: %s", self.worker_id, self.stats)
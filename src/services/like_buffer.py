@@ -0,0 +1,286 @@
+"""
+Модуль: services.like_buffer
+
+Предоставляет буфер лайков с отложенной записью (write-behind).
+
+Лайк не записывается в БД сразу, а попадает в буфер процесса:
+- одинаковые лайки в буфере хранятся один раз;
+- буфер сбрасывается каждые flush_interval мс или как только накопилось max_batch лайков;
+  пачка вставляется одним INSERT ... SELECT FROM json_each(...) ON CONFLICT DO NOTHING
+  (одна транзакция и один fsync на пачку вместо одного на лайк); лайки с несуществующим
+  автором или неактивным получателем отбрасываются тем же запросом; в той же транзакции
+  записываются пары взаимной симпатии (matches), образованные лайками пачки, и из очередей
+  просмотра (feed_candidates) удаляются лайкнутые анкеты;
+- если буфер заполнен (max_pending), добавление ждет сброса, а затем отклоняется
+  с LikeBufferOverloaded;
+- liked_user_ids возвращает еще не записанные лайки пользователя, чтобы он сразу видел свои лайки;
+- при остановке приложения буфер сбрасывается полностью.
+Лайки, не записанные из-за аварийного завершения процесса, теряются - это цена отложенной записи.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Callable
+
+from sqlalchemy import and_, delete, func, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from config.settings import (LIKE_BUFFER_FLUSH_MS, LIKE_BUFFER_MAX_BATCH, LIKE_BUFFER_MAX_PENDING,
+                             LIKE_BUFFER_BACKPRESSURE_SECONDS)
+from exceptions.exceptions import LikeBufferOverloaded
+from models.feed import FeedCandidateModel
+from models.like import LikeModel
+from models.match import MatchModel
+from models.user import UserModel
+
+logger = logging.getLogger(__name__)
+
+
+def _pair_columns(pairs: list[tuple[int, int]]):
+    # Пачка передается одним JSON-параметром и разворачивается json_each, поэтому размер пачки
+    # не ограничен числом параметров SQLite
+    rows = func.json_each(json.dumps(pairs)).table_valued("value").alias("pairs")
+    return rows, func.json_extract(rows.c.value, "$[0]"), func.json_extract(rows.c.value, "$[1]")
+
+
+def bulk_like_statement(pairs: list[tuple[int, int]]):
+    """
+    Запрос вставки пачки лайков одним оператором.
+
+    Автор должен существовать, получатель - быть активным.
+    """
+    rows, user_id, liked_user_id = _pair_columns(pairs)
+    author, target = aliased(UserModel), aliased(UserModel)
+    return (
+        sqlite_insert(LikeModel)
+        .from_select(
+            [LikeModel.user_id, LikeModel.liked_user_id],
+            select(user_id, liked_user_id)
+            .select_from(rows)
+            .join(author, author.id == user_id)
+            .join(target, target.id == liked_user_id)
+            .where(target.is_active == True),
+        )
+        .on_conflict_do_nothing(index_elements=[LikeModel.user_id, LikeModel.liked_user_id])
+    )
+
+
+def bulk_match_statement(pairs: list[tuple[int, int]]):
+    """
+    Запрос записи пар взаимной симпатии для пачки лайков.
+
+    Выполняется после bulk_like_statement в той же транзакции: пара записывается, если в БД
+    есть и лайк из пачки (он мог быть отброшен), и ответный лайк.
+    """
+    rows, user_id, liked_user_id = _pair_columns(pairs)
+    like, reciprocal = aliased(LikeModel), aliased(LikeModel)
+    return (
+        sqlite_insert(MatchModel)
+        .from_select(
+            [MatchModel.first_user_id, MatchModel.second_user_id],
+            select(func.min(user_id, liked_user_id), func.max(user_id, liked_user_id))
+            .select_from(rows)
+            .join(like, and_(like.user_id == user_id, like.liked_user_id == liked_user_id))
+            .join(reciprocal, and_(reciprocal.user_id == liked_user_id, reciprocal.liked_user_id == user_id))
+            # WHERE нужен SQLite, чтобы отличить ON CONFLICT от условия последнего JOIN
+            .where(user_id != liked_user_id),
+        )
+        .on_conflict_do_nothing(index_elements=[MatchModel.first_user_id, MatchModel.second_user_id])
+    )
+
+
+def bulk_feed_removal_statement(pairs: list[tuple[int, int]]):
+    """Запрос удаления лайкнутых анкет пачки из очередей просмотра их авторов."""
+    rows, user_id, liked_user_id = _pair_columns(pairs)
+    return delete(FeedCandidateModel).where(
+        tuple_(FeedCandidateModel.user_id, FeedCandidateModel.candidate_id).in_(
+            select(user_id, liked_user_id).select_from(rows))
+    )
+
+
+class LikeWriteBuffer:
+    """
+    Буфер лайков с пакетной отложенной записью.
+
+    Attributes:
+        flush_interval (float): Интервал сброса в секундах,
+        max_batch (int): Максимальный размер пачки (при его достижении буфер сбрасывается сразу),
+        max_pending (int): Максимальное число ожидающих записи лайков,
+        backpressure_timeout (float): Сколько ждать места в заполненном буфере,
+        stats (dict[str, int]): Счетчики добавленных, повторных, записанных и отброшенных лайков
+                                и записанных пар взаимной симпатии.
+    """
+
+    def __init__(self, flush_interval_ms: int = 50, max_batch: int = 500, max_pending: int = 10000,
+                 backpressure_timeout: float = 1.0):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.max_pending = max(self.max_batch, max_pending)
+        self.backpressure_timeout = backpressure_timeout
+        self.stats = {"added": 0, "deduplicated": 0, "inserted": 0, "skipped": 0, "matches": 0, "flushes": 0,
+                      "failed_flushes": 0, "backpressure_waits": 0, "rejected": 0}
+        self._pending: dict[tuple[int, int], None] = {}  # упорядоченное множество
+        self._in_flight: set[tuple[int, int]] = set()
+        self._by_user: dict[int, set[int]] = {}
+        self._session_factory: Callable[[], AsyncSession] | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._space: asyncio.Condition | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        """Число лайков, еще не записанных в БД."""
+        return len(self._pending) + len(self._in_flight)
+
+    def _primitives(self) -> None:
+        # Примитивы создаются в цикле событий, где используется буфер
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._flush_lock = asyncio.Lock()
+
+    async def add(self, user_id: int, liked_user_id: int) -> bool:
+        """
+        Добавляет лайк в буфер.
+
+        Args:
+            user_id (int): ID пользователя, который ставит лайк,
+            liked_user_id (int): ID пользователя, которому ставят лайк.
+
+        Returns:
+            bool: False, если такой лайк уже ожидает записи.
+
+        Raises:
+            LikeBufferOverloaded: Если буфер заполнен и не освободился за backpressure_timeout.
+        """
+        self._primitives()
+        pair = (user_id, liked_user_id)
+        if pair in self._pending or pair in self._in_flight:
+            self.stats["deduplicated"] += 1
+            return False
+
+        if len(self._pending) >= self.max_pending:
+            self.stats["backpressure_waits"] += 1
+            self._wakeup.set()
+            try:
+                async with self._space:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self._pending) < self.max_pending),
+                        self.backpressure_timeout,
+                    )
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                logger.warning("Буфер лайков заполнен (%d), лайк отклонен", len(self._pending))
+                raise LikeBufferOverloaded("Сервис перегружен, повторите попытку позже")
+            if pair in self._pending or pair in self._in_flight:
+                self.stats["deduplicated"] += 1
+                return False
+
+        self._pending[pair] = None
+        self._by_user.setdefault(user_id, set()).add(liked_user_id)
+        self.stats["added"] += 1
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def liked_user_ids(self, user_id: int) -> set[int]:
+        """Возвращает ID пользователей, которым user_id поставил еще не записанные лайки."""
+        return set(self._by_user.get(user_id, ()))
+
+    def is_pending(self, user_id: int, liked_user_id: int) -> bool:
+        """Ожидает ли записи лайк от user_id к liked_user_id."""
+        return liked_user_id in self._by_user.get(user_id, ())
+
+    async def flush(self) -> int:
+        """
+        Записывает в БД одну пачку (до max_batch лайков).
+
+        Returns:
+            int: Число вставленных лайков.
+        """
+        self._primitives()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch = list(self._pending)[:self.max_batch]
+            for pair in batch:
+                del self._pending[pair]
+            self._in_flight.update(batch)
+            async with self._space:
+                self._space.notify_all()
+
+            try:
+                async with self._session_factory() as session:
+                    result = await session.execute(bulk_like_statement(batch))
+                    matches = await session.execute(bulk_match_statement(batch))
+                    await session.execute(bulk_feed_removal_statement(batch))
+                    await session.commit()
+            except Exception as e:
+                # Пачка возвращается в начало очереди и будет записана при следующем сбросе
+                self._pending = {**dict.fromkeys(batch), **self._pending}
+                self._in_flight.difference_update(batch)
+                self.stats["failed_flushes"] += 1
+                logger.error(f"Ошибка записи пачки лайков ({len(batch)}): {e}")
+                raise
+
+            self._in_flight.difference_update(batch)
+            for user_id, liked_user_id in batch:
+                liked = self._by_user.get(user_id)
+                if liked is not None and (user_id, liked_user_id) not in self._pending:
+                    liked.discard(liked_user_id)
+                    if not liked:
+                        del self._by_user[user_id]
+            inserted = max(result.rowcount, 0)
+            self.stats["flushes"] += 1
+            self.stats["inserted"] += inserted
+            self.stats["skipped"] += len(batch) - inserted
+            self.stats["matches"] += max(matches.rowcount, 0)
+            logger.debug("Записана пачка лайков: %d из %d", inserted, len(batch))
+            return inserted
+
+    async def run(self) -> None:
+        """Сбрасывает буфер по интервалу или при заполнении пачки, пока буфер не остановлен."""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while self._pending:
+                    await self.flush()
+            except Exception:
+                # Ошибка уже записана в лог; повтор - на следующем интервале
+                pass
+
+    def start(self, session_factory: Callable[[], AsyncSession]) -> None:
+        """Запускает фоновый сброс в текущем цикле событий."""
+        self._primitives()
+        self._session_factory = session_factory
+        self._stopping = False
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновый сброс и записывает все оставшиеся лайки."""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        try:
+            while self._pending:
+                await self.flush()
+        except Exception:
+            logger.error("Лайки не записаны при остановке: %d", self.pending)
+        logger.info("Буфер лайков остановлен: %s", self.stats)
+
+
+# Общий буфер процесса (используется при LIKE_BUFFER_ENABLED)
+like_buffer = LikeWriteBuffer(LIKE_BUFFER_FLUSH_MS, LIKE_BUFFER_MAX_BATCH, LIKE_BUFFER_MAX_PENDING,
+                              LIKE_BUFFER_BACKPRESSURE_SECONDS)
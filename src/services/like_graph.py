@@ -0,0 +1,335 @@
+"""
+Модуль: services.like_graph
+
+Снимок графа лайков в памяти для аналитики: взаимные лайки, самые популярные пользователи,
+"понравились тем, кто понравился вам" - без соединений таблицы likes самой с собой.
+
+Лайки хранятся в формате CSR (compressed sparse row) в двух направлениях:
+- forward: для пользователя u - отсортированные ID тех, кого он лайкнул,
+  indices[indptr[u]:indptr[u + 1]];
+- backward: для пользователя u - отсортированные ID тех, кто лайкнул его.
+ID пользователей служат номерами строк, ID в indices хранятся как int32: 10 млн лайков
+занимают ~80 МБ на оба направления.
+
+Новые лайки (likes.id > last_like_id; ID лайков не переиспользуются - AUTOINCREMENT) дочитываются
+refresh и до слияния (compact) хранятся отдельно по пользователям; запросы учитывают и их.
+Удаления (в том числе каскад при удалении пользователя) refresh замечает по счетчику
+like_deletions, который ведет триггер на likes, и тогда перестраивает граф целиком (reload).
+
+Снимок сохраняется в каталог файлами .npy (save) и открывается через mmap (load): после
+перезапуска достаточно дочитать лайки, появившиеся после снимка.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config.settings import LIKE_GRAPH_COMPACT_THRESHOLD
+from models.like import LikeModel, like_deletions
+from services.ranking import top_k
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 100_000
+SNAPSHOT_ARRAYS = ("forward_indptr", "forward_indices", "backward_indptr", "backward_indices")
+SNAPSHOT_META = "meta.json"
+_EMPTY = np.zeros(0, np.int32)
+
+
+class CSR:
+    """
+    Списки смежности одного направления в формате CSR.
+
+    Attributes:
+        indptr (np.ndarray): Границы строк (int64, длина - число строк + 1),
+        indices (np.ndarray): ID соседей, отсортированные внутри каждой строки (int32).
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def build(cls, sources: np.ndarray, targets: np.ndarray, rows: int) -> "CSR":
+        """Строит CSR из массивов ребер (sources[i] -> targets[i]) для rows строк."""
+        keys = np.sort(sources.astype(np.int64) << 32 | targets)
+        indptr = np.zeros(rows + 1, np.int64)
+        np.cumsum(np.bincount(sources, minlength=rows), out=indptr[1:])
+        return cls(indptr, (keys & 0xFFFFFFFF).astype(np.int32))
+
+    @property
+    def rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, node: int) -> np.ndarray:
+        """Соседи вершины (срез массива, без копирования)."""
+        if not 0 <= node < self.rows:
+            return _EMPTY
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def edges(self) -> tuple[np.ndarray, np.ndarray]:
+        """Все ребра в виде массивов (sources, targets)."""
+        return np.repeat(np.arange(self.rows, dtype=np.int64), self.degrees()), np.asarray(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+def _empty_csr() -> CSR:
+    return CSR(np.zeros(1, np.int64), _EMPTY)
+
+
+class LikeGraph:
+    """
+    Граф лайков: CSR в двух направлениях и еще не слитые новые лайки.
+
+    Attributes:
+        forward (CSR): Кого лайкнул пользователь,
+        backward (CSR): Кто лайкнул пользователя,
+        last_like_id (int): Наибольший учтенный ID лайка,
+        deleted_likes (int | None): Значение счетчика удаленных лайков при последней полной загрузке
+            (None - неизвестно, первый refresh перестроит граф),
+        compact_threshold (int): После скольких новых лайков сливать их с основными массивами.
+    """
+
+    def __init__(self, forward: CSR | None = None, backward: CSR | None = None, last_like_id: int = 0,
+                 deleted_likes: int | None = None, compact_threshold: int = LIKE_GRAPH_COMPACT_THRESHOLD):
+        self.forward = forward or _empty_csr()
+        self.backward = backward or _empty_csr()
+        self.last_like_id = last_like_id
+        self.deleted_likes = deleted_likes
+        self.compact_threshold = compact_threshold
+        self._added_forward: dict[int, list[int]] = {}
+        self._added_backward: dict[int, list[int]] = {}
+        self._added = 0
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.forward.indices) + self._added
+
+    @property
+    def nbytes(self) -> int:
+        """Объем основных массивов в байтах."""
+        return self.forward.nbytes + self.backward.nbytes
+
+    def add_edges(self, sources, targets) -> None:
+        """
+        Добавляет лайки (sources[i] лайкнул targets[i]).
+
+        Небольшие пачки хранятся отдельно от основных массивов; когда новых лайков набирается
+        compact_threshold, они сливаются с основными массивами (как и большая пачка - сразу).
+        """
+        sources, targets = np.asarray(sources, np.int64), np.asarray(targets, np.int64)
+        if self._added + len(sources) >= self.compact_threshold:
+            self._merge(sources, targets)
+            return
+        for source, target in zip(sources.tolist(), targets.tolist()):
+            self._added_forward.setdefault(source, []).append(target)
+            self._added_backward.setdefault(target, []).append(source)
+        self._added += len(sources)
+
+    def compact(self) -> None:
+        """Сливает новые лайки с основными массивами (перестраивает CSR)."""
+        if self._added:
+            self._merge(np.zeros(0, np.int64), np.zeros(0, np.int64))
+
+    def _merge(self, sources: np.ndarray, targets: np.ndarray) -> None:
+        base_sources, base_targets = self.forward.edges()
+        added_sources = np.fromiter((s for s, ts in self._added_forward.items() for _ in ts), np.int64, self._added)
+        added_targets = np.fromiter((t for ts in self._added_forward.values() for t in ts), np.int64, self._added)
+        # Повторы возможны, если лайк дочитан повторно: пара кодируется одним int64, после сортировки
+        # повторы стоят рядом
+        keys = np.sort(np.concatenate([base_sources << 32 | base_targets.astype(np.int64),
+                                       added_sources << 32 | added_targets, sources << 32 | targets]))
+        first = np.ones(len(keys), np.bool_)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        self._build(keys >> 32, keys & 0xFFFFFFFF)
+
+    def _build(self, sources: np.ndarray, targets: np.ndarray) -> None:
+        rows = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+        self.forward = CSR.build(sources, targets, rows)
+        self.backward = CSR.build(targets, sources, rows)
+        self._added_forward.clear()
+        self._added_backward.clear()
+        self._added = 0
+
+    def _neighbors(self, csr: CSR, added: dict[int, list[int]], user_id: int) -> np.ndarray:
+        row = csr.row(user_id)
+        extra = added.get(user_id)
+        if extra is None:
+            return row
+        return np.union1d(row, np.array(extra, np.int32))
+
+    def liked(self, user_id: int) -> np.ndarray:
+        """Отсортированные ID пользователей, которых лайкнул user_id."""
+        return self._neighbors(self.forward, self._added_forward, user_id)
+
+    def liked_by(self, user_id: int) -> np.ndarray:
+        """Отсортированные ID пользователей, лайкнувших user_id."""
+        return self._neighbors(self.backward, self._added_backward, user_id)
+
+    def out_degree(self, user_id: int) -> int:
+        return len(self.liked(user_id))
+
+    def in_degree(self, user_id: int) -> int:
+        return len(self.liked_by(user_id))
+
+    def has_like(self, user_id: int, liked_user_id: int) -> bool:
+        row = self.liked(user_id)
+        position = np.searchsorted(row, liked_user_id)
+        return bool(position < len(row) and row[position] == liked_user_id)
+
+    def mutual(self, user_id: int) -> np.ndarray:
+        """ID пользователей со взаимным лайком."""
+        return np.intersect1d(self.liked(user_id), self.liked_by(user_id), assume_unique=True)
+
+    def common_liked(self, user_id: int, other_user_id: int) -> np.ndarray:
+        """ID пользователей, которых лайкнули оба."""
+        return np.intersect1d(self.liked(user_id), self.liked(other_user_id), assume_unique=True)
+
+    def liked_by_liked(self, user_id: int, limit: int) -> list[tuple[int, int]]:
+        """
+        Пользователи, которых лайкнули те, кого лайкнул user_id (два шага по графу).
+
+        Args:
+            user_id (int): Пользователь,
+            limit (int): Сколько пользователей вернуть.
+
+        Returns:
+            list[tuple[int, int]]: ID и число путей к нему по убыванию; сам пользователь и
+                                   уже лайкнутые им исключаются.
+        """
+        liked = self.liked(user_id)
+        if not len(liked):
+            return []
+        reached = np.concatenate([self.liked(int(middle)) for middle in liked])
+        ids, counts = np.unique(reached, return_counts=True)
+        keep = ~np.isin(ids, liked, assume_unique=True) & (ids != user_id)
+        ids, counts = ids[keep], counts[keep]
+        best = top_k(counts, limit)
+        return list(zip(ids[best].tolist(), counts[best].tolist()))
+
+    def most_liked(self, k: int) -> list[tuple[int, int]]:
+        """ID k пользователей с наибольшим числом полученных лайков и эти числа по убыванию."""
+        degrees = self.backward.degrees()
+        if self._added_backward:
+            rows = max(len(degrees), max(self._added_backward) + 1)
+            degrees = np.pad(degrees, (0, rows - len(degrees)))
+            for user_id, sources in self._added_backward.items():
+                degrees[user_id] += len(sources)
+        best = top_k(degrees, k)
+        return [(user_id, count) for user_id, count in zip(best.tolist(), degrees[best].tolist()) if count > 0]
+
+    async def _read_likes(self, db: AsyncSession):
+        while True:
+            result = await db.execute(
+                select(LikeModel.id, LikeModel.user_id, LikeModel.liked_user_id)
+                .filter(LikeModel.id > self.last_like_id)
+                .order_by(LikeModel.id)
+                .limit(LOAD_BATCH_SIZE)
+            )
+            batch = np.array(result.all(), np.int64).reshape(-1, 3)
+            if not len(batch):
+                return
+            self.last_like_id = int(batch[-1, 0])
+            yield batch[:, 1], batch[:, 2]
+            if len(batch) < LOAD_BATCH_SIZE:
+                return
+
+    @staticmethod
+    async def _deleted_likes(db: AsyncSession) -> int:
+        result = await db.execute(select(like_deletions.c.deleted).filter(like_deletions.c.id == 1))
+        return result.scalar_one_or_none() or 0
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Дочитывает лайки, поставленные после last_like_id.
+
+        Если с последней полной загрузки лайки удалялись (изменился счетчик like_deletions),
+        граф перестраивается целиком.
+
+        Returns:
+            int: Число добавленных лайков (после перестроения - число всех лайков).
+        """
+        deleted = await self._deleted_likes(db)
+        if deleted != self.deleted_likes:
+            logger.info("Граф лайков устарел (удалено лайков: %s), перестраивается",
+                        deleted - self.deleted_likes if self.deleted_likes is not None else "неизвестно")
+            return await self.reload(db)
+        added = 0
+        async for sources, targets in self._read_likes(db):
+            self.add_edges(sources, targets)
+            added += len(sources)
+        return added
+
+    async def reload(self, db: AsyncSession) -> int:
+        """
+        Перестраивает граф по всей таблице likes.
+
+        Returns:
+            int: Число лайков.
+        """
+        # Счетчик читается в той же транзакции, что и лайки: удаления после нее заметит refresh
+        self.deleted_likes = await self._deleted_likes(db)
+        self.last_like_id = 0
+        sources, targets = [], []
+        async for batch_sources, batch_targets in self._read_likes(db):
+            sources.append(batch_sources)
+            targets.append(batch_targets)
+        self._build(np.concatenate(sources) if sources else np.zeros(0, np.int64),
+                    np.concatenate(targets) if targets else np.zeros(0, np.int64))
+        logger.info("Граф лайков загружен: %d лайков, %d МБ", self.edge_count, self.nbytes // 2 ** 20)
+        return self.edge_count
+
+    def save(self, directory: str | Path) -> None:
+        """
+        Сохраняет снимок графа (с учетом новых лайков) в каталог.
+
+        Снимок пишется во временный каталог и подменяет прежний целиком, поэтому
+        прерванная запись не портит предыдущий снимок.
+        """
+        self.compact()
+        directory = Path(directory)
+        temporary = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(temporary, ignore_errors=True)
+        temporary.mkdir(parents=True)
+        for name in SNAPSHOT_ARRAYS:
+            direction, part = name.split("_")
+            np.save(temporary / f"{name}.npy", getattr(getattr(self, direction), part))
+        (temporary / SNAPSHOT_META).write_text(json.dumps(
+            {"last_like_id": self.last_like_id, "deleted_likes": self.deleted_likes,
+             "edges": self.edge_count, "saved_at": time.time()}))
+        previous = directory.with_name(directory.name + ".old")
+        shutil.rmtree(previous, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, previous)
+        os.replace(temporary, directory)
+        shutil.rmtree(previous, ignore_errors=True)
+        logger.info("Снимок графа лайков сохранен: %s (%d лайков)", directory, self.edge_count)
+
+    @classmethod
+    def load(cls, directory: str | Path, compact_threshold: int = LIKE_GRAPH_COMPACT_THRESHOLD) -> "LikeGraph":
+        """
+        Открывает снимок графа через mmap (массивы читаются с диска по мере обращения).
+
+        Raises:
+            FileNotFoundError: Если снимка в каталоге нет.
+        """
+        directory = Path(directory)
+        meta = json.loads((directory / SNAPSHOT_META).read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in SNAPSHOT_ARRAYS}
+        return cls(CSR(arrays["forward_indptr"], arrays["forward_indices"]),
+                   CSR(arrays["backward_indptr"], arrays["backward_indices"]),
+                   meta["last_like_id"], meta.get("deleted_likes"), compact_threshold)
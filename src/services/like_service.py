@@ -1,41 +1,100 @@
 # services.like_service
 
 import logging
+from dataclasses import dataclass
 
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import exists, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from exceptions.exceptions import UserNotFound
 from models.like import LikeModel
+from models.match import MatchModel
 from models.user import UserModel
+from services.feed_service import remove_candidate_statement
+from services.like_buffer import LikeWriteBuffer
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class LikeResult:
+    """
+    Результат лайка.
+
+    Attributes:
+        created (bool): Лайк создан (или поставлен в очередь на запись); False - он уже существовал,
+        matched (bool): Пользователи лайкнули друг друга.
+    """
+    created: bool
+    matched: bool
+
+
+def match_statement(user_id: int, liked_user_id: int):
+    """
+    Запрос записи пары взаимной симпатии, если есть ответный лайк.
+
+    Выполняется в транзакции лайка; rowcount показывает, образовалась ли пара.
+    """
+    first_user_id, second_user_id = sorted((user_id, liked_user_id))
+    reciprocal = exists().where(LikeModel.user_id == liked_user_id, LikeModel.liked_user_id == user_id)
+    return (
+        sqlite_insert(MatchModel)
+        .from_select(
+            [MatchModel.first_user_id, MatchModel.second_user_id],
+            select(literal(first_user_id), literal(second_user_id)).where(reciprocal),
+        )
+        .on_conflict_do_nothing(index_elements=[MatchModel.first_user_id, MatchModel.second_user_id])
+    )
+
+
 class LikeService:
     """
     Сервис для работы с лайками пользователей.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных,
+        buffer (LikeWriteBuffer | None): Буфер отложенной записи; None - лайки записываются сразу.
     """
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, buffer: LikeWriteBuffer | None = None):
         self.db = db
+        self.buffer = buffer
 
     async def user_exists(self, user_id: int) -> bool:
         """
-        Проверяет, существует ли пользователь в базе данных.
+        Проверяет, существует ли активный пользователь в базе данных.
 
         Args:
             user_id (int): ID пользователя.
 
         Returns:
-            bool: True, если пользователь существует, иначе False.
+            bool: True, если пользователь существует и активен, иначе False.
+        """
+        query = select(UserModel.id).filter(UserModel.id == user_id, UserModel.is_active == True).limit(1)
+        result = await self.db.execute(query)
+        return result.first() is not None
+
+    async def is_matched(self, user_id: int, other_user_id: int) -> bool:
+        """
+        Проверяет, лайкнули ли пользователи друг друга.
+
+        Args:
+            user_id (int): ID первого пользователя,
+            other_user_id (int): ID второго пользователя.
+
+        Returns:
+            bool: True, если пара взаимной симпатии записана.
         """
-        query = select(UserModel).filter(UserModel.id == user_id)
+        first_user_id, second_user_id = sorted((user_id, other_user_id))
+        query = select(MatchModel.id).filter(MatchModel.first_user_id == first_user_id,
+                                             MatchModel.second_user_id == second_user_id).limit(1)
         result = await self.db.execute(query)
-        user = result.scalars().first()
-        return user is not None
+        return result.first() is not None
 
-    async def create_like(self, user_id: int, liked_user_id: int) -> None:
+    async def create_like(self, user_id: int, liked_user_id: int) -> bool:
         """
         Создает лайк от одного пользователя к другому.
 
@@ -43,40 +102,114 @@ class LikeService:
             user_id (int): ID пользователя, который ставит лайк.
             liked_user_id (int): ID пользователя, которому ставят лайк.
 
+        Returns:
+            bool: True, если лайк создан (или поставлен в очередь); False, если он уже существовал.
+
+        Raises:
+            Те же исключения, что и like.
+        """
+        return (await self.like(user_id, liked_user_id)).created
+
+    async def like(self, user_id: int, liked_user_id: int) -> LikeResult:
+        """
+        Создает лайк и определяет, образовалась ли взаимная симпатия.
+
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING вставляет лайк, только если получатель
+        существует и активен; существование автора проверяет внешний ключ, повторный лайк
+        отбрасывает уникальное ограничение. Если лайк вставлен, в той же транзакции второй
+        INSERT ... SELECT записывает пару в matches при наличии ответного лайка, а анкета
+        получателя удаляется из очереди просмотра автора (feed_candidates).
+        Дополнительные запросы выполняются, только если ничего не вставлено, - чтобы отличить
+        повторный лайк от отсутствующего получателя.
+
+        С буфером лайк только ставится в очередь на запись (LikeWriteBuffer), пара записывается
+        и анкета удаляется из очереди просмотра при сбросе буфера, а matched определяется по ответному лайку в БД или в буфере.
+
+        Args:
+            user_id (int): ID пользователя, который ставит лайк.
+            liked_user_id (int): ID пользователя, которому ставят лайк.
+
+        Returns:
+            LikeResult: Создан ли лайк и образовалась ли пара.
+
         Raises:
-            ValueError: Если user_id и liked_user_id совпадают или если один из пользователей не существует.
+            LikeBufferOverloaded: Если буфер лайков заполнен,
+            ValueError: Если user_id и liked_user_id совпадают или если автор лайка не существует.
+            UserNotFound: Если получатель не существует или неактивен.
             SQLAlchemyError: В случае ошибки во время работы с базой данных.
         """
         if user_id == liked_user_id:
             raise ValueError("Пользователь не может лайкать сам себя")
 
-        # Проверка существования пользователей
-        if not await self.user_exists(user_id):
-            raise ValueError(f"Пользователь с ID {user_id} не существует.")
-        if not await self.user_exists(liked_user_id):
-            raise ValueError(f"Пользователь с ID {liked_user_id} не существует.")
-
-        try:
-            # Проверяем, существует ли уже лайк
-            query = select(LikeModel).filter(
-                LikeModel.user_id == user_id,
-                LikeModel.liked_user_id == liked_user_id
+        if self.buffer is not None:
+            # Получатель проверяется сразу (чтение не ждет записи), автор - при записи пачки
+            if not await self.user_exists(liked_user_id):
+                raise UserNotFound("Пользователь не найден")
+            # Транзакция чтения не должна держать соединение-писатель, пока буфер ждет места:
+            # место освобождает запись пачки, которой нужен писатель
+            await self.db.commit()
+            created = await self.buffer.add(user_id, liked_user_id)
+            matched = self.buffer.is_pending(liked_user_id, user_id) or await self._reciprocal_like_exists(
+                user_id, liked_user_id)
+            return LikeResult(created, matched)
+
+        target_exists = exists().where(UserModel.id == liked_user_id, UserModel.is_active == True)
+        statement = (
+            sqlite_insert(LikeModel)
+            .from_select(
+                [LikeModel.user_id, LikeModel.liked_user_id],
+                select(literal(user_id), literal(liked_user_id)).where(target_exists),
             )
-            result = await self.db.execute(query)
-            existing_like = result.scalars().first()
-
-            if existing_like:
-                logger.info(f"Лайк уже существует от пользователя {user_id} к пользователю {liked_user_id}")
-                return
-
-            # Создаем новый лайк
-            new_like = LikeModel(user_id=user_id, liked_user_id=liked_user_id)
-            self.db.add(new_like)
+            .on_conflict_do_nothing(index_elements=[LikeModel.user_id, LikeModel.liked_user_id])
+        )
+        try:
+            result = await self.db.execute(statement)
+            matched = False
+            if result.rowcount:
+                matched = (await self.db.execute(match_statement(user_id, liked_user_id))).rowcount > 0
+                await self.db.execute(remove_candidate_statement(user_id, liked_user_id))
             await self.db.commit()
-            logger.info(f"Лайк создан от пользователя {user_id} к пользователю {liked_user_id}")
+
+        except IntegrityError as e:
+            # Единственное нарушаемое ограничение - внешний ключ автора лайка
+            await self.db.rollback()
+            raise ValueError(f"Пользователь с ID {user_id} не существует.") from e
 
         except SQLAlchemyError as e:
             await self.db.rollback()
             logger.error(f"Ошибка работы с базой данных при создании лайка: {e}")
             raise
 
+        if result.rowcount:
+            logger.info(f"Лайк создан от пользователя {user_id} к пользователю {liked_user_id}"
+                        f"{' (взаимная симпатия)' if matched else ''}")
+            return LikeResult(True, matched)
+
+        if not await self.user_exists(liked_user_id):
+            raise UserNotFound("Пользователь не найден")
+        logger.info(f"Лайк уже существует от пользователя {user_id} к пользователю {liked_user_id}")
+        return LikeResult(False, await self.is_matched(user_id, liked_user_id))
+
+    async def _reciprocal_like_exists(self, user_id: int, liked_user_id: int) -> bool:
+        query = select(LikeModel.id).filter(LikeModel.user_id == liked_user_id,
+                                            LikeModel.liked_user_id == user_id).limit(1)
+        result = await self.db.execute(query)
+        return result.first() is not None
+
+    async def get_liked_user_ids(self, user_id: int) -> list[int]:
+        """
+        Возвращает ID пользователей, которых лайкнул пользователь.
+
+        Включает лайки, еще не записанные из буфера, чтобы пользователь сразу видел свои лайки.
+
+        Args:
+            user_id (int): ID пользователя.
+
+        Returns:
+            list[int]: ID лайкнутых пользователей по возрастанию.
+        """
+        result = await self.db.execute(select(LikeModel.liked_user_id).filter(LikeModel.user_id == user_id))
+        liked = set(result.scalars().all())
+        if self.buffer is not None:
+            liked |= self.buffer.liked_user_ids(user_id)
+        return sorted(liked)
@@ -0,0 +1,114 @@
+"""
+Модуль: services.local_storage
+
+Предоставляет драйвер хранилища файлов на локальном диске.
+
+Все операции с файловой системой (включая stat, exists и remove) выполняются
+в пуле потоков, поэтому драйвер не блокирует цикл событий.
+Запись атомарна: данные пишутся во временный файл в целевом каталоге и переименовываются.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+
+from exceptions.exceptions import StorageError
+
+logger = logging.getLogger(__name__)
+
+# mkstemp создает файл с правами 0600; сохраненные файлы получают обычные права (с учетом umask),
+# чтобы каталог мог раздавать отдельный веб-сервер. umask читается один раз: его смена не потокобезопасна
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def write_atomic(path: str, data: bytes | memoryview) -> None:
+    """Записывает файл через временный файл в том же каталоге и переименование (блокирующий вызов)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            os.fchmod(tmp_file.fileno(), FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class LocalStorageDriver:
+    """
+    Драйвер хранилища на локальном диске (реализует StorageDriverProtocol).
+
+    Attributes:
+        root (str): Корневой каталог; ключ - путь относительно него.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        """Путь к файлу объекта."""
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Недопустимый ключ: {key}")
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.path(key))
+
+    def _get(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as stored_file:
+            return stored_file.read()
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, data: bytes | memoryview) -> None:
+        try:
+            await asyncio.to_thread(write_atomic, self.path(key), data)
+        except OSError as e:
+            raise StorageError(f"Ошибка при записи файла {key}") from e
+
+    async def touch(self, key: str) -> None:
+        await asyncio.to_thread(os.utime, self.path(key))
+
+    def _modified_at(self, key: str) -> float | None:
+        try:
+            return os.stat(self.path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    async def modified_at(self, key: str) -> float | None:
+        return await asyncio.to_thread(self._modified_at, key)
+
+    def _delete_many(self, keys: list[str]) -> int:
+        removed = 0
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def delete_many(self, keys: list[str]) -> int:
+        try:
+            return await asyncio.to_thread(self._delete_many, keys)
+        except OSError as e:
+            raise StorageError("Ошибка при удалении файлов") from e
+
+    def _local_path(self, key: str) -> str:
+        path = self.path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(key)
+        return path
+
+    async def local_path(self, key: str) -> str:
+        return await asyncio.to_thread(self._local_path, key)
+
+    async def close(self) -> None:
+        pass
@@ -3,10 +3,160 @@
 
 Этот модуль предоставляет утилиту для хеширования и проверки паролей
 с использованием Passlib и алгоритма bcrypt.
+
+bcrypt намеренно медленный, поэтому в асинхронном коде следует использовать
+асинхронные методы: они выполняют вычисления в ограниченном пуле потоков
+или процессов (HasherExecutor) и не блокируют цикл событий.
 """
 
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable
+
 from passlib.context import CryptContext
 
+from config.settings import PASSWORD_HASHER_POOL, PASSWORD_HASHER_WORKERS, PASSWORD_HASHER_MAX_QUEUE
+from exceptions.exceptions import PasswordHasherOverloaded
+
+logger = logging.getLogger(__name__)
+
+# Контекст создается один раз на процесс (в том числе в воркерах пула процессов)
+_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    """Хэширует пароль; функция верхнего уровня, чтобы её можно было передать в пул процессов."""
+    return _pwd_context.hash(password)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    """Хэширует пачку паролей за одну задачу пула (одна пересылка в процесс вместо одной на пароль)."""
+    return [_pwd_context.hash(password) for password in passwords]
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль; функция верхнего уровня, чтобы её можно было передать в пул процессов."""
+    return _pwd_context.verify(plain_password, hashed_password)
+
+
+@dataclass
+class HasherStats:
+    """
+    Метрики пула хеширования.
+
+    Attributes:
+        submitted (int): Принято задач,
+        completed (int): Успешно выполнено задач,
+        failed (int): Задач, завершившихся исключением,
+        rejected (int): Отклонено задач из-за переполнения очереди,
+        in_flight (int): Задач в работе и в очереди прямо сейчас,
+        peak_in_flight (int): Максимальное одновременное число задач,
+        total_seconds (float): Суммарное время выполнения задач (включая ожидание в очереди).
+    """
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    total_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Возвращает метрики в виде словаря, дополненного средним временем задачи."""
+        data = asdict(self)
+        finished = self.completed + self.failed
+        data["avg_seconds"] = self.total_seconds / finished if finished else 0.0
+        return data
+
+
+class HasherExecutor:
+    """
+    Ограниченный пул для выполнения bcrypt вне цикла событий.
+
+    Одновременно в пуле может находиться не более workers + max_queue задач;
+    остальные отклоняются сразу с PasswordHasherOverloaded, чтобы всплеск
+    логинов не копил бесконечную очередь.
+
+    Attributes:
+        kind (str): Тип пула: 'thread' или 'process',
+        workers (int): Число воркеров,
+        max_queue (int): Сколько задач может ожидать свободного воркера,
+        stats (HasherStats): Метрики пула.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип пула: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.stats = HasherStats()
+        self._executor: Executor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Число задач, ожидающих свободного воркера."""
+        return max(0, self.stats.in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        """Лениво создает пул при первой задаче."""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hasher")
+            logger.info("Создан пул хеширования: %s, воркеров: %d", self.kind, self.workers)
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет функцию в пуле.
+
+        Args:
+            func (Callable): Функция верхнего уровня (должна сериализоваться для пула процессов),
+            *args: Аргументы функции.
+
+        Returns:
+            Any: Результат функции.
+
+        Raises:
+            PasswordHasherOverloaded: Если очередь пула заполнена.
+        """
+        stats = self.stats
+        if stats.in_flight >= self.workers + self.max_queue:
+            stats.rejected += 1
+            logger.warning("Очередь хеширования заполнена (%d задач), задача отклонена", stats.in_flight)
+            raise PasswordHasherOverloaded("Сервис перегружен, повторите попытку позже")
+
+        stats.submitted += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            stats.completed += 1
+            return result
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.total_seconds += time.perf_counter() - started
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Останавливает пул; при следующей задаче он будет создан заново."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Общий пул приложения
+hasher_executor = HasherExecutor(PASSWORD_HASHER_POOL, PASSWORD_HASHER_WORKERS, PASSWORD_HASHER_MAX_QUEUE)
+
 
 class PasswordHasher:
     """
@@ -14,13 +164,20 @@ class PasswordHasher:
 
     Attributes:
         pwd_context (CryptContext): Контекст, используемый для хеширования
-                                    и проверки паролей с использованием схемы bcrypt.
+                                    и проверки паролей с использованием схемы bcrypt,
+        executor (HasherExecutor): Пул для асинхронных методов.
     """
 
-    def __init__(self):
-        """Инициализация PasswordHasher с использованием схемы bcrypt."""
+    def __init__(self, executor: HasherExecutor | None = None):
+        """
+        Инициализация PasswordHasher с использованием схемы bcrypt.
+
+        Args:
+            executor (HasherExecutor | None): Пул для асинхронных методов; по умолчанию общий пул приложения.
+        """
 
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = _pwd_context
+        self.executor = executor or hasher_executor
 
     def hash_password(self, password: str) -> str:
         """
@@ -46,3 +203,60 @@ class PasswordHasher:
             bool: True, если пароли совпадают, иначе False.
         """
         return self.pwd_context.verify(plain_password, hashed_password)
+
+    async def hash_password_async(self, password: str) -> str:
+        """
+        Хэширует пароль в пуле, не блокируя цикл событий.
+
+        Args:
+            password (str): Пароль в открытом виде для хеширования.
+
+        Returns:
+            str: Хэшированный пароль.
+
+        Raises:
+            PasswordHasherOverloaded: Если очередь пула заполнена.
+        """
+        return await self.executor.run(_hash, password)
+
+    async def hash_passwords_async(self, passwords: list[str]) -> list[str]:
+        """
+        Хэширует пачку паролей, распределяя ее поровну между воркерами пула (для массового импорта).
+
+        Args:
+            passwords (list[str]): Пароли в открытом виде.
+
+        Returns:
+            list[str]: Хэши в том же порядке.
+
+        Raises:
+            PasswordHasherOverloaded: Если очередь пула заполнена.
+        """
+        if not passwords:
+            return []
+        chunk_size = -(-len(passwords) // self.executor.workers)
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        results = await asyncio.gather(*(self.executor.run(_hash_many, chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Проверяет пароль в пуле, не блокируя цикл событий.
+
+        Args:
+            plain_password (str): Пароль в открытом виде для проверки.
+            hashed_password (str): Хэшированный пароль для сравнения.
+
+        Returns:
+            bool: True, если пароли совпадают, иначе False.
+
+        Raises:
+            PasswordHasherOverloaded: Если очередь пула заполнена.
+        """
+        return await self.executor.run(_verify, plain_password, hashed_password)
+
+    def metrics(self) -> dict[str, Any]:
+        """Возвращает метрики пула хеширования."""
+        data = self.executor.stats.as_dict()
+        data["queue_depth"] = self.executor.queue_depth
+        return data
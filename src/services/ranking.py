@@ -0,0 +1,327 @@
+"""
+Модуль: services.ranking
+
+Предоставляет ранжирование анкет по признакам пользователей.
+
+- FeatureStore хранит признаки всех пользователей по столбцам в массивах NumPy (пол,
+  активность, наличие аватара, число полученных и поставленных лайков, координаты);
+  строки упорядочены по ID, поэтому ID переводятся в номера строк через searchsorted.
+- refresh дочитывает только новых пользователей (id > последнего загруженного) и новые лайки
+  (likes.id > последнего учтенного; ID в обеих таблицах не переиспользуются - AUTOINCREMENT);
+  изменения существующих строк и удаления учитывает полная перезагрузка reload, которую
+  фоновая задача выполняет реже. reload собирает столбцы в отдельном FeatureStore и подменяет
+  их одним шагом, поэтому ранжирование во время загрузки видит прежние признаки.
+- RankingEngine оценивает тысячи кандидатов одним вызовом функции оценки над столбцами
+  и выбирает лучшие k через argpartition, сортируя только их.
+Функция оценки подключаемая (RankingScorerProtocol); по умолчанию - WeightedScorer.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Iterable, Mapping
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config.settings import RANKING_REFRESH_SECONDS, RANKING_FULL_RELOAD_SECONDS
+from interfaces.protocols import RankingScorerProtocol
+from models.like import LikeModel
+from models.user import UserModel
+from services.geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+GENDER_CODES = {"male": 0, "female": 1}
+UNKNOWN_GENDER = -1
+FEATURE_COLUMNS = {
+    "id": np.int64,
+    "gender": np.int8,
+    "active": np.bool_,
+    "has_avatar": np.bool_,
+    "likes_received": np.int32,
+    "likes_given": np.int32,
+    "latitude": np.float64,
+    "longitude": np.float64,
+}
+LOAD_BATCH_SIZE = 10_000
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Номера k наибольших оценок по убыванию (оценки -inf не включаются).
+
+    argpartition выбирает k лучших за линейное время, сортируются только они.
+    """
+    candidates = np.flatnonzero(scores > -np.inf)
+    if k < len(candidates):
+        best = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[best]
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+class FeatureStore:
+    """
+    Признаки пользователей по столбцам.
+
+    Attributes:
+        size (int): Число загруженных пользователей,
+        last_user_id (int): Наибольший загруженный ID пользователя,
+        last_like_id (int): Наибольший учтенный ID лайка,
+        refreshed_at (float | None): Время последнего обновления,
+        reloaded_at (float | None): Время последней полной перезагрузки.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._columns = {name: np.zeros(capacity, dtype) for name, dtype in FEATURE_COLUMNS.items()}
+        self.size = 0
+        self.last_user_id = 0
+        self.last_like_id = 0
+        self.refreshed_at: float | None = None
+        self.reloaded_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    def view(self) -> dict[str, np.ndarray]:
+        """Возвращает столбцы признаков загруженных пользователей (без копирования)."""
+        return {name: column[:self.size] for name, column in self._columns.items()}
+
+    def rows_for(self, user_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Переводит ID пользователей в номера строк.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Номера строк найденных пользователей и маска найденных ID.
+        """
+        ids = self._columns["id"][:self.size]
+        positions = np.searchsorted(ids, user_ids)
+        found = positions < self.size
+        found[found] = ids[positions[found]] == user_ids[found]
+        return positions[found], found
+
+    def _reserve(self, extra: int) -> None:
+        capacity = len(self._columns["id"])
+        if self.size + extra <= capacity:
+            return
+        # Удвоение емкости: добавление новых пользователей - амортизированно O(1) на строку
+        capacity = max(2 * capacity, self.size + extra)
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def append_users(self, rows: list[tuple]) -> None:
+        """
+        Добавляет пользователей с ID больше уже загруженных.
+
+        Args:
+            rows (list[tuple]): Строки (id, gender, is_active, has_avatar, latitude, longitude) по возрастанию ID.
+        """
+        if not rows:
+            return
+        self._reserve(len(rows))
+        ids, genders, active, avatars, latitudes, longitudes = zip(*rows)
+        part = slice(self.size, self.size + len(rows))
+        columns = self._columns
+        columns["id"][part] = ids
+        columns["gender"][part] = [GENDER_CODES.get(gender, UNKNOWN_GENDER) for gender in genders]
+        columns["active"][part] = [bool(value) for value in active]
+        columns["has_avatar"][part] = avatars
+        columns["latitude"][part] = [np.nan if value is None else value for value in latitudes]
+        columns["longitude"][part] = [np.nan if value is None else value for value in longitudes]
+        columns["likes_received"][part] = 0
+        columns["likes_given"][part] = 0
+        self.size += len(rows)
+        self.last_user_id = int(ids[-1])
+
+    def add_like_counts(self, column: str, user_ids: Iterable[int], counts: Iterable[int]) -> None:
+        """Прибавляет число лайков к столбцу likes_received или likes_given."""
+        user_ids = np.fromiter(user_ids, np.int64)
+        if not len(user_ids):
+            return
+        rows, found = self.rows_for(user_ids)
+        np.add.at(self._columns[column], rows, np.fromiter(counts, np.int32)[found])
+
+    async def refresh(self, db: AsyncSession) -> tuple[int, int]:
+        """
+        Дочитывает новых пользователей и новые лайки.
+
+        Returns:
+            tuple[int, int]: Число добавленных пользователей и учтенных лайков.
+        """
+        async with self._lock:
+            return await self._refresh(db)
+
+    async def reload(self, db: AsyncSession) -> int:
+        """
+        Перезагружает все признаки (учитывает изменения и удаления пользователей и лайков).
+
+        Returns:
+            int: Число загруженных пользователей.
+        """
+        async with self._lock:
+            loaded = FeatureStore(capacity=max(len(self._columns["id"]), 1))
+            await loaded._refresh(db)
+            # Подмена без await между присваиваниями: читатели видят либо прежние, либо новые признаки
+            self._columns, self.size = loaded._columns, loaded.size
+            self.last_user_id, self.last_like_id = loaded.last_user_id, loaded.last_like_id
+            self.refreshed_at = self.reloaded_at = loaded.refreshed_at
+            logger.info("Признаки для ранжирования загружены: %d пользователей", self.size)
+            return self.size
+
+    async def _refresh(self, db: AsyncSession) -> tuple[int, int]:
+        users = 0
+        while True:
+            result = await db.execute(
+                select(UserModel.id, UserModel.gender, UserModel.is_active, UserModel.avatar_url.is_not(None),
+                       UserModel.latitude, UserModel.longitude)
+                .filter(UserModel.id > self.last_user_id)
+                .order_by(UserModel.id)
+                .limit(LOAD_BATCH_SIZE)
+            )
+            rows = [tuple(row) for row in result.all()]
+            self.append_users(rows)
+            users += len(rows)
+            if len(rows) < LOAD_BATCH_SIZE:
+                break
+
+        # Граница фиксируется заранее, чтобы лайки, вставленные во время чтения, не учлись дважды
+        last_like_id = await db.scalar(select(func.max(LikeModel.id))) or 0
+        likes = 0
+        if last_like_id > self.last_like_id:
+            new_likes = (LikeModel.id > self.last_like_id, LikeModel.id <= last_like_id)
+            for column, key in (("likes_received", LikeModel.liked_user_id), ("likes_given", LikeModel.user_id)):
+                result = await db.execute(select(key, func.count()).filter(*new_likes).group_by(key))
+                rows = result.all()
+                self.add_like_counts(column, (row[0] for row in rows), (row[1] for row in rows))
+                if column == "likes_received":
+                    likes = sum(row[1] for row in rows)
+            self.last_like_id = last_like_id
+        self.refreshed_at = time.time()
+        return users, likes
+
+    async def run(self, session_factory: Callable[[], AsyncSession], interval: float,
+                  full_reload_interval: float) -> None:
+        """Обновляет признаки с заданным интервалом, пока задача не остановлена."""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                async with session_factory() as session:
+                    if self.reloaded_at is None or time.time() - self.reloaded_at >= full_reload_interval:
+                        await self.reload(session)
+                    else:
+                        await self.refresh(session)
+            except Exception as e:
+                logger.error(f"Ошибка обновления признаков для ранжирования: {e}")
+
+    def start(self, session_factory: Callable[[], AsyncSession], interval: float = RANKING_REFRESH_SECONDS,
+              full_reload_interval: float = RANKING_FULL_RELOAD_SECONDS) -> None:
+        """Запускает фоновое обновление признаков в текущем цикле событий."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self.run(session_factory, interval, full_reload_interval))
+
+    async def stop(self) -> None:
+        """Останавливает фоновое обновление признаков."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+class WeightedScorer:
+    """
+    Функция оценки по умолчанию (реализует RankingScorerProtocol): взвешенная сумма признаков.
+
+    - популярность: log(1 + полученные лайки);
+    - активность: log(1 + поставленные лайки);
+    - наличие аватара;
+    - близость: exp(-расстояние / distance_scale_km), если координаты известны у обоих;
+    - другой пол, чем у пользователя.
+    Неактивные пользователи исключаются (-inf).
+
+    Attributes:
+        weights (dict[str, float]): Веса слагаемых,
+        distance_scale_km (float): Расстояние, на котором вклад близости падает в e раз.
+    """
+
+    DEFAULT_WEIGHTS = {"popularity": 1.0, "activity": 0.5, "avatar": 1.0, "proximity": 3.0, "other_gender": 2.0}
+
+    def __init__(self, weights: Mapping[str, float] | None = None, distance_scale_km: float = 25.0):
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.distance_scale_km = distance_scale_km
+
+    def __call__(self, candidates: Mapping[str, np.ndarray], viewer: Mapping[str, Any]) -> np.ndarray:
+        weights = self.weights
+        scores = weights["popularity"] * np.log1p(candidates["likes_received"])
+        scores += weights["activity"] * np.log1p(candidates["likes_given"])
+        scores += weights["avatar"] * candidates["has_avatar"]
+        if not np.isnan(viewer["latitude"]):
+            distance = haversine_km(viewer["latitude"], viewer["longitude"],
+                                    candidates["latitude"], candidates["longitude"])
+            scores += weights["proximity"] * np.nan_to_num(np.exp(-distance / self.distance_scale_km))
+        if viewer["gender"] != UNKNOWN_GENDER:
+            scores += weights["other_gender"] * (candidates["gender"] != viewer["gender"])
+        scores[~candidates["active"]] = -np.inf
+        return scores
+
+
+class RankingEngine:
+    """
+    Ранжирование кандидатов по признакам из FeatureStore.
+
+    Attributes:
+        store (FeatureStore): Признаки пользователей,
+        scorer (RankingScorerProtocol): Функция оценки.
+    """
+
+    def __init__(self, store: FeatureStore, scorer: RankingScorerProtocol | None = None):
+        self.store = store
+        self.scorer = scorer or WeightedScorer()
+
+    def viewer_features(self, viewer_id: int) -> dict[str, Any]:
+        """Признаки пользователя, для которого ранжируются анкеты (по умолчанию, если он еще не загружен)."""
+        rows, _ = self.store.rows_for(np.array([viewer_id], np.int64))
+        if not len(rows):
+            return {"id": viewer_id, "gender": UNKNOWN_GENDER, "active": True, "has_avatar": False,
+                    "likes_received": 0, "likes_given": 0, "latitude": np.nan, "longitude": np.nan}
+        return {name: column[rows[0]] for name, column in self.store.view().items()}
+
+    def rank(self, viewer_id: int, candidate_ids: Iterable[int] | None, k: int) -> list[tuple[int, float]]:
+        """
+        Выбирает k лучших кандидатов.
+
+        Args:
+            viewer_id (int): Пользователь, для которого ранжируются анкеты (сам он исключается),
+            candidate_ids (Iterable[int] | None): ID кандидатов; None - все загруженные пользователи.
+                                                  Кандидаты, которых еще нет в FeatureStore, пропускаются,
+            k (int): Сколько кандидатов вернуть.
+
+        Returns:
+            list[tuple[int, float]]: ID и оценки лучших кандидатов по убыванию оценки.
+        """
+        columns = self.store.view()
+        if candidate_ids is None:
+            candidates = columns
+        else:
+            rows, _ = self.store.rows_for(np.fromiter(candidate_ids, np.int64))
+            candidates = {name: column[rows] for name, column in columns.items()}
+        if not len(candidates["id"]) or k <= 0:
+            return []
+
+        scores = np.asarray(self.scorer(candidates, self.viewer_features(viewer_id)), np.float64)
+        scores[candidates["id"] == viewer_id] = -np.inf
+        best = top_k(scores, k)
+        return list(zip(candidates["id"][best].tolist(), scores[best].tolist()))
+
+
+# Признаки и ранжирование процесса (используются при RANKING_ENABLED)
+feature_store = FeatureStore()
+ranking_engine = RankingEngine(feature_store)
@@ -0,0 +1,160 @@
+"""
+Модуль: services.rate_limiter
+
+Предоставляет ограничитель частоты запросов со скользящим окном
+и хранилище счетчиков в памяти процесса.
+
+Используется приближение скользящего окна по двум соседним фиксированным окнам:
+оценка = счетчик_предыдущего_окна * (1 - доля_прошедшего_текущего_окна) + счетчик_текущего_окна.
+На каждый ключ хранится всего три числа, независимо от числа попыток.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from config.settings import (LOGIN_RATE_LIMIT_WINDOW_SECONDS, LOGIN_RATE_LIMIT_PER_EMAIL,
+                             LOGIN_RATE_LIMIT_PER_IP, LOGIN_RATE_LIMIT_MAX_KEYS)
+from exceptions.exceptions import RateLimitExceeded
+from interfaces.protocols import RateLimitBackendProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryRateLimitBackend:
+    """
+    Хранилище счетчиков в памяти процесса с ограничением числа ключей.
+
+    Для каждого ключа хранится [номер последнего окна, счетчик этого окна, счетчик предыдущего окна].
+    При превышении max_keys вытесняются давно не использованные ключи (LRU).
+
+    Attributes:
+        max_keys (int): Максимальное число хранимых ключей,
+        evictions (int): Число вытесненных ключей.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.evictions = 0
+        self._counters: OrderedDict[str, list[int]] = OrderedDict()
+
+    async def increment(self, key: str, bucket: int, ttl: float) -> int:
+        """Увеличивает счетчик ключа в окне bucket; ttl не нужен, устаревшие окна сбрасываются сами."""
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = [bucket, 0, 0]
+            self._counters[key] = counter
+        elif counter[0] != bucket:
+            previous = counter[1] if counter[0] == bucket - 1 else 0
+            counter[:] = [bucket, 0, previous]
+        counter[1] += 1
+
+        self._counters.move_to_end(key)
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+            self.evictions += 1
+        return counter[1]
+
+    async def get(self, key: str, bucket: int) -> int:
+        """Возвращает счетчик ключа в окне bucket."""
+        counter = self._counters.get(key)
+        if counter is None:
+            return 0
+        if counter[0] == bucket:
+            return counter[1]
+        if counter[0] == bucket + 1:
+            return counter[2]
+        return 0
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class SlidingWindowRateLimiter:
+    """
+    Ограничитель частоты со скользящим окном.
+
+    Каждый вызов hit засчитывается, в том числе отклоненный: пока перебор
+    продолжается, ключ остается заблокированным.
+
+    Attributes:
+        backend (RateLimitBackendProtocol): Хранилище счетчиков,
+        limit (int): Допустимое число попыток за окно,
+        window_seconds (float): Длина окна в секундах.
+    """
+
+    def __init__(self, backend: RateLimitBackendProtocol, limit: int, window_seconds: float):
+        self.backend = backend
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    async def hit(self, key: str, now: float | None = None) -> None:
+        """
+        Засчитывает попытку для ключа.
+
+        Args:
+            key (str): Ключ лимита (например, email или IP),
+            now (float | None): Текущее время (unix timestamp); по умолчанию time.time().
+
+        Raises:
+            RateLimitExceeded: Если лимит превышен; retry_after - через сколько секунд повторить.
+        """
+        now = time.time() if now is None else now
+        window = self.window_seconds
+        bucket = int(now // window)
+        elapsed = now - bucket * window
+
+        current = await self.backend.increment(key, bucket, ttl=2 * window)
+        previous = await self.backend.get(key, bucket - 1)
+        estimate = previous * (1 - elapsed / window) + current
+        if estimate <= self.limit:
+            return
+
+        if current > self.limit:
+            # Текущее окно уже переполнено: ждем следующего, пока его вклад не снизится до лимита
+            wait = (window - elapsed) + window * (1 - self.limit / current)
+        else:
+            # Достаточно, чтобы вклад предыдущего окна снизился до оставшегося запаса
+            wait = window * (1 - (self.limit - current) / previous) - elapsed
+        retry_after = max(1, math.ceil(wait))
+        logger.warning("Превышен лимит попыток для ключа %s, повтор через %d с", key, retry_after)
+        raise RateLimitExceeded("Слишком много попыток, повторите позже", retry_after)
+
+
+class LoginRateLimiter:
+    """
+    Ограничение попыток входа одновременно по email и по IP клиента.
+
+    Attributes:
+        per_email (SlidingWindowRateLimiter): Лимит по email,
+        per_ip (SlidingWindowRateLimiter): Лимит по IP клиента.
+    """
+
+    def __init__(self, backend: RateLimitBackendProtocol, per_email: int, per_ip: int, window_seconds: float):
+        self.per_email = SlidingWindowRateLimiter(backend, per_email, window_seconds)
+        self.per_ip = SlidingWindowRateLimiter(backend, per_ip, window_seconds)
+
+    async def check(self, email: str, client_ip: str | None) -> None:
+        """
+        Засчитывает попытку входа.
+
+        Args:
+            email (str): Email из формы входа,
+            client_ip (str | None): IP клиента, если известен.
+
+        Raises:
+            RateLimitExceeded: Если превышен любой из лимитов.
+        """
+        if client_ip:
+            await self.per_ip.hit(f"login:ip:{client_ip}")
+        await self.per_email.hit(f"login:email:{email.strip().lower()}")
+
+
+# Общий ограничитель попыток входа
+login_rate_limiter = LoginRateLimiter(
+    InMemoryRateLimitBackend(LOGIN_RATE_LIMIT_MAX_KEYS),
+    LOGIN_RATE_LIMIT_PER_EMAIL,
+    LOGIN_RATE_LIMIT_PER_IP,
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+)
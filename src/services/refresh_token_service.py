@@ -0,0 +1,208 @@
+"""
+Модуль: services.refresh_token_service
+
+Предоставляет сервис для выдачи и ротации refresh-токенов.
+Refresh-токен - случайная непрозрачная строка; в БД хранится только ее дайджест.
+Каждый обмен токена на новый помечает старый использованным, а повторное
+предъявление использованного токена отзывает все токены семейства.
+Использованные токены хранятся до истечения (для обнаружения повторов) и затем удаляются
+фоновой задачей RefreshTokenPurger.
+"""
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+from typing import Callable
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config.settings import REFRESH_EXPIRES_SECONDS, REFRESH_PURGE_INTERVAL_SECONDS
+from exceptions.exceptions import DatabaseError, TokenExpired, TokenInvalid, TokenReused
+from models.refresh_token import RefreshTokenModel
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenService:
+    """
+    Сервис для работы с refresh-токенами.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        """Возвращает SHA-256 дайджест токена."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def _add_token(self, user_id: int, family_id: bytes) -> str:
+        """Создает новый токен и добавляет его запись в сессию (без commit)."""
+        token = secrets.token_urlsafe(32)
+        self.db.add(RefreshTokenModel(
+            token_hash=self._digest(token),
+            user_id=user_id,
+            family_id=family_id,
+            expires_at=int(time.time()) + REFRESH_EXPIRES_SECONDS,
+            used=False,
+        ))
+        return token
+
+    async def issue(self, user_id: int) -> str:
+        """
+        Выдает refresh-токен новому семейству (при логине).
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+
+        Returns:
+            str: Refresh-токен.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        try:
+            token = self._add_token(user_id, secrets.token_bytes(16))
+            await self.db.commit()
+            logger.info("Выдан refresh-токен пользователю %d", user_id)
+            return token
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при выдаче refresh-токена: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def rotate(self, token: str) -> tuple[int, str]:
+        """
+        Обменивает refresh-токен на новый из того же семейства.
+
+        Args:
+            token (str): Предъявленный refresh-токен.
+
+        Returns:
+            tuple[int, str]: Идентификатор пользователя и новый refresh-токен.
+
+        Raises:
+            TokenInvalid: Если токен неизвестен,
+            TokenExpired: Если срок действия токена истек,
+            TokenReused: Если токен уже был использован; семейство при этом отзывается,
+            DatabaseError: В случае ошибки базы данных.
+        """
+        digest = self._digest(token)
+        try:
+            result = await self.db.execute(select(RefreshTokenModel).filter(RefreshTokenModel.token_hash == digest))
+            record = result.scalars().first()
+            if record is None:
+                raise TokenInvalid("Invalid refresh token")
+            if record.expires_at <= time.time():
+                raise TokenExpired("Refresh token expired")
+
+            reused = record.used
+            if not reused:
+                # Условный UPDATE защищает от гонки двух одновременных ротаций одного токена
+                marked = await self.db.execute(
+                    update(RefreshTokenModel)
+                    .where(RefreshTokenModel.token_hash == digest, RefreshTokenModel.used == False)  # noqa: E712
+                    .values(used=True)
+                )
+                reused = marked.rowcount == 0
+            if reused:
+                await self.revoke_family(record.family_id)
+                logger.warning("Повторное использование refresh-токена пользователя %d, семейство отозвано",
+                               record.user_id)
+                raise TokenReused("Refresh token reuse detected")
+
+            new_token = self._add_token(record.user_id, record.family_id)
+            await self.db.commit()
+            logger.info("Refresh-токен пользователя %d обновлен", record.user_id)
+            return record.user_id, new_token
+
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Ошибка при ротации refresh-токена: {e}")
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def revoke_family(self, family_id: bytes) -> None:
+        """
+        Отзывает все токены семейства.
+
+        Args:
+            family_id (bytes): Идентификатор семейства.
+        """
+        await self.db.execute(delete(RefreshTokenModel).where(RefreshTokenModel.family_id == family_id))
+        await self.db.commit()
+
+    async def purge_expired(self) -> int:
+        """
+        Удаляет истекшие токены.
+
+        Returns:
+            int: Число удаленных записей.
+        """
+        result = await self.db.execute(delete(RefreshTokenModel).where(RefreshTokenModel.expires_at <= time.time()))
+        await self.db.commit()
+        return result.rowcount
+
+
+class RefreshTokenPurger:
+    """
+    Периодическое удаление истекших refresh-токенов.
+
+    Attributes:
+        session_factory (Callable[[], AsyncSession]): Фабрика сессий базы данных,
+        interval (float): Интервал между запусками в секундах,
+        purged (int): Сколько записей удалено с момента запуска.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession],
+                 interval: float = REFRESH_PURGE_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.purged = 0
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> int:
+        """
+        Удаляет истекшие токены.
+
+        Returns:
+            int: Число удаленных записей.
+        """
+        async with self.session_factory() as session:
+            count = await RefreshTokenService(session).purge_expired()
+        self.purged += count
+        if count:
+            logger.info("Удалено истекших refresh-токенов: %d", count)
+        return count
+
+    async def run(self) -> None:
+        """Удаляет истекшие токены сразу и затем с заданным интервалом, пока задача не остановлена."""
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка удаления истекших refresh-токенов: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Запускает удаление в текущем цикле событий."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает удаление."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
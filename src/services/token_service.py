@@ -1,10 +1,13 @@
 # services/token_service.py
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 
 import jwt
 
-from config.settings import AUTH_SECRET, AUTH_EXPIRES_SECONDS
+from config.settings import AUTH_SECRET, AUTH_EXPIRES_SECONDS, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS
 from exceptions.exceptions import TokenExpired, TokenInvalid
 from schemas.token import TokenPayload, TokenData, TokenVerification
 
@@ -35,6 +38,103 @@ class TokenGenerator:
         return TokenData(access_token=encoded_jwt, expires_in=AUTH_EXPIRES_SECONDS)
 
 
+class VerifiedTokenCache:
+    """
+    LRU-кеш успешно проверенных токенов с ограниченным временем жизни.
+
+    Ключ - дайджест токена (сам токен в памяти не хранится), значение - готовый
+    TokenVerification. Запись живет не дольше ttl_seconds и не дольше exp токена,
+    поэтому истекший токен никогда не будет возвращен из кеша.
+    Возвращаемые объекты общие для всех запросов, изменять их нельзя.
+
+    Attributes:
+        maxsize (int): Максимальное число записей; 0 отключает кеш,
+        ttl_seconds (float): Максимальное время жизни записи,
+        hits (int): Число попаданий,
+        misses (int): Число промахов.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[TokenVerification, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        """Дайджест токена, используемый как ключ."""
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> TokenVerification | None:
+        """
+        Возвращает закешированный результат проверки токена.
+
+        Args:
+            token (str): JWT токен.
+
+        Returns:
+            TokenVerification | None: Результат проверки или None, если записи нет или она истекла.
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        verification, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return verification
+
+    def put(self, token: str, verification: TokenVerification, exp: float) -> None:
+        """
+        Сохраняет результат проверки токена.
+
+        Args:
+            token (str): JWT токен,
+            verification (TokenVerification): Результат проверки,
+            exp (float): Время истечения токена (unix timestamp).
+        """
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        expires_at = min(now + self.ttl_seconds, exp)
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        self._entries[key] = (verification, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает кеш и счетчики."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, float]:
+        """Возвращает счетчики кеша."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# Общий кеш приложения
+verified_token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
+
 class TokenVerifier:
     """ Класс для проверки токенов"""
     @staticmethod
@@ -46,12 +146,18 @@ class TokenVerifier:
         Returns:
             TokenVerification: Информация о проверенном токене
         """
-        logger.info(f"Verifying token: {token}")
+        cached = verified_token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        logger.debug("Verifying token")
         try:
             decoded = jwt.decode(token, AUTH_SECRET, algorithms=['HS256'])
             token_payload = TokenPayload(**decoded)
-            logger.info("Token successfully verified")
-            return token_payload.to_response()
+            verification = token_payload.to_response()
+            verified_token_cache.put(token, verification, decoded.get("exp", 0))
+            logger.debug("Token successfully verified")
+            return verification
         except jwt.ExpiredSignatureError:
             logger.warning("Token expired")
             raise TokenExpired("Token expired. Get new one")
@@ -0,0 +1,127 @@
+"""
+Модуль: services.upload_buffer
+
+Предоставляет буфер для потокового чтения загружаемых файлов.
+
+Файл читается частями с жестким ограничением размера (чтение прерывается,
+как только лимит превышен), небольшие файлы остаются в памяти, а крупные
+после порога сбрасываются во временный файл. Дальше по конвейеру данные
+передаются как memoryview (над BytesIO или mmap временного файла) без
+лишних копий в bytes.
+"""
+
+import io
+import logging
+import mmap
+import tempfile
+
+from fastapi import UploadFile
+
+from exceptions.exceptions import FileValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class UploadBuffer:
+    """
+    Буфер загруженного файла: в памяти до порога, дальше во временном файле.
+
+    Используется как контекстный менеджер; после выхода все memoryview, полученные
+    через view(), становятся недействительными.
+
+    Attributes:
+        spool_threshold (int): Размер, после которого данные сбрасываются во временный файл,
+        size (int): Число записанных байт.
+    """
+
+    def __init__(self, spool_threshold: int):
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self._memory: io.BytesIO | None = io.BytesIO()
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+        self._view: memoryview | None = None
+
+    @property
+    def on_disk(self) -> bool:
+        """Сброшены ли данные во временный файл."""
+        return self._file is not None
+
+    def write(self, chunk: bytes) -> None:
+        """Дописывает часть данных, при необходимости перенося буфер во временный файл."""
+        if self._view is not None:
+            raise RuntimeError("Нельзя дописывать в буфер после view()")
+        if self._file is None and self.size + len(chunk) > self.spool_threshold:
+            self._file = tempfile.TemporaryFile()
+            self._file.write(self._memory.getbuffer())
+            self._memory.close()
+            self._memory = None
+        (self._file or self._memory).write(chunk)
+        self.size += len(chunk)
+
+    @classmethod
+    async def from_upload(cls, upload: UploadFile, max_bytes: int, spool_threshold: int,
+                          chunk_size: int = 64 * 1024, prefix: bytes = b"") -> "UploadBuffer":
+        """
+        Читает загруженный файл частями в новый буфер.
+
+        Args:
+            upload (UploadFile): Загруженный файл,
+            max_bytes (int): Жесткий лимит размера; чтение прерывается при его превышении,
+            spool_threshold (int): Порог сброса во временный файл,
+            chunk_size (int): Размер читаемой части,
+            prefix (bytes): Уже прочитанное начало файла (например, заголовок для определения формата).
+
+        Returns:
+            UploadBuffer: Буфер с содержимым файла.
+
+        Raises:
+            FileValidationError: Если файл больше max_bytes.
+        """
+        buffer = cls(spool_threshold)
+        try:
+            buffer.write(prefix)
+            while chunk := await upload.read(chunk_size):
+                if buffer.size + len(chunk) > max_bytes:
+                    logger.warning("Загрузка прервана: файл больше %d байт", max_bytes)
+                    raise FileValidationError(f"Размер файла превышает {max_bytes} байт.")
+                buffer.write(chunk)
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer
+
+    def view(self) -> memoryview:
+        """Возвращает содержимое буфера как memoryview без копирования."""
+        if self._view is None:
+            if self._file is not None:
+                self._file.flush()
+                if self.size:
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._view = memoryview(self._mmap)
+                else:
+                    self._view = memoryview(b"")
+            else:
+                self._view = self._memory.getbuffer()
+        return self._view
+
+    def close(self) -> None:
+        """Освобождает память и удаляет временный файл."""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._memory is not None:
+            self._memory.close()
+            self._memory = None
+
+    def __enter__(self) -> "UploadBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,345 @@
+"""
+Модуль: services.user_import
+
+Предоставляет массовый импорт пользователей (перенос с платформ партнеров).
+
+Входной файл (CSV с заголовком или NDJSON - по одному JSON-объекту в строке) читается потоково,
+пачками по batch_size строк. Поля строки: email, password, first_name, last_name, gender
+и необязательный avatar - URL (http/https) или путь к файлу внутри avatar_root.
+Для каждой пачки:
+1. строки проверяются схемой UserCreate;
+2. одновременно хешируются пароли (пачка делится между процессами пула bcrypt)
+   и загружаются и обрабатываются аватары (с ограничением параллелизма);
+3. пользователи вставляются одним executemany в одной транзакции (UserService.insert_users).
+Ошибки не прерывают импорт: по каждой отклоненной строке передается запись отчета
+(номер строки, email, причина). Итоги и пропускная способность - в UserImportStats.
+
+Загрузка аватаров по URL может ограничиваться списком хостов (avatar_hosts, так делает маршрут
+импорта): адреса хоста должны быть публичными (не loopback, не частные сети, не link-local),
+соединение устанавливается с проверенным адресом, перенаправления не выполняются. Без списка (команда manage_users.py) разрешены любые URL.
+"""
+
+import asyncio
+import csv
+import io
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Any, Callable, Collection, Iterator, TextIO
+
+import httpx
+from pydantic import ValidationError
+
+from config.settings import (AVATAR_URL_PREFIX, AVATAR_MAX_BYTES, USER_IMPORT_BATCH_SIZE, USER_IMPORT_HASH_WORKERS,
+                             USER_IMPORT_AVATAR_CONCURRENCY, USER_IMPORT_AVATAR_TIMEOUT_SECONDS)
+from exceptions.exceptions import FileValidationError, DatabaseError
+from schemas.user import UserCreate
+from services.avatar_derivatives import avatar_derivatives
+from services.image_processor import ImageProcessingExecutor, image_processor
+from services.image_service import LocalImageService
+from services.password_hasher import HasherExecutor, PasswordHasher
+from services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+USER_FIELDS = ("email", "password", "first_name", "last_name", "gender")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Пул bcrypt для импорта отдельный: импорт не должен занимать пул, обслуживающий вход и регистрацию
+import_hasher_executor = HasherExecutor("process", USER_IMPORT_HASH_WORKERS, max_queue=4 * USER_IMPORT_HASH_WORKERS)
+
+
+def detect_format(filename: str | None, default: str = "csv") -> str:
+    """Определяет формат входного файла по расширению (.csv, .ndjson, .jsonl)."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    return default
+
+
+def iter_rows(stream: TextIO, fmt: str) -> Iterator[tuple[int, dict | Exception]]:
+    """
+    Потоково читает строки входного файла.
+
+    Args:
+        stream (TextIO): Текстовый поток,
+        fmt (str): Формат: 'csv' или 'ndjson'.
+
+    Yields:
+        tuple[int, dict | Exception]: Номер строки файла и данные строки или ошибка ее разбора.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"Некорректный JSON: {e}")
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError("Ожидался JSON-объект")
+    else:
+        raise ValueError(f"Неподдерживаемый формат импорта: {fmt}")
+
+
+@dataclass
+class ImportRowError:
+    """
+    Запись отчета об отклоненной строке.
+
+    Attributes:
+        line (int): Номер строки входного файла,
+        email (str | None): Email из строки, если есть,
+        error (str): Причина.
+    """
+    line: int
+    email: str | None
+    error: str
+
+
+@dataclass
+class UserImportStats:
+    """
+    Итоги импорта.
+
+    Attributes:
+        rows (int): Прочитано строк,
+        imported (int): Создано пользователей,
+        failed (int): Отклонено строк,
+        batches (int): Обработано пачек,
+        seconds (float): Общее время,
+        hash_seconds (float): Время хеширования паролей,
+        avatar_seconds (float): Время загрузки и обработки аватаров,
+        insert_seconds (float): Время вставки в БД.
+    """
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    hash_seconds: float = 0.0
+    avatar_seconds: float = 0.0
+    insert_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["rows_per_second"] = round(self.rows_per_second, 1)
+        return data
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+
+
+class UserImporter:
+    """
+    Импорт пользователей пачками.
+
+    Attributes:
+        user_service (UserService): Сервис пользователей (вставка пачек),
+        hasher (PasswordHasher): Хешер паролей с пулом процессов,
+        processor (ImageProcessingExecutor): Пул обработки изображений,
+        batch_size (int): Число строк в пачке,
+        avatar_concurrency (int): Сколько аватаров загружается одновременно,
+        avatar_timeout (float): Таймаут загрузки аватара по URL,
+        avatar_root (str | None): Каталог, из которого разрешено брать аватары по пути;
+                                  None - только URL,
+        avatar_hosts (frozenset[str] | None): Хосты, с которых разрешено загружать аватары по URL;
+                                              None - любые (с перенаправлениями), пустое множество - никакие.
+    """
+
+    def __init__(self, user_service: UserService, hasher: PasswordHasher | None = None,
+                 processor: ImageProcessingExecutor = image_processor, batch_size: int = USER_IMPORT_BATCH_SIZE,
+                 avatar_concurrency: int = USER_IMPORT_AVATAR_CONCURRENCY,
+                 avatar_timeout: float = USER_IMPORT_AVATAR_TIMEOUT_SECONDS, avatar_root: str | None = None,
+                 http_transport: httpx.AsyncBaseTransport | None = None,
+                 avatar_hosts: Collection[str] | None = None):
+        self.user_service = user_service
+        self.hasher = hasher or PasswordHasher(import_hasher_executor)
+        self.processor = processor
+        self.batch_size = max(1, batch_size)
+        self.avatar_concurrency = max(1, avatar_concurrency)
+        self.avatar_timeout = avatar_timeout
+        self.avatar_root = os.path.realpath(avatar_root) if avatar_root else None
+        self.avatar_hosts = frozenset(host.lower() for host in avatar_hosts) if avatar_hosts is not None else None
+        self._http_transport = http_transport
+        self._http: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def run(self, stream: TextIO, fmt: str,
+                  on_error: Callable[[ImportRowError], None] | None = None) -> UserImportStats:
+        """
+        Импортирует пользователей из потока.
+
+        Args:
+            stream (TextIO): Текстовый поток входного файла,
+            fmt (str): Формат: 'csv' или 'ndjson',
+            on_error (Callable | None): Получает запись отчета по каждой отклоненной строке.
+
+        Returns:
+            UserImportStats: Итоги импорта.
+        """
+        stats = UserImportStats()
+        report = on_error or (lambda error: None)
+        rows = iter_rows(stream, fmt)
+        started = time.perf_counter()
+        self._semaphore = asyncio.Semaphore(self.avatar_concurrency)
+        async with httpx.AsyncClient(transport=self._http_transport, timeout=self.avatar_timeout,
+                                     follow_redirects=self.avatar_hosts is None,
+                                     limits=httpx.Limits(max_connections=self.avatar_concurrency)) as self._http:
+            while True:
+                # Чтение и разбор файла - блокирующие операции, выполняются вне цикла событий
+                batch = await asyncio.to_thread(lambda: list(islice(rows, self.batch_size)))
+                if not batch:
+                    break
+                await self._import_batch(batch, stats, report)
+                stats.seconds = time.perf_counter() - started
+                logger.info("Импорт пользователей: строк %d, создано %d, отклонено %d (%.0f строк/с)",
+                            stats.rows, stats.imported, stats.failed, stats.rows_per_second)
+        self._http = None
+        stats.seconds = time.perf_counter() - started
+        logger.info("Импорт пользователей завершен: %s", stats.as_dict())
+        return stats
+
+    async def _import_batch(self, batch: list[tuple[int, dict | Exception]], stats: UserImportStats,
+                            report: Callable[[ImportRowError], None]) -> None:
+        stats.batches += 1
+        stats.rows += len(batch)
+
+        def reject(line: int, email: str | None, error: str) -> None:
+            stats.failed += 1
+            report(ImportRowError(line, email, error))
+
+        candidates: list[tuple[int, UserCreate, str | None]] = []
+        seen: set[str] = set()
+        for line, row in batch:
+            if isinstance(row, Exception):
+                reject(line, None, str(row))
+                continue
+            try:
+                user = UserCreate(**{field: row.get(field) for field in USER_FIELDS})
+            except ValidationError as e:
+                reject(line, row.get("email"), _validation_message(e))
+                continue
+            if user.email in seen:
+                reject(line, user.email, "Email повторяется во входном файле")
+                continue
+            seen.add(user.email)
+            candidates.append((line, user, (row.get("avatar") or "").strip() or None))
+        if not candidates:
+            return
+
+        passwords = [user.password for _, user, _ in candidates]
+        avatar_urls = asyncio.gather(*(self._avatar_url(source) for _, _, source in candidates),
+                                     return_exceptions=True)
+        hashes, avatars = await asyncio.gather(
+            self._timed(stats, "hash_seconds", self.hasher.hash_passwords_async(passwords)),
+            self._timed(stats, "avatar_seconds", avatar_urls),
+        )
+
+        values, lines = [], {}
+        for (line, user, _), hashed_password, avatar_url in zip(candidates, hashes, avatars):
+            if isinstance(avatar_url, Exception):
+                reject(line, user.email, f"Ошибка аватара: {avatar_url}")
+                continue
+            lines[user.email] = line
+            values.append({"email": user.email, "hashed_password": hashed_password, "gender": user.gender,
+                           "first_name": user.first_name, "last_name": user.last_name,
+                           "avatar_url": avatar_url, "is_active": True})
+
+        try:
+            created = await self._timed(stats, "insert_seconds", self.user_service.insert_users(values))
+        except DatabaseError as e:
+            created = {}
+            error = str(e)
+        else:
+            error = "Email уже зарегистрирован"
+        stats.imported += len(created)
+
+        used_avatars = {row["avatar_url"] for row in values if row["email"] in created}
+        for row in values:
+            if row["email"] not in created:
+                reject(lines[row["email"]], row["email"], error)
+        # Аватары отклоненных строк больше никому не нужны (если их не использует кто-то еще)
+        for avatar_url in {row["avatar_url"] for row in values if row["avatar_url"]} - used_avatars:
+            await self.user_service.avatar_blobs.discard(avatar_url)
+
+    @staticmethod
+    async def _timed(stats: UserImportStats, field: str, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            setattr(stats, field, getattr(stats, field) + time.perf_counter() - started)
+
+    async def _avatar_url(self, source: str | None) -> str | None:
+        """Загружает и обрабатывает аватар; возвращает его URL."""
+        if source is None:
+            return None
+        async with self._semaphore:
+            data = await self._fetch(source)
+            image_with_watermark = await self.processor.process(data)
+            filename = await LocalImageService.upload_image(image_with_watermark, avatar_derivatives.extension)
+        return f"{AVATAR_URL_PREFIX}/{filename}"
+
+    async def _fetch(self, source: str) -> bytes:
+        if source.startswith(("http://", "https://")):
+            url, headers, extensions = httpx.URL(source), {}, {}
+            if self.avatar_hosts is not None:
+                # Соединение - с проверенным адресом, а не с повторно разрешенным именем (DNS rebinding);
+                # имя хоста передается в Host и SNI, сертификат проверяется по нему
+                address = await self._check_host(url)
+                headers, extensions = {"Host": url.netloc.decode("ascii")}, {"sni_hostname": url.host}
+                url = url.copy_with(host=address)
+            buffer = io.BytesIO()
+            async with self._http.stream("GET", url, headers=headers, extensions=extensions) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    buffer.write(chunk)
+                    if buffer.tell() > AVATAR_MAX_BYTES:
+                        raise FileValidationError("Файл слишком большой")
+            return buffer.getvalue()
+
+        if self.avatar_root is None:
+            raise FileValidationError("Аватары из локальных файлов не разрешены")
+        path = os.path.realpath(os.path.join(self.avatar_root, source))
+        if os.path.commonpath([path, self.avatar_root]) != self.avatar_root:
+            raise FileValidationError("Путь к аватару вне разрешенного каталога")
+        if await asyncio.to_thread(os.path.getsize, path) > AVATAR_MAX_BYTES:
+            raise FileValidationError("Файл слишком большой")
+        return await asyncio.to_thread(_read_file, path)
+
+    async def _check_host(self, url: httpx.URL) -> str:
+        """Проверяет, что хост URL разрешен и все его адреса публичные; возвращает адрес для соединения."""
+        if url.host not in self.avatar_hosts:
+            raise FileValidationError(f"Загрузка аватаров с хоста {url.host} не разрешена")
+        port = url.port or DEFAULT_PORTS[url.scheme]
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise FileValidationError(f"Хост аватара {url.host} не найден") from e
+        for *_, sockaddr in addresses:
+            if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+                raise FileValidationError(f"Хост аватара {url.host} указывает на внутренний адрес")
+        return addresses[0][4][0]
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
@@ -0,0 +1,96 @@
+"""
+Модуль: services.user_search
+
+Предоставляет полнотекстовый поиск пользователей по имени и фамилии (SQLite FTS5).
+
+Индекс users_fts обновляется триггерами на users в той же транзакции, что и сами строки,
+поэтому поиск сразу видит новых пользователей и изменения имен. Полная перестройка
+(rebuild) нужна только после загрузки данных в обход триггеров или после миграции:
+python manage_users.py rebuild-search-index.
+
+Текст запроса не передается в FTS5 как есть: из него выделяются слова, и каждое ищется
+как префикс ("ан" находит "Анна" и "Анатолий"); найтись должны все слова.
+"""
+
+import logging
+import re
+
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.user import UserModel, users_fts
+from services.user_service import LISTING_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MAX_TERMS = 8
+_WORD = re.compile(r"\w+")
+
+
+def fts_query(query: str) -> str | None:
+    """
+    Строит запрос FTS5 из текста пользователя.
+
+    Args:
+        query (str): Текст поиска.
+
+    Returns:
+        str | None: Запрос вида '"анна"* "ив"*' или None, если в тексте нет слов.
+    """
+    terms = _WORD.findall(query.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    # Слова в кавычках: операторы FTS5 (AND, NEAR, *, ^, :) в тексте пользователя не действуют
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class UserSearchService:
+    """
+    Сервис полнотекстового поиска пользователей.
+
+    Attributes:
+        db (AsyncSession): Асинхронная сессия базы данных.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(self, query: str, limit: int, gender: str | None = None) -> list[Row]:
+        """
+        Ищет активных пользователей по словам из имени и фамилии.
+
+        Args:
+            query (str): Текст поиска,
+            limit (int): Максимальное число результатов,
+            gender (str | None): Пол.
+
+        Returns:
+            list[Row]: Строки с полями LISTING_COLUMNS, самые релевантные - первыми.
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        statement = (
+            select(*LISTING_COLUMNS)
+            .select_from(users_fts)
+            .join(UserModel, UserModel.id == users_fts.c.rowid)
+            .filter(users_fts.c.users_fts.op("MATCH")(match), UserModel.is_active == True)
+        )
+        if gender is not None:
+            statement = statement.filter(UserModel.gender == gender)
+        result = await self.db.execute(statement.order_by(users_fts.c.rank, UserModel.id).limit(limit))
+        return result.all()
+
+    async def rebuild(self) -> int:
+        """
+        Перестраивает индекс по текущему содержимому users.
+
+        Returns:
+            int: Число проиндексированных пользователей.
+        """
+        await self.db.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        await self.db.commit()
+        count = await self.db.scalar(text("SELECT count(*) FROM users"))
+        logger.info("Поисковый индекс пользователей перестроен: %d", count)
+        return count
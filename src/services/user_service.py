@@ -3,21 +3,54 @@
 
 Предоставляет сервис для управления пользователями, включая создание пользователей
 и получение пользователей по электронной почте и ID.
+Счетчики ссылок на файлы аватаров меняются в тех же транзакциях, что и пользователи.
+Уникальность email обеспечивает уникальный индекс users.email: пользователь создается одним
+INSERT ... RETURNING, а нарушение ограничения означает, что email уже зарегистрирован.
 """
 
 import logging
+from collections import Counter
 
+import numpy as np
+from sqlalchemy import Row, and_, insert, or_, union, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from exceptions.exceptions import UserNotFound, EmailAlreadyRegistered, DatabaseError
 from interfaces.protocols import PasswordHasherProtocol
-from models.user import UserModel
+from models.user import UserModel, users_geo
+from services.avatar_blob_service import AvatarBlobService
+from services.email_filter import EmailBloomFilter, registered_emails
+from services.geo import Box, bounding_boxes, geohash_cells, geohash_encode, haversine_km
 from schemas.user import UserCreate
 
 logger = logging.getLogger(__name__)
 
+# Поля пользователя в списке: без email и хеша пароля, без загрузки ORM-объектов
+LISTING_COLUMNS = (UserModel.id, UserModel.first_name, UserModel.last_name, UserModel.gender, UserModel.avatar_url)
+
+# Последний символ Unicode и диапазон суррогатов (для верхней границы префикса)
+MAX_CHAR = chr(0x10FFFF)
+SURROGATES_START, SURROGATES_END = 0xD800, 0xDFFF
+
+
+def prefix_range(column, prefix: str):
+    """
+    Условие "строка начинается с prefix" в виде диапазона column >= prefix AND column < следующий.
+
+    В отличие от LIKE диапазон всегда использует индекс по столбцу (сравнение с учетом регистра).
+    """
+    # Символ U+10FFFF увеличить нельзя: за ним ничего нет, поэтому граница строится по началу строки
+    stem = prefix.rstrip(MAX_CHAR)
+    if not stem:
+        return column >= prefix
+    following = ord(stem[-1]) + 1
+    if SURROGATES_START <= following <= SURROGATES_END:
+        following = SURROGATES_END + 1  # суррогаты нельзя закодировать в UTF-8
+    return and_(column >= prefix, column < stem[:-1] + chr(following))
+
 
 class UserService:
     """
@@ -26,69 +59,92 @@ class UserService:
     Attributes:
         db (AsyncSession): Асинхронная сессия базы данных,
         password_hasher (PasswordHasherProtocol): Сервис для хеширования паролей,
+        avatar_blobs (AvatarBlobService): Счетчики ссылок на файлы аватаров,
+        registered_emails (EmailBloomFilter): Фильтр Блума зарегистрированных email.
     """
 
-    def __init__(self, db: AsyncSession, password_hasher: PasswordHasherProtocol):
+    def __init__(self, db: AsyncSession, password_hasher: PasswordHasherProtocol,
+                 email_filter: EmailBloomFilter = registered_emails):
         self.db = db
         self.password_hasher = password_hasher
+        self.avatar_blobs = AvatarBlobService(db)
+        self.registered_emails = email_filter
 
     async def email_exists(self, email: str) -> bool:
         """
         Проверяет, существует ли пользователь с данным email в базе данных.
 
+        Ответ всегда берется из БД (поиск по уникальному индексу users.email): фильтр Блума видит
+        только адреса, зарегистрированные этим процессом, и не может подтвердить, что адрес свободен.
+
         Args:
             email (str): Электронная почта пользователя.
 
         Returns:
             bool: True, если пользователь с данным email существует, иначе False.
         """
-        query = select(UserModel).filter(UserModel.email == email)
+        query = select(UserModel.id).filter(UserModel.email == email).limit(1)
         result = await self.db.execute(query)
-        existing_user = result.scalars().first()
-        return existing_user is not None
+        return result.first() is not None
 
-    async def create_user(self, user: UserCreate, avatar_url: str) -> UserModel:
+    async def create_user(self, user: UserCreate, avatar_url: str | None, is_active: bool = True) -> UserModel:
         """
         Создает нового пользователя.
 
+        Пользователь вставляется одним запросом INSERT ... RETURNING; занятый email определяется
+        по нарушению уникального индекса, поэтому одновременные регистрации не создают дубликатов.
+        Объект строится из RETURNING, поэтому сессия должна быть создана с expire_on_commit=False
+        (как SessionLocal).
+
         Args:
             user (UserCreate): Данные нового пользователя,
-            avatar_url (str): URL аватара пользователя.
+            avatar_url (str | None): URL аватара пользователя (может быть задан позже через set_avatar_url),
+            is_active (bool): Активен ли пользователь сразу (False - до окончания обработки аватара).
 
         Returns:
             UserModel: Созданный пользователь.
 
         Raises:
-            Exception: В случае уже существования пользователя или ошибки загрузки изображения
+            EmailAlreadyRegistered: Если email уже зарегистрирован,
+            PasswordHasherOverloaded: Если пул хеширования перегружен,
+            DatabaseError: В случае ошибки базы данных.
         """
         logger.info("Попытка создать пользователя с email: %s", user.email)
 
-        # Проверка наличия пользователя с таким же email
-        if await self.email_exists(user.email):
+        # Заполненный фильтр Блума позволяет не тратить bcrypt на уже зарегистрированные адреса:
+        # в БД заранее проверяются только адреса, которые он не может исключить (адреса, занятые
+        # через другие процессы, отклоняет уникальный индекс при вставке)
+        if (self.registered_emails.ready and self.registered_emails.might_contain(user.email)
+                and await self.email_exists(user.email)):
             logger.info("Регистрация пользователя с email \"%s\" отклонена: email уже используется.",
                         user.email)
             raise EmailAlreadyRegistered("Email уже зарегистрирован")
 
+        hashed_password = await self.password_hasher.hash_password_async(user.password)
+
         try:
-            # Обработка аватара и хеширование пароля
-            hashed_password = self.password_hasher.hash_password(user.password)
-
-            # Создание новой записи пользователя
-            db_user = UserModel(
-                avatar_url=avatar_url,
-                gender=user.gender,
-                first_name=user.first_name,
-                last_name=user.last_name,
-                email=user.email,
-                hashed_password=hashed_password,
-                is_active=True  # Устанавливаем is_active по умолчанию на True
+            result = await self.db.execute(
+                insert(UserModel)
+                .values(
+                    avatar_url=avatar_url,
+                    gender=user.gender,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    email=user.email,
+                    hashed_password=hashed_password,
+                    is_active=is_active
+                )
+                .returning(UserModel)
             )
-            self.db.add(db_user)
+            db_user = result.scalars().one()
+            await self.avatar_blobs.acquire(avatar_url)
             await self.db.commit()
-            await self.db.refresh(db_user)
 
-            logger.info("Пользователь с email \"%s\" успешно создан.", db_user.email)
-            return db_user
+        except IntegrityError as e:
+            await self.db.rollback()
+            logger.info("Регистрация пользователя с email \"%s\" отклонена: email уже используется.",
+                        user.email)
+            raise EmailAlreadyRegistered("Email уже зарегистрирован") from e
 
         except SQLAlchemyError as e:
             logger.error(f"Ошибка транзакции при создании пользователя: {e}")
@@ -96,12 +152,176 @@ class UserService:
             await self.db.rollback()
             raise DatabaseError("Ошибка при работе с базой данных") from e
 
-    async def get_user_by_id(self, user_id: int) -> UserModel:
+        self.registered_emails.add(db_user.email)
+        logger.info("Пользователь с email \"%s\" успешно создан.", db_user.email)
+        return db_user
+
+    async def insert_users(self, rows: list[dict]) -> dict[str, int]:
+        """
+        Вставляет пачку пользователей с уже захешированными паролями (массовый импорт).
+
+        Пачка вставляется одним executemany (INSERT ... ON CONFLICT DO NOTHING RETURNING),
+        счетчики ссылок на аватары увеличиваются в той же транзакции. Строки с уже
+        зарегистрированным email пропускаются и не попадают в результат.
+
+        Args:
+            rows (list[dict]): Значения полей UserModel (email, hashed_password, avatar_url и т.д.).
+
+        Returns:
+            dict[str, int]: ID созданных пользователей по email.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        if not rows:
+            return {}
+        try:
+            result = await self.db.execute(
+                sqlite_insert(UserModel)
+                .on_conflict_do_nothing(index_elements=[UserModel.email])
+                .returning(UserModel.id, UserModel.email),
+                rows,
+            )
+            created = {email: user_id for user_id, email in result.all()}
+            avatar_counts = Counter(row["avatar_url"] for row in rows
+                                    if row["email"] in created and row.get("avatar_url"))
+            for avatar_url, count in avatar_counts.items():
+                await self.avatar_blobs.acquire(avatar_url, count)
+            await self.db.commit()
+
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка транзакции при массовом создании пользователей: {e}")
+            await self.db.rollback()
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+        for email in created:
+            self.registered_emails.add(email)
+        logger.info("Создано пользователей: %d из %d", len(created), len(rows))
+        return created
+
+    async def set_avatar_url(self, db_user: UserModel, avatar_url: str, activate: bool = False) -> UserModel:
+        """
+        Устанавливает пользователю новый аватар.
+
+        Args:
+            db_user (UserModel): Пользователь,
+            avatar_url (str): URL нового аватара,
+            activate (bool): Одновременно активировать пользователя (после асинхронной регистрации).
+
+        Returns:
+            UserModel: Обновленный пользователь.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        try:
+            await self.avatar_blobs.release(db_user.avatar_url)
+            await self.avatar_blobs.acquire(avatar_url)
+            db_user.avatar_url = avatar_url
+            if activate:
+                db_user.is_active = True
+            await self.db.commit()
+            await self.db.refresh(db_user)
+            return db_user
+
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка транзакции при обновлении аватара: {e}")
+            await self.db.rollback()
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def set_location(self, user_id: int, latitude: float, longitude: float) -> None:
+        """
+        Сохраняет местоположение активного пользователя.
+
+        Индекс R*Tree (SQLite) обновляется триггером в той же транзакции, geohash вычисляется здесь.
+
+        Args:
+            user_id (int): ID пользователя,
+            latitude (float): Широта,
+            longitude (float): Долгота.
+
+        Raises:
+            UserNotFound: Если пользователь не найден или неактивен,
+            DatabaseError: В случае ошибки базы данных.
+        """
+        statement = (
+            update(UserModel)
+            .where(UserModel.id == user_id, UserModel.is_active == True)
+            .values(latitude=latitude, longitude=longitude, geohash=geohash_encode(latitude, longitude))
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await self.db.execute(statement)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка транзакции при обновлении местоположения: {e}")
+            await self.db.rollback()
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+        if not result.rowcount:
+            raise UserNotFound("Пользователь не найден")
+
+    async def find_nearby(self, latitude: float, longitude: float, radius_km: float, limit: int,
+                          gender: str | None = None, exclude_id: int | None = None) -> list[tuple[Row, float]]:
+        """
+        Ищет активных пользователей в радиусе от точки, ближайшие - первыми.
+
+        Кандидаты отбираются индексом по описанному вокруг круга прямоугольнику: в SQLite -
+        R*Tree users_geo, в других базах - ячейками geohash. Время отбора зависит от числа
+        пользователей рядом, а не от размера таблицы. Точное расстояние (гаверсинус) считается
+        над столбцами координат кандидатов (NumPy), лишние углы прямоугольника отбрасываются.
+
+        Args:
+            latitude (float): Широта центра,
+            longitude (float): Долгота центра,
+            radius_km (float): Радиус в километрах,
+            limit (int): Максимальное число результатов,
+            gender (str | None): Пол,
+            exclude_id (int | None): ID пользователя, которого не нужно включать (сам ищущий).
+
+        Returns:
+            list[tuple[Row, float]]: Строки с полями LISTING_COLUMNS и расстояние в километрах.
+        """
+        rows = []
+        for box in bounding_boxes(latitude, longitude, radius_km):
+            result = await self.db.execute(self._nearby_query(box, gender, exclude_id))
+            rows.extend(result.all())
+        if not rows:
+            return []
+
+        distances = haversine_km(latitude, longitude, [row.latitude for row in rows], [row.longitude for row in rows])
+        inside = np.flatnonzero(distances <= radius_km)
+        # Ближайшие первыми, при равном расстоянии - по ID
+        order = inside[np.lexsort((np.array([rows[i].id for i in inside]), distances[inside]))][:limit]
+        return [(rows[i], float(distances[i])) for i in order]
+
+    def _nearby_query(self, box: Box, gender: str | None, exclude_id: int | None):
+        min_lat, max_lat, min_lon, max_lon = box
+        query = select(*LISTING_COLUMNS, UserModel.latitude, UserModel.longitude)
+        if self.db.get_bind().dialect.name == "sqlite":
+            # R*Tree хранит координаты с округлением наружу, поэтому условие - пересечение с прямоугольником
+            query = query.join(users_geo, users_geo.c.id == UserModel.id).filter(
+                users_geo.c.max_lat >= min_lat, users_geo.c.min_lat <= max_lat,
+                users_geo.c.max_lon >= min_lon, users_geo.c.min_lon <= max_lon)
+        else:
+            cells = geohash_cells([box])
+            if cells:
+                query = query.filter(or_(*(prefix_range(UserModel.geohash, cell) for cell in cells)))
+        query = query.filter(UserModel.latitude.between(min_lat, max_lat),
+                             UserModel.longitude.between(min_lon, max_lon),
+                             UserModel.is_active == True)
+        if gender is not None:
+            query = query.filter(UserModel.gender == gender)
+        if exclude_id is not None:
+            query = query.filter(UserModel.id != exclude_id)
+        return query
+
+    async def get_user_by_id(self, user_id: int, include_inactive: bool = False) -> UserModel:
         """
         Получает пользователя по его ID.
 
         Args:
-            user_id (int): Идентификатор пользователя.
+            user_id (int): Идентификатор пользователя,
+            include_inactive (bool): Искать и среди неактивных пользователей.
 
         Returns:
             UserModel: Найденный пользователь.
@@ -111,7 +331,9 @@ class UserService:
         """
         logger.info("Запрос пользователя с ID: %d", user_id)
 
-        query = select(UserModel).filter(UserModel.id == user_id, UserModel.is_active == True)
+        query = select(UserModel).filter(UserModel.id == user_id)
+        if not include_inactive:
+            query = query.filter(UserModel.is_active == True)
         result = await self.db.execute(query)
         user = result.scalars().first()
         if user is None:
@@ -121,6 +343,54 @@ class UserService:
         logger.info("Пользователь с ID \"%d\" найден: %s", user_id, user.email)
         return user
 
+    async def list_users(self, limit: int, after_id: int | None = None, gender: str | None = None,
+                         name_prefix: str | None = None) -> tuple[list[Row], int | None]:
+        """
+        Возвращает страницу активных пользователей по возрастанию ID (keyset-пагинация).
+
+        Страница начинается сразу после after_id (WHERE id > after_id ... LIMIT), поэтому
+        стоимость запроса не зависит от номера страницы, в отличие от OFFSET.
+        Фильтр по полу с пагинацией обслуживает индекс (gender, is_active, id).
+        С префиксом имени ID подходящих пользователей выбираются двумя поисками по диапазону
+        в индексах first_name и last_name (UNION), а страница - поиском этих ID по первичному
+        ключу: стоимость пропорциональна числу пользователей с таким началом имени или фамилии
+        (индексы по имени не упорядочены по ID), но не размеру таблицы и не номеру страницы.
+
+        Args:
+            limit (int): Размер страницы,
+            after_id (int | None): Курсор - ID последнего пользователя предыдущей страницы,
+            gender (str | None): Пол,
+            name_prefix (str | None): Начало имени или фамилии (с учетом регистра).
+
+        Returns:
+            tuple[list[Row], int | None]: Строки с полями LISTING_COLUMNS и курсор следующей
+                                          страницы (None, если страница последняя).
+        """
+        query = self.listing_query(after_id, gender, name_prefix)
+        # Лишняя строка показывает, есть ли следующая страница, без COUNT
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    @staticmethod
+    def listing_query(after_id: int | None = None, gender: str | None = None, name_prefix: str | None = None):
+        """Запрос страницы списка пользователей без LIMIT (см. list_users)."""
+        query = select(*LISTING_COLUMNS).filter(UserModel.is_active == True)
+        if gender is not None:
+            query = query.filter(UserModel.gender == gender)
+        if name_prefix:
+            # Остальные условия - во внешнем запросе: иначе планировщик может выбрать для ветвей
+            # индекс (gender, is_active, id) и просмотреть всех пользователей пола
+            branches = [select(UserModel.id).filter(prefix_range(column, name_prefix))
+                        for column in (UserModel.first_name, UserModel.last_name)]
+            if after_id is not None:
+                branches = [branch.filter(UserModel.id > after_id) for branch in branches]
+            query = query.filter(UserModel.id.in_(union(*branches)))
+        if after_id is not None:
+            query = query.filter(UserModel.id > after_id)
+        return query.order_by(UserModel.id)
+
     async def delete_user_by_id(self, user_id: int) -> None:
         """
         Удаляет пользователя по его ID (hard delete)
@@ -138,6 +408,7 @@ class UserService:
             # Используем get_user_by_id для проверки
             user = await self.get_user_by_id(user_id)
 
+            await self.avatar_blobs.release(user.avatar_url)
             await self.db.delete(user)
             await self.db.commit()
             logger.info(f"Пользователь с ID \"{user_id}\" успешно удален.")
@@ -149,4 +420,35 @@ class UserService:
         except SQLAlchemyError as e:
             logger.error(f"Ошибка транзакции при удалении пользователя: {e}")
             await self.db.rollback()
-            raise DatabaseError("Ошибка при работе с базой данных") from e
\ No newline at end of file
+            raise DatabaseError("Ошибка при работе с базой данных") from e
+
+    async def delete_inactive_user(self, user_id: int) -> bool:
+        """
+        Удаляет пользователя, если он еще не активирован (регистрация не завершена).
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+
+        Returns:
+            bool: True, если пользователь удален.
+
+        Raises:
+            DatabaseError: В случае ошибки базы данных.
+        """
+        try:
+            user = await self.get_user_by_id(user_id, include_inactive=True)
+            if user.is_active:
+                return False
+            await self.avatar_blobs.release(user.avatar_url)
+            await self.db.delete(user)
+            await self.db.commit()
+            logger.info("Незавершенная регистрация пользователя с ID \"%d\" отменена.", user_id)
+            return True
+
+        except UserNotFound:
+            return False
+
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка транзакции при удалении пользователя: {e}")
+            await self.db.rollback()
+            raise DatabaseError("Ошибка при работе с базой данных") from e
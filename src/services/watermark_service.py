@@ -2,10 +2,22 @@
 Модуль: services.watermark_service
 
 Этот модуль предоставляет сервис для наложения водяных знаков на изображения.
+
+Водяной знак декодируется один раз при создании сервиса: хранится RGBA-копия,
+её альфа-маска и уменьшенные варианты для изображений, в которые знак
+не помещается в исходном размере.
 """
 
-from PIL import Image
 import io
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image
+
+from config.settings import WATERMARK_PATH, WATERMARK_PRESCALE_SIZES
+
+logger = logging.getLogger(__name__)
 
 
 class WatermarkService:
@@ -13,42 +25,111 @@ class WatermarkService:
     Сервис для работы с водяными знаками.
 
     Attributes:
-        watermark_image (Image): Изображение водяного знака,
-                                           загружаемое из файла и используемое для наложения на другие изображения.
-
+        watermark_image (Image): Декодированное RGBA-изображение водяного знака,
+        watermark_mask (Image): Альфа-канал водяного знака, используемый как маска при наложении.
     """
 
-    def __init__(self, watermark_path: str):
+    # Сколько уменьшенных вариантов держать в памяти
+    MAX_VARIANTS = 32
+
+    def __init__(self, watermark_path: str, prescale_sizes: tuple[int, ...] = ()):
         """
         Инициализация сервиса водяного знака и загрузка изображения водяного знака в память.
 
         Args:
-            watermark_path (str): Строка с путём до файла водяного знака.
+            watermark_path (str): Строка с путём до файла водяного знака,
+            prescale_sizes (tuple[int, ...]): Размеры (сторона квадратного аватара), для которых
+                                              уменьшенные варианты готовятся заранее.
         """
-        self.watermark_image = Image.open(watermark_path)
+        with Image.open(watermark_path) as source:
+            self.watermark_image = source.convert("RGBA")
+        self.watermark_mask = self.watermark_image.getchannel("A")
+        self._variants: OrderedDict[tuple[int, int], tuple[Image.Image, Image.Image]] = OrderedDict()
+
+        for size in prescale_sizes:
+            self.get_variant(size, size)
+        logger.info("Водяной знак загружен: %s, %dx%d", watermark_path, *self.watermark_image.size)
 
-    def add_watermark(self, image_data: bytes) -> bytes:
+    def get_variant(self, width: int, height: int) -> tuple[Image.Image, Image.Image]:
         """
-        Добавляет водяной знак к изображению.
+        Возвращает водяной знак и маску, помещающиеся в изображение заданного размера.
+
+        Если знак помещается, возвращается исходный; иначе - пропорционально уменьшенный,
+        который кешируется по итоговому размеру.
 
         Args:
-            image_data (ImageData): Объект, содержащий данные об изображении.
+            width (int): Ширина изображения,
+            height (int): Высота изображения.
 
         Returns:
-            ImageData: Новый объект с данными изображения, содержащий водяной знак.
+            tuple[Image, Image]: Водяной знак (RGBA) и его маска.
+        """
+        wm_width, wm_height = self.watermark_image.size
+        if wm_width <= width and wm_height <= height:
+            return self.watermark_image, self.watermark_mask
+
+        scale = min(width / wm_width, height / wm_height)
+        size = (max(1, int(wm_width * scale)), max(1, int(wm_height * scale)))
+        variant = self._variants.get(size)
+        if variant is None:
+            scaled = self.watermark_image.resize(size, Image.Resampling.LANCZOS)
+            variant = (scaled, scaled.getchannel("A"))
+            self._variants[size] = variant
+            if len(self._variants) > self.MAX_VARIANTS:
+                self._variants.popitem(last=False)
+        else:
+            self._variants.move_to_end(size)
+        return variant
+
+    def apply_watermark(self, image: Image.Image) -> Image.Image:
         """
-        # Открытие изображения из входных данных
-        image = Image.open(io.BytesIO(image_data))
+        Накладывает водяной знак на декодированное изображение.
+
+        Args:
+            image (Image): Изображение; в режимах RGB/RGBA изменяется на месте.
+
+        Returns:
+            Image: Изображение с водяным знаком.
+        """
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        watermark, mask = self.get_variant(image.width, image.height)
 
         # Позиционирование водяного знака в правом нижнем углу
-        position = (image.width - self.watermark_image.width, image.height - self.watermark_image.height)
+        position = (image.width - watermark.width, image.height - watermark.height)
 
         # Наложение водяного знака
-        image.paste(self.watermark_image, position, self.watermark_image)
+        image.paste(watermark, position, mask)
+        return image
+
+    def add_watermark(self, image_data: bytes | Image.Image) -> bytes:
+        """
+        Добавляет водяной знак к изображению.
+
+        Args:
+            image_data (bytes | Image): Данные исходного изображения или уже декодированное
+                                        изображение (изменяется на месте).
+
+        Returns:
+            bytes: Изображение в формате PNG с водяным знаком.
+        """
+        # Открытие изображения из входных данных, если оно еще не декодировано
+        image = image_data if isinstance(image_data, Image.Image) else Image.open(io.BytesIO(image_data))
+        image = self.apply_watermark(image)
 
         # Сохранение обработанного изображения в памяти
         output_stream = io.BytesIO()
         image.save(output_stream, format='PNG')
-        output_stream.seek(0)
 
         return output_stream.getvalue()
+
+
+@lru_cache(maxsize=1)
+def get_watermark_service() -> WatermarkService:
+    """
+    Возвращает общий экземпляр WatermarkService; файл водяного знака читается и декодируется один раз.
+
+    Вызывается и в воркерах пула обработки изображений: при fork они наследуют уже загруженный знак.
+    """
+    return WatermarkService(WATERMARK_PATH, WATERMARK_PRESCALE_SIZES)
@@ -2,15 +2,59 @@
 TODO: Нужно отрефакторить, сделано сильно на скорую руку
 
 """
+import asyncio
+import hashlib
+import io
+import json
 import os
+import socket
+import sys
+import time
+import uuid
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
+import numpy as np
 import pytest
+from PIL import Image
+from fastapi import UploadFile
+import httpx
+from httpx import ASGITransport
 from httpx import AsyncClient
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
 
 from src.__main__ import app
-from src.config.database import engine
+from src.config.database import ReadSessionLocal, SessionLocal, engine, pool_stats
 from src.interfaces.protocols import PasswordHasherProtocol
+from src.schemas.token import TokenPayload
+from src.schemas.user import UserCreate
+from src.services import geo, image_processor, password_hasher, rate_limiter, token_service
+from src.services.avatar_blob_service import AvatarBlobService
+from src.services.avatar_derivatives import avatar_derivatives
+from src.services.avatar_jobs import AvatarJobHandler
+from src.services.avatar_migration import AvatarMigrationService
+from src.services.avatar_storage import ContentAddressedStorage, avatar_storage
+from src.services.database_maintenance import DatabaseMaintenance
+from src.services.email_filter import EmailBloomFilter
+from src.services.image_validation_service import ImageValidationService
+from src.services.job_queue import JobQueue
+from src.services.job_worker import JobWorker
+from src.services.like_buffer import LikeWriteBuffer
+from src.services.like_graph import LikeGraph
+from src.services.feed_service import FeedRefillHandler, FeedService
+from src.services.like_service import LikeResult, LikeService
+from src.services.user_search import UserSearchService, fts_query
+from src.services.local_storage import LocalStorageDriver
+from src.services.password_hasher import HasherExecutor
+from src.services.refresh_token_service import RefreshTokenPurger, RefreshTokenService
+from src.services.ranking import FeatureStore, RankingEngine, WeightedScorer, top_k
+from src.services.s3_storage import S3StorageDriver
+from src.services.upload_buffer import UploadBuffer
+from src.services.user_import import UserImporter
+from src.services.watermark_service import get_watermark_service
 from src.services.user_service import UserService
 
 URL = "http://127.0.0.1:8000"
@@ -168,3 +212,1245 @@ async def test_upload_invalid_image():
 
     assert response.status_code == 400
     assert "не является корректным" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_async():
+    hasher = password_hasher.PasswordHasher(password_hasher.HasherExecutor("thread", workers=2, max_queue=2))
+    hashed = await hasher.hash_password_async("securepassword")
+
+    assert await hasher.verify_password_async("securepassword", hashed)
+    assert not await hasher.verify_password_async("wrongpassword", hashed)
+    assert hasher.metrics()["completed"] == 3
+    hasher.executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_full():
+    executor = password_hasher.HasherExecutor("thread", workers=1, max_queue=0)
+    slow_task = asyncio.create_task(executor.run(time.sleep, 0.2))
+    await asyncio.sleep(0)
+
+    with pytest.raises(password_hasher.PasswordHasherOverloaded):
+        await executor.run(time.sleep, 0)
+
+    await slow_task
+    assert executor.stats.rejected == 1
+    executor.shutdown()
+
+
+def test_verified_token_cache():
+    cache = token_service.verified_token_cache
+    cache.clear()
+    payload = TokenPayload(id=1, username="A", first_name="A", last_name="B", email="seed@example.com")
+    token = token_service.TokenGenerator.generate_token(payload).access_token
+
+    first = token_service.TokenVerifier.verify_token(token)
+    second = token_service.TokenVerifier.verify_token(token)
+
+    assert first is second
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Запись не должна пережить exp токена
+    cache.put("expired", first, time.time() - 1)
+    assert cache.get("expired") is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation():
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        with open(GOOD_IMAGE_PATH, "rb") as image_file:
+            files = {"avatar": ("ava.jpg", image_file, "image/jpeg")}
+            data = {
+                "email": "refresh_test_user@example.com",
+                "password": "securepassword",
+                "first_name": "Refresh",
+                "last_name": "Tester",
+                "gender": "male"
+            }
+            response = await ac.post("/api/clients/create2", files=files, data=data)
+        user_id = response.json()["id"]
+
+        response = await ac.post("/api/auth/token",
+                                 data={"username": data["email"], "password": data["password"]})
+        assert response.status_code == 200
+        first_refresh = response.cookies["refresh_token"]
+
+        response = await ac.post("/api/auth/refresh")
+        assert response.status_code == 200
+        assert response.json()["access_token"]
+        second_refresh = response.cookies["refresh_token"]
+        assert second_refresh != first_refresh
+
+        # Повторное предъявление старого токена отзывает всё семейство
+        ac.cookies.clear()
+        ac.cookies.set("refresh_token", first_refresh)
+        response = await ac.post("/api/auth/refresh")
+        assert response.status_code == 401
+
+        ac.cookies.clear()
+        ac.cookies.set("refresh_token", second_refresh)
+        response = await ac.post("/api/auth/refresh")
+        assert response.status_code == 401
+
+    async with AsyncSession(engine) as session:
+        user_service = UserService(session, PasswordHasherProtocol)
+        await user_service.delete_user_by_id(user_id)
+
+
+@pytest.mark.asyncio
+async def test_expired_refresh_tokens_are_purged():
+    async with SessionLocal() as session:
+        service = RefreshTokenService(session)
+        expired, alive = await service.issue(1), await service.issue(1)
+        await session.execute(text("update refresh_tokens set expires_at = 0 where token_hash = :h"),
+                              {"h": hashlib.sha256(expired.encode()).digest()})
+        await session.commit()
+
+    purger = RefreshTokenPurger(SessionLocal, interval=3600)
+    assert await purger.run_once() >= 1 and purger.purged >= 1
+
+    async with SessionLocal() as session:
+        assert await session.scalar(text("select count(*) from refresh_tokens where user_id = 1")) == 1
+        assert (await RefreshTokenService(session).rotate(alive))[0] == 1
+        await session.execute(text("delete from refresh_tokens where user_id = 1"))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_rate_limiter():
+    backend = rate_limiter.InMemoryRateLimitBackend(max_keys=2)
+    limiter = rate_limiter.SlidingWindowRateLimiter(backend, limit=3, window_seconds=60)
+
+    for _ in range(3):
+        await limiter.hit("key", now=1000.0)
+    with pytest.raises(rate_limiter.RateLimitExceeded) as exc_info:
+        await limiter.hit("key", now=1000.0)
+    assert exc_info.value.retry_after > 0
+
+    # Через два окна счетчики полностью обнуляются
+    await limiter.hit("key", now=1130.0)
+
+    # Старые ключи вытесняются при превышении max_keys
+    await limiter.hit("other1", now=1130.0)
+    await limiter.hit("other2", now=1130.0)
+    assert len(backend) == 2 and backend.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_login_throttled():
+    form = {"username": "throttled_user@example.com", "password": "wrongpassword"}
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        statuses = [(await ac.post("/api/auth/token", data=form)).status_code for _ in range(5)]
+        response = await ac.post("/api/auth/token", data=form)
+
+    assert statuses == [401] * 5
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_watermark_service_shared_and_scaled():
+    service = get_watermark_service()
+    assert service is get_watermark_service()
+
+    # Водяной знак шире изображения уменьшается, а не вылезает за границы
+    small = io.BytesIO()
+    Image.new("L", (64, 64)).save(small, format="PNG")
+    result = Image.open(io.BytesIO(service.add_watermark(small.getvalue())))
+    watermark, mask = service.get_variant(64, 64)
+
+    assert result.size == (64, 64)
+    assert watermark.width <= 64 and mask.size == watermark.size
+
+
+@pytest.mark.asyncio
+async def test_image_processor_process_pool():
+    executor = image_processor.ImageProcessingExecutor(workers=1, timeout=30, max_concurrency=2)
+    with open(GOOD_IMAGE_PATH, "rb") as image_file:
+        image_data = image_file.read()
+    with open(BAD_IMAGE_PATH, "rb") as text_file:
+        bad_data = text_file.read()
+
+    try:
+        result = Image.open(io.BytesIO(await executor.process(image_data)))
+        assert result.format == avatar_derivatives.image_format
+        assert max(result.size) <= avatar_derivatives.full_size
+
+        with pytest.raises(ValueError, match="не является корректным"):
+            await executor.process(bad_data)
+
+        # Таймаут завершает занятый процесс, и пул создается заново
+        workers = list(executor._executor._processes.values())
+        executor.timeout = 0.001
+        with pytest.raises(Exception, match="Превышено время"):
+            await executor.process(image_data)
+        assert executor._executor is None
+        for worker in workers:
+            worker.join(5)
+            assert not worker.is_alive()
+        executor.timeout = 30
+        assert await executor.process(image_data)
+    finally:
+        executor.shutdown()
+
+
+def test_image_validation_limits():
+    with open(GOOD_IMAGE_PATH, "rb") as image_file:
+        image_data = image_file.read()
+
+    assert ImageValidationService.sniff_format(image_data[:ImageValidationService.HEADER_SIZE]) == "JPEG"
+    assert ImageValidationService.decode_image(image_data).size == (736, 994)
+
+    with pytest.raises(ValueError, match="неподдерживаемый формат"):
+        ImageValidationService.sniff_format(b"%PDF-1.7\n")
+    with pytest.raises(ValueError, match="превышает"):
+        ImageValidationService.decode_image(image_data, max_bytes=1024)
+    with pytest.raises(ValueError, match="превышает"):
+        ImageValidationService.decode_image(image_data, max_pixels=1000)
+
+
+@pytest.mark.asyncio
+async def test_upload_buffer_spools_and_caps():
+    payload = os.urandom(300 * 1024)
+
+    upload = UploadFile(io.BytesIO(payload))
+    with await UploadBuffer.from_upload(upload, max_bytes=len(payload), spool_threshold=100 * 1024,
+                                        chunk_size=64 * 1024) as buffer:
+        assert buffer.on_disk
+        assert buffer.view() == payload
+
+    upload = UploadFile(io.BytesIO(payload))
+    with pytest.raises(ValueError, match="превышает"):
+        await UploadBuffer.from_upload(upload, max_bytes=len(payload) - 1, spool_threshold=100 * 1024)
+
+
+@pytest.mark.asyncio
+async def test_avatar_variants_generated_lazily():
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        with open(GOOD_IMAGE_PATH, "rb") as image_file:
+            files = {"avatar": ("ava.jpg", image_file, "image/jpeg")}
+            data = {
+                "email": "variants_test_user@example.com",
+                "password": "securepassword",
+                "first_name": "Variants",
+                "last_name": "Tester",
+                "gender": "female"
+            }
+            response = await ac.post("/api/clients/create2", files=files, data=data)
+        assert response.status_code == 201
+        user = response.json()
+        assert user["avatar_variants"]["full"] == user["avatar_url"]
+
+        thumb_response = await ac.get(f"/{user['avatar_variants']['thumb']}")
+        assert thumb_response.status_code == 200
+        thumb = Image.open(io.BytesIO(thumb_response.content))
+        assert max(thumb.size) <= avatar_derivatives.variants["thumb"]
+
+        assert (await ac.get("/avatars/..%2Fdatabase.db")).status_code == 404
+
+    async with AsyncSession(engine) as session:
+        user_service = UserService(session, PasswordHasherProtocol)
+        await user_service.delete_user_by_id(user["id"])
+
+
+@pytest.mark.asyncio
+async def test_failed_registration_releases_stored_avatar(monkeypatch):
+    clients = sys.modules["routers.clients"]
+    stored: list[str] = []
+    upload_image = clients.LocalImageService.upload_image
+
+    async def upload_fresh(image_data, extension):
+        filename = await upload_image(image_data, extension)
+        # Такой же файл мог остаться от других тестов: начинаем без записи о нем
+        async with SessionLocal() as session:
+            await session.execute(text("delete from avatar_blobs where content_key = :key"),
+                                  {"key": ContentAddressedStorage.key_from_filename(filename)})
+            await session.commit()
+        stored.append(filename)
+        return filename
+
+    async def overloaded(self, user, avatar_url, **kwargs):
+        raise clients.PasswordHasherOverloaded("Очередь хеширования переполнена")
+
+    monkeypatch.setattr(clients.LocalImageService, "upload_image", staticmethod(upload_fresh))
+    monkeypatch.setattr(clients.UserService, "create_user", overloaded)
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        with open(GOOD_IMAGE_PATH, "rb") as image_file:
+            files = {"avatar": ("ava.jpg", image_file, "image/jpeg")}
+            data = {"email": "overloaded_user@example.com", "password": "securepassword",
+                    "first_name": "Overloaded", "last_name": "Tester", "gender": "female"}
+            response = await ac.post("/api/clients/create2", files=files, data=data)
+    assert response.status_code == 503
+
+    # Файл уже сохранен, но пользователь не создан: файл отдан сборщику мусора
+    async with SessionLocal() as session:
+        refcount = await session.scalar(text("select refcount from avatar_blobs where content_key = :key"),
+                                        {"key": ContentAddressedStorage.key_from_filename(stored[0])})
+        assert refcount == 0
+
+
+@pytest.mark.asyncio
+async def test_parallel_registration_reports_overload_with_bad_image(monkeypatch):
+    clients = sys.modules["routers.clients"]
+
+    async def overloaded(self, user, avatar_url, **kwargs):
+        raise clients.PasswordHasherOverloaded("Очередь хеширования переполнена")
+
+    monkeypatch.setattr(clients.UserService, "create_user", overloaded)
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        with open(BAD_IMAGE_PATH, "rb") as text_file:
+            files = {"avatar": ("ava.txt", text_file, "text/plain")}
+            data = {"email": "overloaded_user@example.com", "password": "securepassword",
+                    "first_name": "Overloaded", "last_name": "Tester", "gender": "female"}
+            response = await ac.post("/api/clients/create", files=files, data=data)
+    # Обе операции завершились ошибкой, но перегрузка - временная: 503, а не 500
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_avatar_conditional_and_range_requests():
+    data = os.urandom(1000)
+    await avatar_storage.put("etag-test.png", data)
+    stored: list[str] = []
+    try:
+        async with AsyncClient(app=app, base_url=URL) as ac:
+            response = await ac.get("/avatars/etag-test.png")
+            assert response.status_code == 200
+            assert response.content == data
+            assert "immutable" in response.headers["cache-control"]
+            etag = response.headers["etag"]
+
+            not_modified = await ac.get("/avatars/etag-test.png", headers={"If-None-Match": etag})
+            assert not_modified.status_code == 304
+            assert not_modified.content == b""
+
+            partial = await ac.get("/avatars/etag-test.png", headers={"Range": "bytes=100-199"})
+            assert partial.status_code == 206
+            assert partial.content == data[100:200]
+            assert partial.headers["content-range"] == "bytes 100-199/1000"
+
+            suffix = await ac.get("/avatars/etag-test.png", headers={"Range": "bytes=-10"})
+            assert suffix.content == data[-10:]
+
+            outside = await ac.get("/avatars/etag-test.png", headers={"Range": "bytes=5000-"})
+            assert outside.status_code == 416
+
+            # Файл в хранилище по хешу: ETag - ключ из имени, без хеширования файла
+            filename, _ = await avatar_storage.store(data, ".png")
+            stored.append(filename)
+            response = await ac.get(f"/avatars/{filename}")
+            assert response.headers["etag"] == f'"{ContentAddressedStorage.key_from_filename(filename)}"'
+            etag = response.headers["etag"]
+            for if_none_match, expected in (("*", 304), (f'"other",{etag}', 304), (f' W/"other" , W/{etag} ', 304),
+                                            ('"other", W/"more"', 200)):
+                response = await ac.get(f"/avatars/{filename}", headers={"If-None-Match": if_none_match})
+                assert response.status_code == expected, if_none_match
+            # If-Range сравнивается строго
+            weak_range = await ac.get(f"/avatars/{filename}", headers={"Range": "bytes=0-9", "If-Range": f"W/{etag}"})
+            assert weak_range.status_code == 200
+    finally:
+        await avatar_storage.delete("etag-test.png", *stored)
+
+
+@pytest.mark.asyncio
+async def test_avatar_migration_deduplicates_and_collects_garbage(tmp_path):
+    storage = ContentAddressedStorage(LocalStorageDriver(str(tmp_path)), avatar_derivatives.variants)
+    data = os.urandom(256)
+    for name in ("11111111-aaaa-bbbb-cccc-000000000001.png", "11111111-aaaa-bbbb-cccc-000000000002.png"):
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "11111111-aaaa-bbbb-cccc-000000000001_thumb.webp").write_bytes(b"old variant")
+
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        user = await user_service.create_user(
+            UserCreate(email="migration_user@example.com", password="securepassword",
+                       first_name="Migration", last_name="Tester", gender="male"),
+            "avatars/11111111-aaaa-bbbb-cccc-000000000001.png",
+        )
+
+        stats = await AvatarMigrationService(session, "avatars", str(tmp_path), storage).migrate(batch_size=1)
+        assert stats.as_dict() == {"batches": 2, "files": 2, "deduplicated": 1, "users": 1, "orphans": 1}
+        assert not list(tmp_path.glob("*.png")) and not list(tmp_path.glob("*.webp"))
+
+        key = storage.content_key(data)
+        await session.refresh(user)
+        assert user.avatar_url == f"avatars/{key}.png"
+        assert os.path.exists(os.path.join(tmp_path, key[:2], key[2:4], f"{key}.png"))
+        refcount = await session.scalar(text("select refcount from avatar_blobs where content_key = :key"),
+                                        {"key": key})
+        assert refcount == 1
+
+        await user_service.delete_user_by_id(user.id)
+        assert await AvatarBlobService(session, storage).collect_garbage(grace_seconds=-5) >= 1
+        assert not await storage.exists(f"{key}.png")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_files_get_default_permissions(tmp_path):
+    driver = LocalStorageDriver(str(tmp_path))
+    await driver.put("ab/cd/file.png", b"data")
+    # Как при обычной записи: права 0666 с учетом umask, а не 0600 от временного файла
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(driver.path("ab/cd/file.png")).st_mode & 0o777 == 0o666 & ~umask
+
+
+@pytest.mark.asyncio
+async def test_avatar_garbage_collection_waits_for_concurrent_upload(tmp_path):
+    storage = ContentAddressedStorage(LocalStorageDriver(str(tmp_path)), avatar_derivatives.variants)
+    data = os.urandom(128)
+    filename, _ = await storage.store(data, ".png")
+    uploads: list[asyncio.Task] = []
+    delete = storage.delete
+
+    async def upload_during_delete(*filenames, **kwargs):
+        # Пока сборщик удаляет файл, такой же аватар загружают снова
+        async def upload():
+            async with SessionLocal() as other:
+                return await AvatarBlobService(other, storage).store(data, ".png")
+        uploads.append(asyncio.create_task(upload()))
+        await asyncio.sleep(0.05)
+        return await delete(*filenames, **kwargs)
+
+    storage.delete = upload_during_delete
+    await engine.dispose()
+    async with SessionLocal() as session:
+        blobs = AvatarBlobService(session, storage)
+        await blobs.discard(filename)
+        assert await blobs.collect_garbage(grace_seconds=-5) == 1
+        # Аренда ждала конца сборки, поэтому файл записан заново
+        assert await uploads[0] == (filename, True)
+        assert await storage.exists(filename)
+        await session.execute(text("delete from avatar_blobs where content_key = :key"),
+                              {"key": ContentAddressedStorage.key_from_filename(filename)})
+        await session.commit()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_content_storage_rewrites_file_removed_before_touch(tmp_path):
+    storage = ContentAddressedStorage(LocalStorageDriver(str(tmp_path)))
+    data = os.urandom(128)
+    filename, _ = await storage.store(data, ".png")
+    touch = storage.driver.touch
+
+    async def removed_before_touch(key):
+        os.remove(storage.driver.path(key))
+        await touch(key)
+
+    storage.driver.touch = removed_before_touch
+    assert await storage.store(data, ".png") == (filename, True)
+    assert await storage.read(filename) == data
+
+
+class FakeS3:
+    """Заглушка S3 в памяти процесса (ASGI-приложение) для тестов драйвера."""
+
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, float]] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.requests: list[tuple[str, str]] = []
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        body = await request.body()
+        params = request.query_params
+        key = unquote(request.url.path.lstrip("/").partition("/")[2])
+        assert request.headers["authorization"].startswith("AWS4-HMAC-SHA256 Credential=key/")
+        self.requests.append((request.method, key))
+        namespace = 'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"'
+
+        if request.method == "POST" and "delete" in params:
+            for element in ElementTree.fromstring(body).iter("Key"):
+                self.objects.pop(element.text, None)
+            response = Response(f"<DeleteResult {namespace}/>")
+        elif request.method == "POST" and "uploads" in params:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            response = Response(f"<InitiateMultipartUploadResult {namespace}><UploadId>{upload_id}</UploadId>"
+                                f"</InitiateMultipartUploadResult>")
+        elif request.method == "PUT" and "partNumber" in params:
+            self.uploads[params["uploadId"]][int(params["partNumber"])] = body
+            response = Response(headers={"etag": f'"{hashlib.md5(body).hexdigest()}"'})
+        elif request.method == "POST" and "uploadId" in params:
+            parts = self.uploads.pop(params["uploadId"])
+            self.objects[key] = (b"".join(parts[number] for number in sorted(parts)), time.time())
+            response = Response(f"<CompleteMultipartUploadResult {namespace}/>")
+        elif request.method == "PUT":
+            if "x-amz-copy-source" in request.headers:
+                body = self.objects[key][0]
+            self.objects[key] = (body, time.time())
+            response = Response()
+        elif key not in self.objects:
+            response = Response(status_code=404)
+        else:
+            data, modified = self.objects[key]
+            headers = {"last-modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(modified))}
+            response = Response(b"" if request.method == "HEAD" else data, headers=headers)
+        await response(scope, receive, send)
+
+
+@pytest.mark.asyncio
+async def test_s3_storage_driver(tmp_path):
+    fake_s3 = FakeS3()
+    driver = S3StorageDriver("http://s3.test", "avatars", "key", "secret", cache_dir=str(tmp_path),
+                             multipart_threshold=1024, part_size=5 * 1024 * 1024, transport=ASGITransport(app=fake_s3))
+    storage = ContentAddressedStorage(driver, avatar_derivatives.variants)
+    try:
+        data = os.urandom(6 * 1024 * 1024)
+        filename, created = await storage.store(data, ".webp")
+        assert created
+        key = storage.object_key(filename)
+        assert key == f"{filename[:2]}/{filename[2:4]}/{filename}"
+        assert fake_s3.objects[key][0] == data
+        assert sum(1 for method, _ in fake_s3.requests if method == "PUT") == 2  # две части multipart upload
+
+        assert (await storage.store(data, ".webp")) == (filename, False)
+        assert await storage.modified_at(filename) is not None
+
+        with open(await storage.local_path(filename), "rb") as cached_file:
+            assert cached_file.read() == data
+
+        assert await storage.delete(filename) == len(storage.related_filenames(filename))
+        assert key not in fake_s3.objects
+        assert not await storage.exists(filename)
+        with pytest.raises(FileNotFoundError):
+            await storage.local_path(filename)
+    finally:
+        await storage.close()
+
+
+class FlakyJobHandler:
+    """Обработчик тестовых задач: падает заданное в payload число раз."""
+    kind = "test"
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self.failures: list[str] = []
+
+    async def run(self, db, payload):
+        self.calls[payload["name"]] = self.calls.get(payload["name"], 0) + 1
+        if self.calls[payload["name"]] <= payload["fail_times"]:
+            raise RuntimeError("temporary")
+
+    async def on_failure(self, db, payload, error):
+        self.failures.append(payload["name"])
+
+
+@pytest.mark.asyncio
+async def test_job_queue_retries_and_visibility_timeout():
+    handler = FlakyJobHandler()
+    worker = JobWorker(SessionLocal, [handler], retry_base=0, worker_id="worker-a")
+    async with SessionLocal() as session:
+        queue = JobQueue(session)
+        flaky = await queue.enqueue("test", {"name": "flaky", "fail_times": 1}, max_attempts=3)
+        broken = await queue.enqueue("test", {"name": "broken", "fail_times": 99}, max_attempts=2)
+
+        assert await worker.run_once() == 2
+        flaky_state = await JobQueue(session).get(flaky.id)
+        await session.refresh(flaky_state)
+        assert (flaky_state.status, flaky_state.last_error) == ("queued", "temporary")
+        await session.commit()  # транзакция чтения держит писателя, нужного воркеру
+        assert await worker.run_once() == 2
+        for job, status in ((flaky, "done"), (broken, "failed")):
+            await session.refresh(job)
+            assert job.status == status
+        assert handler.failures == ["broken"]
+
+        # Воркер, не уложившийся во время видимости, теряет задачу
+        lost = await queue.enqueue("test", {"name": "lost", "fail_times": 0}, max_attempts=3)
+        assert [job.id for job in await queue.claim("worker-a", 1, visibility_timeout=0, kinds=["test"])] == [lost.id]
+        reclaimed = await queue.claim("worker-b", 1, visibility_timeout=60, kinds=["test"])
+        assert [(job.id, job.attempts) for job in reclaimed] == [(lost.id, 2)]
+        assert not await queue.complete(lost.id, "worker-a")
+        assert await queue.complete(lost.id, "worker-b")
+
+
+@pytest.mark.asyncio
+async def test_async_registration():
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        with open(GOOD_IMAGE_PATH, "rb") as image_file:
+            files = {"avatar": ("ava.jpg", image_file, "image/jpeg")}
+            data = {
+                "email": "async_test_user@example.com",
+                "password": "securepassword",
+                "first_name": "Async",
+                "last_name": "Tester",
+                "gender": "female"
+            }
+            response = await ac.post("/api/clients/create_async", files=files, data=data)
+        assert response.status_code == 202
+        accepted = response.json()
+        assert accepted["job"]["status"] == "queued"
+        assert response.headers["location"].endswith(f"/api/clients/jobs/{accepted['job']['id']}")
+        assert (await ac.get(f"/api/clients/{accepted['user_id']}")).status_code == 404
+
+        worker = JobWorker(SessionLocal, [AvatarJobHandler()])
+        assert await worker.run_once() == 1
+
+        job_status = (await ac.get(f"/api/clients/jobs/{accepted['job']['id']}")).json()
+        assert job_status["status"] == "done"
+        user_response = await ac.get(f"/api/clients/{accepted['user_id']}")
+        assert user_response.status_code == 200
+        assert user_response.json()["avatar_url"].endswith(avatar_derivatives.extension)
+
+    async with AsyncSession(engine) as session:
+        await UserService(session, PasswordHasherProtocol).delete_user_by_id(accepted["user_id"])
+
+
+@pytest.mark.asyncio
+async def test_avatar_job_releases_processed_file_when_activation_fails(monkeypatch):
+    with open(GOOD_IMAGE_PATH, "rb") as image_file:
+        await avatar_storage.put("incoming/activation-fails", image_file.read())
+    discarded: list[str] = []
+    discard = sys.modules["services.avatar_blob_service"].AvatarBlobService.discard
+
+    async def record_discard(self, avatar_url):
+        discarded.append(avatar_url)
+        await discard(self, avatar_url)
+
+    async def failing_activation(self, db_user, avatar_url, activate=False):
+        raise RuntimeError("Ошибка при активации")
+
+    monkeypatch.setattr(sys.modules["services.avatar_blob_service"].AvatarBlobService, "discard", record_discard)
+    monkeypatch.setattr(sys.modules["services.user_service"].UserService, "set_avatar_url", failing_activation)
+    async with SessionLocal() as session:
+        db_user = await UserService(session, password_hasher.PasswordHasher()).create_user(
+            UserCreate(email="activation_fails@example.com", password="securepassword",
+                       first_name="Activation", last_name="Tester", gender="female"), None, is_active=False)
+        payload = {"user_id": db_user.id, "upload_key": "incoming/activation-fails"}
+        with pytest.raises(RuntimeError):
+            await AvatarJobHandler().run(session, payload)
+
+        # Обработанный файл сохранен, но пользователю не достался: он передан сборщику мусора
+        assert len(discarded) == 1
+        refcount = await session.scalar(text("select refcount from avatar_blobs where content_key = :key"),
+                                        {"key": ContentAddressedStorage.key_from_filename(discarded[0])})
+        assert refcount == 0
+        await AvatarJobHandler().on_failure(session, payload, "Ошибка при активации")
+
+
+class UnusedPasswordHasher:
+    """Хешер, который не должен вызываться (email отсекается до хеширования)."""
+
+    async def hash_password_async(self, password):
+        raise AssertionError("Пароль не должен хешироваться")
+
+
+@pytest.mark.asyncio
+async def test_create_user_relies_on_unique_email_and_bloom_filter():
+    email_filter = EmailBloomFilter(1000, 0.01)
+    user_data = UserCreate(email="unique_email_user@example.com", password="securepassword",
+                           first_name="Unique", last_name="Tester", gender="male")
+    async with SessionLocal() as first, SessionLocal() as second:
+        # Фильтр не заполнен: дубликат определяется по уникальному индексу при вставке
+        created = await UserService(first, password_hasher.PasswordHasher(), email_filter).create_user(user_data, None)
+        with pytest.raises(Exception) as excinfo:
+            await UserService(second, password_hasher.PasswordHasher(), email_filter).create_user(user_data, None)
+        assert type(excinfo.value).__name__ == "EmailAlreadyRegistered"
+
+        async with ReadSessionLocal() as reader:
+            assert await email_filter.load(reader) >= 1
+        assert email_filter.might_contain("UNIQUE_EMAIL_USER@example.com")
+        assert not email_filter.might_contain("never_registered_user@example.com")
+        assert not await UserService(first, UnusedPasswordHasher(), email_filter).email_exists(
+            "never_registered_user@example.com")
+        await first.commit()  # транзакция чтения держит писателя, нужного второй сессии
+        # Адрес зарегистрирован другим процессом (его нет в фильтре этого процесса): он все равно занят
+        other_data = user_data.model_copy(update={"email": "other_worker_user@example.com"})
+        other = await UserService(second, password_hasher.PasswordHasher(), EmailBloomFilter(1000, 0.01)
+                                  ).create_user(other_data, None)
+        assert not email_filter.might_contain(other_data.email)
+        assert await UserService(second, UnusedPasswordHasher(), email_filter).email_exists(other_data.email)
+        await UserService(second, PasswordHasherProtocol).delete_user_by_id(other.id)
+        with pytest.raises(Exception) as excinfo:
+            await UserService(first, UnusedPasswordHasher(), email_filter).create_user(user_data, None)
+        assert type(excinfo.value).__name__ == "EmailAlreadyRegistered"
+
+        async with AsyncClient(app=app, base_url=URL) as ac:
+            taken = await ac.get("/api/clients/email_available", params={"email": user_data.email})
+            free = await ac.get("/api/clients/email_available", params={"email": "free_email_user@example.com"})
+        assert taken.json() == {"email": user_data.email, "available": False}
+        assert free.json()["available"] is True
+
+        await UserService(first, PasswordHasherProtocol).delete_user_by_id(created.id)
+
+
+@pytest.mark.asyncio
+async def test_bulk_user_import(tmp_path):
+    with open(GOOD_IMAGE_PATH, "rb") as image_file:
+        image = image_file.read()
+    (tmp_path / "ava.jpg").write_bytes(image)
+    partner = httpx.MockTransport(lambda request: httpx.Response(200, content=image)
+                                  if request.url.path == "/ava.jpg" else httpx.Response(404))
+
+    def row(email, **extra):
+        return json.dumps({"email": email, "password": "securepassword", "first_name": "Bulk",
+                           "last_name": "Tester", "gender": "female", **extra})
+
+    lines = [
+        row("bulk_local@example.com", avatar="ava.jpg"),
+        row("bulk_remote@example.com", avatar="https://partner.example/ava.jpg"),
+        row("bulk_invalid@example.com", gender="robot"),
+        row("bulk_local@example.com"),
+        "{not json",
+        row("seed@example.com"),
+        row("bulk_traversal@example.com", avatar="../outside.jpg"),
+        row("bulk_missing@example.com", avatar="https://partner.example/missing.jpg"),
+        row("bulk_plain@example.com"),
+    ]
+    errors = []
+    async with SessionLocal() as session:
+        hasher = password_hasher.PasswordHasher(HasherExecutor("thread", 2))
+        importer = UserImporter(UserService(session, hasher), hasher, batch_size=4, avatar_root=str(tmp_path),
+                                http_transport=partner)
+        stats = await importer.run(io.StringIO("\n".join(lines)), "ndjson", errors.append)
+        hasher.executor.shutdown()
+
+        assert (stats.rows, stats.imported, stats.failed, stats.batches) == (9, 3, 6, 3)
+        assert {error.line for error in errors} == {3, 4, 5, 6, 7, 8}
+        assert next(error for error in errors if error.line == 6).error == "Email уже зарегистрирован"
+
+        users = {user.email: user for user in await session.execute(
+            text("select id, email, avatar_url, hashed_password from users where email like 'bulk_%'"))}
+        assert set(users) == {"bulk_local@example.com", "bulk_remote@example.com", "bulk_plain@example.com"}
+        # Одинаковые аватары сохранены один раз
+        assert users["bulk_local@example.com"].avatar_url == users["bulk_remote@example.com"].avatar_url
+        assert hasher.verify_password("securepassword", users["bulk_plain@example.com"].hashed_password)
+
+        for user in users.values():
+            await UserService(session, PasswordHasherProtocol).delete_user_by_id(user.id)
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_api_requires_key_and_allowed_avatar_hosts(monkeypatch):
+    dependencies = sys.modules["routers.dependencies"]
+    monkeypatch.setattr(dependencies, "USER_IMPORT_API_ENABLED", True)
+    monkeypatch.setattr(dependencies, "USER_IMPORT_API_KEY", "import-secret")
+    monkeypatch.setattr(sys.modules["routers.clients"], "USER_IMPORT_API_AVATAR_HOSTS", frozenset({"localhost"}))
+    payload = TokenPayload(id=1, username="A", first_name="A", last_name="B", email="seed@example.com")
+    headers = {"Authorization": f"Bearer {token_service.TokenGenerator.generate_token(payload).access_token}"}
+    rows = "\n".join(json.dumps({"email": email, "password": "securepassword", "first_name": "Api",
+                                 "last_name": "Import", "gender": "male", "avatar": avatar})
+                      for email, avatar in (("api_import_internal@example.com", "http://localhost:8000/admin"),
+                                            ("api_import_other@example.com", "http://169.254.169.254/latest"),
+                                            ("api_import_plain@example.com", "")))
+    files = {"file": ("users.ndjson", rows.encode(), "application/x-ndjson")}
+
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        # Обычный пользователь с токеном, но без служебного ключа
+        assert (await ac.post("/api/clients/import", headers=headers, files=files)).status_code == 403
+        response = await ac.post("/api/clients/import", headers={**headers, "X-Import-Key": "wrong"}, files=files)
+        assert response.status_code == 403
+
+        response = await ac.post("/api/clients/import", headers={**headers, "X-Import-Key": "import-secret"},
+                                 files=files)
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["imported"], result["failed"]) == (1, 2)
+        errors = {error["email"]: error["error"] for error in result["errors"]}
+        assert "внутренний адрес" in errors["api_import_internal@example.com"]
+        assert "не разрешена" in errors["api_import_other@example.com"]
+
+    async with SessionLocal() as session:
+        await session.execute(text("delete from users where email = 'api_import_plain@example.com'"))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_connects_to_checked_avatar_address(monkeypatch):
+    with open(GOOD_IMAGE_PATH, "rb") as image_file:
+        image = image_file.read()
+    resolved: list[int] = []
+
+    async def getaddrinfo(host, port, **kwargs):
+        resolved.append(port)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", port))]
+
+    def partner(request):
+        # Запрос идет на проверенный адрес, имя хоста - только в Host и SNI (повторного разрешения нет)
+        if (request.url.host, request.headers["host"], request.extensions.get("sni_hostname")) \
+                == ("93.184.216.34", "partner.example", "partner.example"):
+            return httpx.Response(200, content=image)
+        return httpx.Response(404)
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    rows = "\n".join(json.dumps({"email": email, "password": "securepassword", "first_name": "Pinned",
+                                 "last_name": "Import", "gender": "male", "avatar": avatar})
+                      for email, avatar in (("pinned_https@example.com", "https://partner.example/ava.jpg"),
+                                            ("pinned_http@example.com", "http://partner.example/ava.jpg")))
+    async with SessionLocal() as session:
+        hasher = password_hasher.PasswordHasher(HasherExecutor("thread", 1))
+        importer = UserImporter(UserService(session, hasher), hasher, http_transport=httpx.MockTransport(partner),
+                                avatar_hosts={"partner.example"})
+        stats = await importer.run(io.StringIO(rows), "ndjson")
+        hasher.executor.shutdown()
+        assert stats.imported == 2
+        # Порт по умолчанию берется из схемы URL
+        assert sorted(resolved) == [80, 443]
+        for email in ("pinned_https@example.com", "pinned_http@example.com"):
+            user_id = await session.scalar(text("select id from users where email = :email"), {"email": email})
+            await UserService(session, PasswordHasherProtocol).delete_user_by_id(user_id)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_profile_routes_reads_and_writes():
+    async with ReadSessionLocal() as session:
+        assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        # Сессии только для чтения - в пул читателей (query_only)
+        assert (await session.execute(text("PRAGMA query_only"))).scalar() == 1
+        assert (await session.execute(text("PRAGMA busy_timeout"))).scalar() > 0
+
+    # Очередь ожидания пула привязывается к циклу событий, а у каждого теста цикл свой
+    await engine.dispose()
+    async with SessionLocal() as first, SessionLocal() as second:
+        # Сессия записи и читает через писателя: чтение-изменение-запись в одной транзакции,
+        # а такая же вторая транзакция ждет окончания первой
+        assert (await first.execute(text("PRAGMA query_only"))).scalar() == 0
+        name = await first.scalar(text("select first_name from users where id = 1"))
+        waiting = asyncio.create_task(second.scalar(text("select first_name from users where id = 1")))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        await first.execute(text("update users set first_name = :name where id = 1"), {"name": name + "!"})
+        await first.commit()
+        assert await waiting == name + "!"
+        await second.execute(text("update users set first_name = :name where id = 1"), {"name": name})
+        await second.commit()
+    await engine.dispose()
+
+    stats = pool_stats()
+    assert stats["writer"]["size"] == 1 and stats["reader"]["checkouts"] >= 2
+
+    maintenance = DatabaseMaintenance(engine, interval=60, stats_provider=pool_stats)
+    busy, _, _ = await maintenance.run_once()
+    assert busy == 0 and maintenance.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_like_is_single_upsert_with_existing_semantics():
+    payload = TokenPayload(id=1, username="A", first_name="A", last_name="B", email="seed@example.com")
+    headers = {"Authorization": f"Bearer {token_service.TokenGenerator.generate_token(payload).access_token}"}
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        target = await user_service.create_user(
+            UserCreate(email="like_target@example.com", password="securepassword",
+                       first_name="Like", last_name="Target", gender="female"), None)
+        pending = await user_service.create_user(
+            UserCreate(email="like_pending@example.com", password="securepassword",
+                       first_name="Like", last_name="Pending", gender="female"), None, is_active=False)
+        assert (await session.execute(text("PRAGMA foreign_keys"))).scalar() == 1
+
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        assert (await ac.post(f"/api/clients/{target.id}/match", headers=headers)).status_code == 201
+        assert (await ac.post(f"/api/clients/{target.id}/match", headers=headers)).status_code == 201
+        assert (await ac.post("/api/clients/1/match", headers=headers)).status_code == 400
+        assert (await ac.post("/api/clients/999999/match", headers=headers)).status_code == 404
+        assert (await ac.post(f"/api/clients/{pending.id}/match", headers=headers)).status_code == 404
+
+    async with SessionLocal() as session:
+        like_service = LikeService(session)
+        assert not await like_service.create_like(1, target.id)
+        with pytest.raises(ValueError, match="не существует"):
+            await like_service.create_like(999999, target.id)
+        likes = await session.scalar(text("select count(*) from likes where liked_user_id = :id"), {"id": target.id})
+        assert likes == 1
+
+        user_service = UserService(session, PasswordHasherProtocol)
+        await user_service.delete_user_by_id(target.id)
+        await user_service.delete_inactive_user(pending.id)
+        # Лайки удаляются каскадно вместе с пользователем
+        assert await session.scalar(text("select count(*) from likes where liked_user_id = :id"),
+                                    {"id": target.id}) == 0
+
+
+@pytest.mark.asyncio
+async def test_like_write_buffer_batches_and_overlays():
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        targets = [await user_service.create_user(
+            UserCreate(email=f"buffer_target{i}@example.com", password="securepassword",
+                       first_name="Buffer", last_name="Target", gender="female"), None) for i in range(3)]
+    ids = [target.id for target in targets]
+
+    buffer = LikeWriteBuffer(flush_interval_ms=60_000, max_batch=3, max_pending=3, backpressure_timeout=0.05)
+    async with SessionLocal() as session:
+        like_service = LikeService(session, buffer)
+        assert await like_service.create_like(1, ids[0])
+        assert not await like_service.create_like(1, ids[0])
+        await buffer.add(424242, ids[1])  # автор не существует - отбрасывается при записи
+        # Свои лайки видны до записи в БД
+        assert await like_service.get_liked_user_ids(1) == [ids[0]]
+        assert await session.scalar(text("select count(*) from likes where user_id = 1")) == 0
+        await session.commit()  # транзакция чтения держит писателя, нужного сбросу буфера
+
+        await buffer.add(1, ids[1])
+        with pytest.raises(Exception) as excinfo:
+            await buffer.add(1, ids[2])
+        assert type(excinfo.value).__name__ == "LikeBufferOverloaded"
+
+        buffer.start(SessionLocal)
+        assert await buffer.add(1, ids[2])  # буфер сброшен по достижении пачки, место освободилось
+        await buffer.stop()
+        assert buffer.pending == 0 and buffer.stats["skipped"] == 1
+        assert await LikeService(session).get_liked_user_ids(1) == sorted(ids)
+
+        for user_id in ids:
+            await UserService(session, PasswordHasherProtocol).delete_user_by_id(user_id)
+
+
+@pytest.mark.asyncio
+async def test_mutual_like_creates_match():
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        users = [await user_service.create_user(
+            UserCreate(email=f"mutual{i}@example.com", password="securepassword",
+                       first_name="Mutual", last_name="User", gender="female"), None) for i in range(4)]
+    a, b, c, d = (user.id for user in users)
+    payload = TokenPayload(id=b, username="M", first_name="Mutual", last_name="User", email="mutual1@example.com")
+    headers = {"Authorization": f"Bearer {token_service.TokenGenerator.generate_token(payload).access_token}"}
+
+    async with SessionLocal() as session:
+        like_service = LikeService(session)
+        assert await like_service.like(a, b) == LikeResult(created=True, matched=False)
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        response = await ac.post(f"/api/clients/{a}/match", headers=headers)
+        assert response.status_code == 201 and response.json()["matched"] is True
+        response = await ac.post(f"/api/clients/{a}/match", headers=headers)
+        assert response.status_code == 201 and response.json()["matched"] is True
+
+    buffer = LikeWriteBuffer(flush_interval_ms=60_000)
+    async with SessionLocal() as session:
+        like_service = LikeService(session, buffer)
+        assert (await like_service.like(c, d)).matched is False
+        assert (await like_service.like(d, c)).matched is True  # ответный лайк еще в буфере
+        await session.commit()
+        buffer.start(SessionLocal)
+        await buffer.stop()
+        assert buffer.stats["matches"] == 1
+
+        pairs = (await session.execute(
+            text("select first_user_id, second_user_id from matches where first_user_id in (:a, :c)"),
+            {"a": a, "c": c})).all()
+        assert sorted(pairs) == [(a, b), (c, d)]
+        plan = " ".join(row[-1] for row in (await session.execute(
+            text("explain query plan select user_id from likes where liked_user_id = :id"), {"id": a})).all())
+        assert "ix_likes_liked_user_id_user_id" in plan
+
+        for user_id in (a, b, c, d):
+            await UserService(session, PasswordHasherProtocol).delete_user_by_id(user_id)
+        assert await session.scalar(text("select count(*) from matches where first_user_id in (:a, :c)"),
+                                    {"a": a, "c": c}) == 0
+
+
+@pytest.mark.asyncio
+async def test_list_clients_keyset_pagination():
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        users = [await user_service.create_user(
+            UserCreate(email=f"listing{i}@example.com", password="securepassword", first_name=f"Zlisting{i}",
+                       last_name="Browse", gender="female" if i % 2 else "male"), None,
+            is_active=i != 4) for i in range(6)]
+    ids = [user.id for user in users]
+
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        seen, cursor = [], None
+        while True:
+            params = {"name": "Zlisting", "limit": 2} | ({"cursor": cursor} if cursor is not None else {})
+            page = (await ac.get("/api/clients", params=params)).json()
+            assert "email" not in page["items"][0] and len(page["items"]) <= 2
+            seen += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [user_id for i, user_id in enumerate(ids) if i != 4]
+
+        page = (await ac.get("/api/clients", params={"name": "Brow", "gender": "female"})).json()
+        assert [item["id"] for item in page["items"]] == [ids[1], ids[3], ids[5]]
+        assert (await ac.get("/api/clients", params={"limit": 0})).status_code == 422
+        # Верхняя граница префикса, оканчивающегося последним символом Unicode
+        response = await ac.get("/api/clients", params={"name": "Z\U0010ffff"})
+        assert response.status_code == 200 and response.json()["items"] == []
+
+    async with SessionLocal() as session:
+        plan = " ".join(row[-1] for row in (await session.execute(text(
+            "explain query plan select id from users where gender = 'male' and is_active = 1 and id > 0 "
+            "order by id limit 21"))).all())
+        assert "ix_users_gender_is_active_id" in plan and "TEMP B-TREE" not in plan
+        # Префикс имени ищется по индексам имени и фамилии (внешний запрос в маленькой тестовой
+        # таблице планировщик вправе выполнить просмотром)
+        query = UserService.listing_query(ids[0], "female", "Zlist").limit(21)
+        sql = str(query.compile(bind=engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in (await session.execute(text("explain query plan " + sql))).all())
+        assert "INDEX ix_users_first_name" in plan and "INDEX ix_users_last_name" in plan
+        user_service = UserService(session, PasswordHasherProtocol)
+        for i, user_id in enumerate(ids):
+            if i == 4:
+                await user_service.delete_inactive_user(user_id)
+            else:
+                await user_service.delete_user_by_id(user_id)
+
+
+@pytest.mark.asyncio
+async def test_nearby_users_by_rtree_and_geohash():
+    assert round(geo.haversine_km(55.7558, 37.6173, [59.9343], [30.3351])[0]) == 633  # Москва - Петербург
+    assert np.isnan(geo.haversine_km(55.7558, 37.6173, [None, 59.9343], [None, 30.3351])).tolist() == [True, False]
+    assert len(geo.bounding_boxes(0.0, 179.9, 50)) == 2
+    cells = geo.geohash_cells(geo.bounding_boxes(55.7558, 37.6173, 10))
+    assert geo.geohash_encode(55.80, 37.60, 9).startswith(tuple(cells))
+
+    points = [(55.7558, 37.6173, "female", True), (55.7900, 37.6500, "female", True),
+              (56.2000, 37.6173, "female", True), (55.7560, 37.6170, "male", True), (55.7559, 37.6172, "female", False)]
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        users = [await user_service.create_user(
+            UserCreate(email=f"nearby{i}@example.com", password="securepassword", first_name="Near",
+                       last_name="By", gender=gender), None) for i, (_, _, gender, _) in enumerate(points)]
+        ids = [user.id for user in users]
+        for user_id, (latitude, longitude, _, _) in zip(ids, points):
+            await user_service.set_location(user_id, latitude, longitude)
+        # Неактивный пользователь остается в индексе, но не попадает в результаты
+        await session.execute(text("update users set is_active = 0 where id = :id"), {"id": ids[4]})
+        await session.commit()
+
+        plan = " ".join(row[-1] for row in (await session.execute(text(
+            "explain query plan select users.id from users join users_geo on users_geo.id = users.id "
+            "where users_geo.max_lat >= 55 and users_geo.min_lat <= 56"))).all())
+        assert "VIRTUAL TABLE INDEX" in plan
+
+    payload = TokenPayload(id=ids[0], username="N", first_name="Near", last_name="By", email="nearby0@example.com")
+    headers = {"Authorization": f"Bearer {token_service.TokenGenerator.generate_token(payload).access_token}"}
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        response = await ac.get("/api/clients/nearby", params={"radius_km": 10}, headers=headers)
+        assert response.status_code == 200
+        assert [(item["id"], round(item["distance_km"])) for item in response.json()] == [(ids[3], 0), (ids[1], 4)]
+        response = await ac.get("/api/clients/nearby", headers=headers,
+                                params={"radius_km": 60, "gender": "female", "latitude": 56.2, "longitude": 37.6173})
+        assert [item["id"] for item in response.json()] == [ids[2], ids[1]]
+        assert (await ac.put("/api/clients/location", json={"latitude": 91, "longitude": 0},
+                             headers=headers)).status_code == 422
+
+    async with SessionLocal() as session:
+        user_service = UserService(session, PasswordHasherProtocol)
+        await user_service.delete_inactive_user(ids[4])
+        for user_id in ids[:4]:
+            await user_service.delete_user_by_id(user_id)
+        assert await session.scalar(text("select count(*) from users_geo where id in (%s)" % ",".join(map(str, ids)))) == 0
+
+
+@pytest.mark.asyncio
+async def test_full_text_user_search():
+    names = [("Анна", "Ёлкина"), ("Анастасия", "Петрова"), ("Пётр", "Анников"), ("Анна", "Скрытая")]
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        users = [await user_service.create_user(
+            UserCreate(email=f"fts{i}@example.com", password="securepassword", first_name=first,
+                       last_name=last, gender="female"), None, is_active=i != 3) for i, (first, last) in enumerate(names)]
+    ids = [user.id for user in users]
+
+    assert fts_query('ан" OR NEAR(') == '"ан"* "or"* "near"*'
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        response = await ac.get("/api/clients/search", params={"q": "анн"})
+        assert response.status_code == 200
+        assert sorted(item["id"] for item in response.json()) == [ids[0], ids[2]]
+        response = await ac.get("/api/clients/search", params={"q": "АННА ёлкина"})  # без учета регистра
+        assert [item["id"] for item in response.json()] == [ids[0]]
+        assert (await ac.get("/api/clients/search", params={"q": "!!!"})).json() == []
+
+    async with SessionLocal() as session:
+        await session.execute(text("update users set last_name = 'Сидорова' where id = :id"), {"id": ids[1]})
+        await session.commit()
+        search = UserSearchService(session)
+        assert [row.id for row in await search.search("сидор", 10)] == [ids[1]]
+        assert await search.search("петрова", 10) == []
+        assert await search.rebuild() >= len(ids)
+        assert [row.id for row in await search.search("сидорова анаст", 10)] == [ids[1]]
+
+        user_service = UserService(session, PasswordHasherProtocol)
+        await user_service.delete_inactive_user(ids[3])
+        for user_id in ids[:3]:
+            await user_service.delete_user_by_id(user_id)
+        assert await search.search("анна", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_feed_queue_refill_and_incremental_updates():
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        viewer = await user_service.create_user(
+            UserCreate(email="feed_viewer@example.com", password="securepassword",
+                       first_name="Feed", last_name="Viewer", gender="male"), None)
+        others = [await user_service.create_user(
+            UserCreate(email=f"feed{i}@example.com", password="securepassword",
+                       first_name="Feed", last_name="Candidate", gender="female"), None) for i in range(4)]
+    ids = [user.id for user in others]
+
+    async with SessionLocal() as session:
+        # Пользователи, созданные другими тестами раньше, тоже попадают в очередь
+        await session.execute(text("insert into likes (user_id, liked_user_id) select :v, id from users "
+                                   "where id < :first and id != :v"), {"v": viewer.id, "first": ids[0]})
+        await session.commit()
+        await LikeService(session).create_like(viewer.id, ids[0])
+
+        feed = FeedService(session, batch_size=2, low_watermark=2)
+        # Пустая очередь пополняется сразу, лайкнутые не попадают
+        assert [row.id for row in await feed.next_candidates(viewer.id, 1)] == [ids[1]]
+        assert await session.scalar(text("select count(*) from jobs where kind = 'feed_refill' and "
+                                         "json_extract(payload, '$.user_id') = :v"), {"v": viewer.id}) == 0
+        await LikeService(session).create_like(viewer.id, ids[1])  # удаляется из очереди в транзакции лайка
+        assert [row.id for row in await feed.next_candidates(viewer.id, 5)] == [ids[2]]
+        # Остаток ниже порога: пополнение поставлено в очередь задач ровно один раз
+        await feed.next_candidates(viewer.id, 1)
+        assert await session.scalar(text("select count(*) from jobs where kind = 'feed_refill' and "
+                                         "json_extract(payload, '$.user_id') = :v"), {"v": viewer.id}) == 1
+
+        await FeedRefillHandler().run(session, {"user_id": viewer.id})
+        assert [row.id for row in await feed.next_candidates(viewer.id, 5)] == [ids[2], ids[3]]
+        assert await feed.skip(viewer.id, ids[2])
+        await UserService(session, PasswordHasherProtocol).delete_user_by_id(ids[3])
+        assert await session.scalar(text("select count(*) from feed_candidates where candidate_id = :id"),
+                                    {"id": ids[3]}) == 0
+
+    payload = TokenPayload(id=viewer.id, username="F", first_name="Feed", last_name="Viewer",
+                           email="feed_viewer@example.com")
+    headers = {"Authorization": f"Bearer {token_service.TokenGenerator.generate_token(payload).access_token}"}
+    async with AsyncClient(app=app, base_url=URL) as ac:
+        # Очередь пуста - после полного круга пропущенная анкета возвращается
+        response = await ac.get("/api/clients/feed", headers=headers)
+        assert response.status_code == 200 and [item["id"] for item in response.json()] == [ids[2]]
+        assert (await ac.post(f"/api/clients/feed/{ids[2]}/skip", headers=headers)).status_code == 204
+
+    async with SessionLocal() as session:
+        await session.execute(text("delete from jobs where kind = 'feed_refill'"))
+        await session.commit()
+        user_service = UserService(session, PasswordHasherProtocol)
+        for user_id in (viewer.id, ids[0], ids[1], ids[2]):
+            await user_service.delete_user_by_id(user_id)
+
+
+@pytest.mark.asyncio
+async def test_ranking_engine_scores_feature_columns():
+    scores = np.array([0.5, -np.inf, 3.0, 1.0, 2.0])
+    assert top_k(scores, 3).tolist() == [2, 4, 3]
+    assert top_k(scores, 10).tolist() == [2, 4, 3, 0]
+
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        viewer, near, far, inactive = [await user_service.create_user(
+            UserCreate(email=f"rank{i}@example.com", password="securepassword",
+                       first_name="Rank", last_name="User", gender=gender), None)
+            for i, gender in enumerate(["male", "female", "female", "female"])]
+        await user_service.set_location(viewer.id, 55.75, 37.62)
+        await user_service.set_location(near.id, 55.76, 37.60)
+        await user_service.set_location(far.id, 59.93, 30.34)
+        await session.execute(text("update users set is_active = 0 where id = :id"), {"id": inactive.id})
+        await session.commit()
+
+        store = FeatureStore(capacity=2)
+        await store.reload(session)
+        assert store.last_user_id == inactive.id
+        engine = RankingEngine(store)
+        pool = [viewer.id, near.id, far.id, inactive.id]
+        # Сам пользователь и неактивные исключаются, ближе - выше
+        assert [candidate_id for candidate_id, _ in engine.rank(viewer.id, pool, 10)] == [near.id, far.id]
+
+        # Инкрементальное обновление учитывает только новые лайки
+        for user_id in (viewer.id, near.id):
+            await LikeService(session).create_like(user_id, far.id)
+        assert (await store.refresh(session))[1] == 2
+        rows, _ = store.rows_for(np.array([far.id]))
+        assert store.view()["likes_received"][rows[0]] == 2
+        assert (await store.refresh(session))[1] == 0
+
+        # Полная перезагрузка собирает столбцы отдельно: пока идут запросы, видны прежние признаки
+        loaded, sizes, execute = store.size, [], session.execute
+
+        async def observed_execute(*args, **kwargs):
+            sizes.append(store.size)
+            return await execute(*args, **kwargs)
+
+        session.execute = observed_execute
+        try:
+            assert await store.reload(session) == loaded
+        finally:
+            del session.execute
+        assert sizes and set(sizes) == {loaded}
+        assert store.view()["likes_received"][rows[0]] == 2
+
+        # Функция оценки подключаемая
+        popularity = RankingEngine(store, WeightedScorer({"proximity": 0.0}))
+        assert popularity.rank(viewer.id, pool, 1)[0][0] == far.id
+
+        # Очередь анкет с ранжированием: лучший из пула - первым
+        await session.execute(text("delete from likes where liked_user_id = :id"), {"id": far.id})
+        await session.commit()
+        feed = FeedService(session, batch_size=1, ranker=engine, pool_factor=1000)
+        assert [row.id for row in await feed.next_candidates(viewer.id, 1)] == [near.id]
+
+        await session.execute(text("delete from jobs where kind = 'feed_refill'"))
+        await session.execute(text("update users set is_active = 1 where id = :id"), {"id": inactive.id})
+        await session.commit()
+        for user in (viewer, near, far, inactive):
+            await user_service.delete_user_by_id(user.id)
+
+        # ID удаленных пользователей не выдаются повторно: новый пользователь дочитывается
+        newcomer = await user_service.create_user(
+            UserCreate(email="rank-new@example.com", password="securepassword",
+                       first_name="Rank", last_name="User", gender="female"), None)
+        assert newcomer.id > inactive.id
+        assert (await store.refresh(session))[0] == 1
+        assert store.rows_for(np.array([newcomer.id]))[1].all()
+        await user_service.delete_user_by_id(newcomer.id)
+
+
+@pytest.mark.asyncio
+async def test_like_graph_snapshot_and_queries(tmp_path):
+    async with SessionLocal() as session:
+        user_service = UserService(session, password_hasher.PasswordHasher())
+        a, b, c, d = [await user_service.create_user(
+            UserCreate(email=f"graph{i}@example.com", password="securepassword",
+                       first_name="Graph", last_name="User", gender="female"), None) for i in range(4)]
+        likes = LikeService(session)
+        for user_id, liked_user_id in ((a.id, b.id), (b.id, a.id), (a.id, c.id), (b.id, d.id), (c.id, d.id)):
+            await likes.create_like(user_id, liked_user_id)
+
+        graph = LikeGraph(compact_threshold=1000)
+        await graph.reload(session)
+        assert graph.liked(a.id).tolist() == [b.id, c.id]
+        assert graph.in_degree(d.id) == 2 and graph.has_like(c.id, d.id) and not graph.has_like(d.id, c.id)
+        assert graph.mutual(a.id).tolist() == [b.id]
+        assert graph.common_liked(b.id, c.id).tolist() == [d.id]
+        # d лайкнули оба, кого лайкнул a: два пути
+        assert graph.liked_by_liked(a.id, 5) == [(d.id, 2)]
+
+        # Снимок открывается через mmap, новые лайки дочитываются поверх него
+        graph.save(tmp_path / "graph")
+        restored = LikeGraph.load(tmp_path / "graph", compact_threshold=1000)
+        assert isinstance(restored.forward.indices, np.memmap)
+        await likes.create_like(d.id, a.id)
+        assert await restored.refresh(session) == 1
+        assert restored.liked_by(a.id).tolist() == [b.id, d.id]
+        assert (d.id, 2) in restored.most_liked(10)
+        restored.compact()
+        assert restored.edge_count == graph.edge_count + 1
+        assert restored.liked_by(a.id).tolist() == [b.id, d.id]
+        graph.save(tmp_path / "graph")  # подмена снимка, открытого другим графом
+        assert LikeGraph.load(tmp_path / "graph").edge_count == graph.edge_count
+
+        # Удален последний лайк и поставлен новый: ID не переиспользуется, граф перестраивается
+        await session.execute(text("DELETE FROM likes WHERE user_id = :d AND liked_user_id = :a"),
+                              {"d": d.id, "a": a.id})
+        await session.commit()
+        await likes.create_like(c.id, a.id)
+        assert await restored.refresh(session) == graph.edge_count + 1
+        assert restored.liked_by(a.id).tolist() == [b.id, c.id]
+        assert not restored.has_like(d.id, a.id)
+        assert await restored.refresh(session) == 0
+
+        # Лайки удалены каскадом вместе с пользователем: счетчик like_deletions ведет триггер
+        edges = restored.edge_count
+        await user_service.delete_user_by_id(d.id)
+        assert await restored.refresh(session) == edges - 2
+        assert restored.liked(b.id).tolist() == [a.id]
+
+        for user in (a, b, c):
+            await user_service.delete_user_by_id(user.id)